@@ -0,0 +1,67 @@
+import time
+import threading
+import psutil
+
+# Реестр процессов агентов. Полный обход process_iter — только по редкому
+# расписанию или когда отслеживаемый PID умер; в остальное время
+# проверяем лишь известные PID и снимаем с них метрики через oneshot().
+
+AGENT_PATTERNS = (
+    ("openclaw-gateway", "Letto Core Gateway"),
+    ("server.py", "Letto UI Manager")
+)
+FULL_SCAN_INTERVAL = 60
+
+def _match(cmdline):
+    cmd = " ".join(cmdline or [])
+    for pattern, name in AGENT_PATTERNS:
+        if pattern in cmd: return name
+    return None
+
+class AgentRegistry:
+    def __init__(self):
+        self.tracked = {}      # pid -> (name, psutil.Process)
+        self.last_scan = None
+        self.lock = threading.Lock()
+
+    def _full_scan(self):
+        found = {}
+        for proc in psutil.process_iter(['pid', 'cmdline']):
+            try:
+                name = _match(proc.info['cmdline'])
+                if name:
+                    # Сохраняем прежний объект Process — у него состояние для cpu_percent
+                    old = self.tracked.get(proc.pid)
+                    found[proc.pid] = (name, old[1] if old and old[1].is_running() else proc)
+            except: pass
+        self.tracked = found
+        self.last_scan = time.monotonic()
+
+    def _needs_scan(self):
+        if self.last_scan is None or time.monotonic() - self.last_scan >= FULL_SCAN_INTERVAL:
+            return True
+        # is_running() сверяет и create_time, так что переиспользованный PID не обманет
+        return any(not proc.is_running() for _, proc in self.tracked.values())
+
+    def get_agents(self):
+        with self.lock:
+            if self._needs_scan():
+                self._full_scan()
+            agents = []
+            now = time.time()
+            for pid, (name, proc) in sorted(self.tracked.items()):
+                try:
+                    with proc.oneshot():
+                        agents.append({
+                            "pid": str(pid),
+                            "name": name,
+                            "cpu": proc.cpu_percent(None),
+                            "rss": proc.memory_info().rss,
+                            "threads": proc.num_threads(),
+                            "uptime": int(now - proc.create_time())
+                        })
+                except (psutil.NoSuchProcess, psutil.AccessDenied):
+                    continue
+            return agents
+
+agent_registry = AgentRegistry()
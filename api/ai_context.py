@@ -0,0 +1,129 @@
+import os
+import json
+import time
+import asyncio
+
+from api.paths import STATE_DIR
+from api.state import write_atomic
+from api.cache import shared_cache
+from api.instrument import count_spawn
+from api.parser import SessionStreamParser, pick_main, CLI_PATH, CONTEXT_LIMIT, READ_SIZE
+
+# Единый in-process зонд контекста AI-сессии (openclaw sessions list).
+# Одновременные запросы делят один вызов CLI, чаще MIN_REFRESH он не запускается,
+# а вызывающие сразу получают значение из памяти, пока обновление идёт в фоне.
+# scripts/ai_cache.json (значение и список сессий) пишется атомарно и нужен только для тёплого старта.
+# При нескольких воркерах результат опроса выкладывается в общий кэш, и воркер,
+# собравшийся звать CLI, сначала берёт оттуда свежий ответ соседа.
+
+AI_CACHE_FILE = os.path.join(STATE_DIR, 'ai_cache.json')
+CLI_TIMEOUT = 20
+MIN_REFRESH = 10       # не чаще раза в 10 секунд, даже по кнопке "live"
+STALE_AFTER = 120      # фоновое обновление и без кнопки, если значение старше
+
+DEFAULT = {"used": 0, "total": CONTEXT_LIMIT, "percent": 0, "model": "unknown", "timestamp": 0}
+
+class AiContextProbe:
+    def __init__(self, cache_file=AI_CACHE_FILE):
+        self.cache_file = cache_file
+        self.value = None
+        self.sessions = []
+        self.error = None
+        self._attempted = 0.0     # monotonic последней попытки (успешной или нет)
+        self._inflight = None
+        self._warm_loaded = False
+
+    def _load_warm(self):
+        self._warm_loaded = True
+        try:
+            with open(self.cache_file, 'r') as f:
+                data = json.load(f)
+            if isinstance(data, dict) and "used" in data:
+                self.sessions = data.pop("sessions", None) or []
+                self.value = data
+        except:
+            pass
+
+    def snapshot(self):
+        # Текущее значение без запуска CLI — для /api/status и SSE
+        if not self._warm_loaded:
+            self._load_warm()
+        return self.value or dict(DEFAULT)
+
+    def refresh(self):
+        # Возвращает задачу обновления; параллельные вызовы получают одну и ту же
+        if self._inflight is None or self._inflight.done():
+            self._inflight = asyncio.create_task(self._probe())
+        return self._inflight
+
+    async def _probe(self):
+        self._attempted = time.monotonic()
+        if shared_cache.shared:
+            entry = await asyncio.to_thread(shared_cache.get, "ai")
+            if entry is not None and time.time() - entry[1] < MIN_REFRESH:
+                self.value, self.sessions, self.error = entry[0]["value"], entry[0]["sessions"], None
+                return self.value
+        try:
+            count_spawn()
+            proc = await asyncio.create_subprocess_exec(
+                CLI_PATH, "sessions", "list",
+                stdin=asyncio.subprocess.DEVNULL,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.DEVNULL
+            )
+            try:
+                sessions = await asyncio.wait_for(self._read_sessions(proc), CLI_TIMEOUT)
+            except asyncio.TimeoutError:
+                proc.kill()
+                await proc.wait()
+                raise RuntimeError(f"openclaw timed out after {CLI_TIMEOUT}s")
+            if proc.returncode != 0:
+                raise RuntimeError(f"openclaw exited with {proc.returncode}")
+            main = pick_main(sessions)
+            if main is None:
+                raise RuntimeError("openclaw returned no sessions")
+            data = {"used": main["used"], "total": CONTEXT_LIMIT, "percent": round(main["used"] / CONTEXT_LIMIT * 100, 1), "model": main["model"]}
+        except Exception as e:
+            self.error = str(e)
+            print(f"AI context probe error: {e}")
+            return self.snapshot()
+        data["timestamp"] = int(time.time())
+        self.value, self.sessions, self.error = data, sessions, None
+        if shared_cache.shared:
+            await asyncio.to_thread(shared_cache.set, "ai", {"value": data, "sessions": sessions})
+        try:
+            await asyncio.to_thread(write_atomic, self.cache_file, json.dumps(dict(data, sessions=sessions)))
+        except Exception as e:
+            print(f"AI context cache write error: {e}")
+        return data
+
+    async def _read_sessions(self, proc):
+        # Табличный вывод разбирается по мере чтения, JSON — целиком в конце
+        parser = SessionStreamParser()
+        sessions = []
+        while True:
+            chunk = await proc.stdout.read(READ_SIZE)
+            if not chunk: break
+            sessions.extend(parser.feed(chunk))
+        sessions.extend(parser.feed(b"", final=True))
+        await proc.wait()
+        return sessions
+
+    async def get(self, live=False, wait=True):
+        value = self.snapshot()
+        since_attempt = time.monotonic() - self._attempted
+        if self.value is None:
+            # Холодный старт без файла: ждём первый (общий) вызов, если разрешено
+            busy = self._inflight is not None and not self._inflight.done()
+            if since_attempt >= MIN_REFRESH or busy:
+                task = self.refresh()
+                if wait:
+                    return await asyncio.shield(task)
+            return value
+        age = time.time() - value.get("timestamp", 0)
+        if since_attempt >= MIN_REFRESH and (live or age >= STALE_AFTER):
+            # stale-while-revalidate: отдаём что есть, свежее придёт через SSE
+            self.refresh()
+        return value
+
+ai_probe = AiContextProbe()
@@ -0,0 +1,182 @@
+import os
+import re
+import gzip
+import hashlib
+import mimetypes
+import threading
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+from fastapi.responses import Response
+from starlette.middleware.gzip import GZipMiddleware, DEFAULT_EXCLUDED_CONTENT_TYPES
+
+# Статика SPA из памяти. При старте все файлы static/ читаются, сжимаются
+# заранее (gzip, brotli — если модуль установлен) и получают строгий ETag
+# по содержимому. В index.html ссылки /static/... переписываются на адреса
+# с хэшем (app.3f2a9c1e.js), их можно кэшировать навсегда (immutable);
+# сам index.html и адреса без хэша отдаются с no-cache и ревалидируются по ETag.
+# На запросах диск не трогается: таблицы пересобираются только явно — после
+# git-задач и по POST /api/system/reload-static (reload() зовётся в потоке),
+# готовые таблицы подменяются одним присваиванием.
+
+STATIC_ROOT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "static")
+INDEX = "index.html"
+# Маршруты SPA, которые отдают index.html (клиентский роутинг)
+SPA_ROUTES = ("/", "/agents", "/projects", "/git", "/explorer")
+COMPRESSIBLE = ("text/", "application/javascript", "application/json", "image/svg+xml", "application/xml")
+MIN_COMPRESS_SIZE = 512
+IMMUTABLE = "public, max-age=31536000, immutable"
+REVALIDATE = "no-cache"
+
+# gzip для крупных JSON-ответов API (дерево, страницы файлов). Архивы уже сжаты,
+# а NDJSON поиска и SSE должны уходить клиенту по мере готовности
+GZIP_MIN_SIZE = 1024
+GZIP_EXCLUDE = DEFAULT_EXCLUDED_CONTENT_TYPES + ("application/x-zip-compressed", "application/octet-stream", "application/x-ndjson")
+
+_STATIC_REF = re.compile(r'(["\'(])/static/([^"\'()?#\s]+)')
+
+class Asset:
+    __slots__ = ("rel", "media_type", "etag", "hashed", "bodies")
+
+    def __init__(self, rel, data):
+        self.rel = rel
+        self.media_type = mimetypes.guess_type(rel)[0] or "application/octet-stream"
+        if self.media_type.startswith("text/") or self.media_type == "application/javascript":
+            self.media_type += "; charset=utf-8"
+        digest = hashlib.sha256(data).hexdigest()[:12]
+        self.etag = f'"{digest}"'
+        stem, ext = os.path.splitext(rel)
+        self.hashed = f"{stem}.{digest}{ext}"
+        # Кодировка -> тело; сжатая версия хранится, только если она реально меньше
+        self.bodies = {"identity": data}
+        if len(data) >= MIN_COMPRESS_SIZE and self.media_type.startswith(COMPRESSIBLE):
+            packed = gzip.compress(data, compresslevel=9, mtime=0)
+            if len(packed) < len(data): self.bodies["gzip"] = packed
+            if brotli is not None:
+                packed = brotli.compress(data, quality=11)
+                if len(packed) < len(data): self.bodies["br"] = packed
+
+def _accepted(header):
+    # Accept-Encoding -> множество кодировок с q > 0
+    accepted = set()
+    for part in header.split(","):
+        coding, _, params = part.strip().partition(";")
+        coding = coding.strip().lower()
+        if not coding: continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        if q > 0: accepted.add(coding)
+    return accepted
+
+class AssetStore:
+    def __init__(self, root=STATIC_ROOT):
+        self.root = root
+        # (assets, routes, stamp): assets — путь -> Asset, routes — URL -> (Asset, immutable),
+        # stamp — отпечаток каталога. Один кортеж: читатели не увидят половину пересборки
+        self.tables = None
+        self._lock = threading.Lock()
+
+    def _scan(self):
+        # Отпечаток каталога: (путь, mtime_ns, size) всех файлов
+        stamp = []
+        for current, dirs, files in os.walk(self.root):
+            dirs.sort()
+            for name in sorted(files):
+                full = os.path.join(current, name)
+                try:
+                    st = os.stat(full)
+                except OSError:
+                    continue
+                stamp.append((os.path.relpath(full, self.root).replace(os.sep, "/"), st.st_mtime_ns, st.st_size))
+        return tuple(stamp)
+
+    def _build(self, stamp):
+        assets = {}
+        for rel, _, _ in stamp:
+            try:
+                with open(os.path.join(self.root, rel), 'rb') as f:
+                    data = f.read()
+            except OSError:
+                continue
+            if rel == INDEX: continue
+            assets[rel] = Asset(rel, data)
+        # index.html последним: в нём ссылки на уже посчитанные хэши
+        try:
+            with open(os.path.join(self.root, INDEX), 'rb') as f:
+                html = f.read().decode('utf-8')
+            html = _STATIC_REF.sub(lambda m: m.group(1) + "/static/" + (assets[m.group(2)].hashed if m.group(2) in assets else m.group(2)), html)
+            assets[INDEX] = Asset(INDEX, html.encode('utf-8'))
+        except OSError as e:
+            print(f"Assets: no {INDEX}: {e}")
+
+        routes = {}
+        for rel, asset in assets.items():
+            routes["/static/" + asset.hashed] = (asset, True)
+            routes["/static/" + rel] = (asset, False)
+            # Прежний fallback отдавал файлы static/ и от корня (/css/style.css)
+            routes["/" + rel] = (asset, False)
+        if INDEX in assets:
+            for route in SPA_ROUTES:
+                routes[route] = (assets[INDEX], False)
+        return assets, routes, stamp
+
+    def load(self):
+        with self._lock:
+            self.tables = self._build(self._scan())
+
+    def reload(self):
+        # Блокирующий вызов (обход static/, сжатие): из потока. -> пересобрано ли
+        with self._lock:
+            stamp = self._scan()
+            if self.tables is not None and self.tables[2] == stamp:
+                return False
+            self.tables = self._build(stamp)
+            return True
+
+    def lookup(self, path):
+        # URL -> (Asset, immutable) или None; SPA-маршруты уже в таблице
+        if self.tables is None:
+            self.load()
+        return self.tables[1].get(path)
+
+    def index(self):
+        if self.tables is None:
+            self.load()
+        return self.tables[0].get(INDEX)
+
+    def response(self, request, asset, immutable=False):
+        headers = {
+            "ETag": asset.etag,
+            "Cache-Control": IMMUTABLE if immutable else REVALIDATE,
+            "Vary": "Accept-Encoding"
+        }
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match and (if_none_match.strip() == "*" or asset.etag in [t.strip().removeprefix("W/") for t in if_none_match.split(",")]):
+            return Response(status_code=304, headers=headers)
+        accepted = _accepted(request.headers.get("accept-encoding", ""))
+        for coding in ("br", "gzip"):
+            if coding in accepted and coding in asset.bodies:
+                headers["Content-Encoding"] = coding
+                return Response(content=asset.bodies[coding], media_type=asset.media_type, headers=headers)
+        return Response(content=asset.bodies["identity"], media_type=asset.media_type, headers=headers)
+
+asset_store = AssetStore()
+
+class ApiGZipMiddleware:
+    # Сжатие на лету только для /api: статика уже сжата заранее и сама выбирает кодировку
+    def __init__(self, app):
+        self.app = app
+        self.gzip = GZipMiddleware(app, minimum_size=GZIP_MIN_SIZE, compresslevel=6, exclude_content_types=GZIP_EXCLUDE)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and scope["path"].startswith("/api/"):
+            return await self.gzip(scope, receive, send)
+        await self.app(scope, receive, send)
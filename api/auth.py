@@ -1,23 +1,82 @@
 import os
+import hmac
 import json
-from datetime import datetime
+import time
+import threading
+
+from fastapi import Request, HTTPException
 
 DASHBOARD_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 TOKEN_FILE = os.path.join(DASHBOARD_ROOT, 'scripts/tokens.json')
 
+# Состояние токенов держим в памяти: мастер-ключ читается из окружения один раз,
+# tokens.json перечитывается только при смене mtime/размера. Сравнение — hmac.compare_digest.
+# Валидный разовый токен сверяется с диском не чаще раза в RECHECK_INTERVAL,
+# чтобы перевыпуск кода (scripts/auth.py --gen) отзывал старый почти сразу.
+RECHECK_INTERVAL = 1.0
+
+class TokenStore:
+    def __init__(self, path=TOKEN_FILE):
+        self.path = path
+        self.master_key = (os.getenv('MASTER_KEY') or '').encode()
+        self.stamp = None          # (mtime_ns, size) загруженного файла
+        self.token = b''
+        self.expires_at = 0
+        self.checked_at = 0
+        self.lock = threading.Lock()
+
+    def _reload(self):
+        with self.lock:
+            self.checked_at = time.monotonic()
+            try:
+                st = os.stat(self.path)
+            except OSError:
+                self.stamp, self.token, self.expires_at = None, b'', 0
+                return
+            stamp = (st.st_mtime_ns, st.st_size)
+            if stamp == self.stamp: return
+            try:
+                with open(self.path, 'r') as f:
+                    stored = json.load(f)
+                self.token = str(stored['token']).encode()
+                self.expires_at = float(stored['expires_at'])
+            except:
+                # Файл мог быть пойман посреди записи — следующий stat перечитает его
+                self.token, self.expires_at = b'', 0
+                stamp = None
+            self.stamp = stamp
+
+    def _match(self, candidate):
+        return bool(self.token) and time.time() < self.expires_at and hmac.compare_digest(candidate, self.token)
+
+    def verify(self, token):
+        if not token: return False
+        candidate = str(token).encode()
+        # 1. Мастер-ключ из окружения — без обращения к диску
+        if self.master_key and hmac.compare_digest(candidate, self.master_key):
+            return True
+        # 2. Разовый токен из файла
+        if time.monotonic() - self.checked_at >= RECHECK_INTERVAL:
+            self._reload()
+        elif not self._match(candidate):
+            # Промах по кэшу: возможно, код только что перевыпустили
+            self._reload()
+        return self._match(candidate)
+
+token_store = TokenStore()
+
 def verify_token(token: str):
-    # 1. Сначала проверяем мастер-ключ из окружения (простой и быстрый способ)
-    master_key = os.getenv('MASTER_KEY')
-    if master_key and token == master_key:
-        return True
-
-    # 2. Если не мастер-ключ, проверяем разовый токен из файла
-    if not os.path.exists(TOKEN_FILE):
-        return False
-        
-    try:
-        with open(TOKEN_FILE, 'r') as f:
-            stored = json.load(f)
-        return stored['token'] == token and datetime.now().timestamp() < stored['expires_at']
-    except:
-        return False
+    return token_store.verify(token)
+
+async def require_token(request: Request):
+    # Общая зависимость для всех /api-роутов: токен из query или из JSON-тела
+    token = request.query_params.get("token")
+    if token is None and request.method in ("POST", "PUT", "PATCH"):
+        try:
+            body = await request.json()
+            if isinstance(body, dict):
+                token = body.get("token")
+        except:
+            token = None
+    if not verify_token(token):
+        raise HTTPException(status_code=401)
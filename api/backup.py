@@ -0,0 +1,175 @@
+import os
+import json
+import time
+import zlib
+import hashlib
+import threading
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from api.paths import WORKSPACE_ROOT, STATE_DIR
+from api.instrument import count_read
+from api.zipstream import ZipStream, coalesce, compress_bytes, make_compressor, ZIP_STORED, ZIP_DEFLATED, ZIP_ZSTANDARD
+
+# Движок бэкапов воркспейса: полный или инкрементальный режим.
+# Инкрементальный сравнивает файлы с манифестом прошлого бэкапа
+# (path -> size, mtime_ns, hash) и пакует только изменившиеся.
+# Сжатие идёт в пуле процессов, архив при этом всё равно стримится.
+# Пул один на процесс: создаётся при первом бэкапе, закрывается на shutdown.
+
+MANIFEST_FILE = os.path.join(STATE_DIR, 'backup_manifest.json')
+META_NAME = ".letto_backup.json"
+
+SKIP_DIRS = {"node_modules", ".git"}
+METHODS = {"store": ZIP_STORED, "deflate": ZIP_DEFLATED, "zstd": ZIP_ZSTANDARD}
+DEFAULT_COMPRESSION = os.getenv("BACKUP_COMPRESSION", "deflate")
+DEFAULT_LEVEL = int(os.getenv("BACKUP_LEVEL", "6"))
+WORKERS = int(os.getenv("BACKUP_WORKERS", "0")) or os.cpu_count() or 1
+# Файлы крупнее лимита не гоняем через IPC целиком — сжимаем потоково в текущем потоке
+INLINE_LIMIT = 32 * 1024 * 1024
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def _get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # forkserver: форк из многопоточного сервера небезопасен. Предзагружаем в нём
+            # только этот модуль — по умолчанию forkserver импортирует __main__ (весь server.py)
+            ctx = multiprocessing.get_context("forkserver")
+            ctx.set_forkserver_preload(["api.backup"])
+            _pool = ProcessPoolExecutor(max_workers=WORKERS, mp_context=ctx)
+        return _pool
+
+def _discard_pool(pool):
+    # Умерший воркер (OOM и т.п.) ломает пул насовсем — следующий бэкап создаст новый
+    global _pool
+    with _pool_lock:
+        if _pool is pool: _pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+def shutdown_pool():
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown(wait=True, cancel_futures=True)
+
+def _scan(root):
+    for current, dirs, files in os.walk(root):
+        # Обрезаем каталоги на месте, чтобы os.walk в них даже не спускался
+        dirs[:] = [d for d in dirs if d not in SKIP_DIRS]
+        for name in files:
+            full_path = os.path.join(current, name)
+            try:
+                st = os.stat(full_path)
+            except OSError:
+                continue
+            yield os.path.relpath(full_path, root), full_path, st
+
+def _pack_file(path, prev_hash, method, level):
+    # Выполняется в процессе пула: хэш + сжатие одного файла
+    try:
+        with open(path, 'rb') as f:
+            data = f.read()
+    except OSError as e:
+        return {"error": str(e)}
+    digest = hashlib.blake2b(data, digest_size=16).hexdigest()
+    if digest == prev_hash:
+        return {"hash": digest}
+    return {"hash": digest, "crc": zlib.crc32(data), "size": len(data), "payload": compress_bytes(data, method, level)}
+
+def load_manifest():
+    try:
+        with open(MANIFEST_FILE, 'r') as f:
+            return json.load(f).get("files", {})
+    except (OSError, ValueError):
+        return {}
+
+def _save_manifest(files):
+    # Свой tmp на каждого писателя: параллельные бэкапы не должны делить один файл
+    tmp_path = f"{MANIFEST_FILE}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump({"created_at": int(time.time()), "files": files}, f)
+    os.replace(tmp_path, MANIFEST_FILE)
+
+def create_backup_zip(mode="full", compression=None, level=None, root=WORKSPACE_ROOT):
+    # Параметры проверяем сразу, до первого байта ответа
+    if mode not in ("full", "incremental"):
+        raise ValueError(f"Unknown backup mode: {mode}")
+    compression = compression or DEFAULT_COMPRESSION
+    if compression not in METHODS:
+        raise ValueError(f"Unknown compression: {compression}")
+    method = METHODS[compression]
+    level = DEFAULT_LEVEL if level is None else level
+    make_compressor(method, level)
+    previous = load_manifest() if mode == "incremental" else {}
+    return coalesce(_generate(root, mode, method, level, previous))
+
+def _generate(root, mode, method, level, previous):
+    zs = ZipStream()
+    files = {}      # новый манифест
+    same_as = {}    # новый путь -> путь с тем же содержимым в прошлом бэкапе
+    known = {entry[2]: path for path, entry in previous.items()}
+
+    def add(rel, st, result):
+        if "error" in result:
+            print(f"Backup: skip {rel}: {result['error']}")
+            return
+        # Файл прочитан воркером пула, но по заказу этого запроса
+        count_read(st.st_size)
+        digest = result["hash"]
+        files[rel] = [st.st_size, st.st_mtime_ns, digest]
+        if digest in known:
+            # Содержимое уже лежит в прошлом бэкапе — только ссылка в метаданных
+            if known[digest] != rel: same_as[rel] = known[digest]
+            return
+        yield from zs.add_compressed(rel, result["payload"], result["crc"], result["size"], method, st.st_mtime, st.st_mode)
+
+    pool = _get_pool()
+    pending = deque()
+    try:
+        for rel, full_path, st in _scan(root):
+            prev = previous.get(rel)
+            if prev and prev[0] == st.st_size and prev[1] == st.st_mtime_ns:
+                files[rel] = prev
+                continue
+            if st.st_size > INLINE_LIMIT:
+                # Крупный файл: хэш считаем по ходу стриминга, дедуп по нему уже не сработает
+                hasher = hashlib.blake2b(digest_size=16)
+                yield from zs.add_file(full_path, rel, method, level, hasher=hasher)
+                files[rel] = [st.st_size, st.st_mtime_ns, hasher.hexdigest()]
+                continue
+            pending.append((rel, st, pool.submit(_pack_file, full_path, prev[2] if prev else None, method, level)))
+            # Окно ограничивает память: не больше WORKERS * 4 сжатых файлов в полёте
+            while len(pending) > WORKERS * 4:
+                yield from add(*_pop(pending))
+        while pending:
+            yield from add(*_pop(pending))
+    except BrokenProcessPool:
+        _discard_pool(pool)
+        raise
+    finally:
+        # Клиент отключился или ошибка: задачи этого запроса в общем пуле больше не нужны
+        for _, _, future in pending:
+            future.cancel()
+
+    meta = {
+        "mode": mode,
+        "created_at": int(time.time()),
+        "files": files,
+        "same_as": same_as,
+        "deleted": sorted(p for p in previous if p not in files)
+    }
+    data = json.dumps(meta).encode('utf-8')
+    yield from zs.add_compressed(META_NAME, data, zlib.crc32(data), len(data), ZIP_STORED, time.time())
+    yield from zs.close()
+    # Манифест фиксируем только после полностью отданного архива
+    _save_manifest(files)
+
+def _pop(pending):
+    rel, st, future = pending.popleft()
+    return rel, st, future.result()
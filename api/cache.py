@@ -0,0 +1,105 @@
+import os
+import json
+import time
+import hashlib
+import sqlite3
+import threading
+
+from api.paths import STATE_DIR
+
+# Общий кэш между воркерами. По умолчанию — память процесса (один воркер,
+# накладных расходов нет). В многопроцессном режиме — SQLite-файл, по
+# возможности в /dev/shm (tmpfs: та же общая память, но с блокировками и
+# атомарностью SQLite). Значения — JSON-совместимые объекты с отметкой
+# времени записи. Выбор: CACHE_BACKEND=memory|sqlite, путь — CACHE_PATH.
+
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "memory")
+
+def _default_path():
+    if os.path.isdir("/dev/shm") and os.access("/dev/shm", os.W_OK):
+        # Имя привязано к каталогу состояния: два дашборда на одной машине не пересекутся
+        tag = hashlib.sha1(os.path.realpath(STATE_DIR).encode()).hexdigest()[:8]
+        return f"/dev/shm/letto-dashboard-{os.getuid()}-{tag}.db"
+    return os.path.join(STATE_DIR, "shared_cache.db")
+
+class MemoryBackend:
+    # shared=False: вызывающий код может вовсе не ходить в кэш — данные и так в процессе
+    shared = False
+
+    def __init__(self):
+        self.data = {}
+
+    def get(self, key):
+        # -> (value, stored_at) или None
+        return self.data.get(key)
+
+    def set(self, key, value):
+        self.data[key] = (value, time.time())
+
+    def delete(self, key):
+        self.data.pop(key, None)
+
+    def keys(self, prefix):
+        return [key for key in self.data if key.startswith(prefix)]
+
+class SqliteBackend:
+    shared = True
+
+    def __init__(self, path=None):
+        self.path = path or os.getenv("CACHE_PATH") or _default_path()
+        self._local = threading.local()
+        db = self._db()
+        db.execute("CREATE TABLE IF NOT EXISTS kv (key TEXT PRIMARY KEY, value TEXT NOT NULL, stored_at REAL NOT NULL)")
+        db.commit()
+
+    def _db(self):
+        # Соединение на поток: sqlite3 не любит делить его между потоками
+        db = getattr(self._local, "db", None)
+        if db is None:
+            db = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=OFF")
+            self._local.db = db
+        return db
+
+    def get(self, key):
+        try:
+            row = self._db().execute("SELECT value, stored_at FROM kv WHERE key = ?", (key,)).fetchone()
+        except sqlite3.Error as e:
+            print(f"Shared cache read error: {e}")
+            return None
+        if row is None: return None
+        return json.loads(row[0]), row[1]
+
+    def set(self, key, value):
+        try:
+            self._db().execute(
+                "INSERT OR REPLACE INTO kv (key, value, stored_at) VALUES (?, ?, ?)",
+                (key, json.dumps(value, ensure_ascii=False), time.time())
+            )
+        except sqlite3.Error as e:
+            print(f"Shared cache write error: {e}")
+
+    def delete(self, key):
+        try:
+            self._db().execute("DELETE FROM kv WHERE key = ?", (key,))
+        except sqlite3.Error as e:
+            print(f"Shared cache write error: {e}")
+
+    def keys(self, prefix):
+        try:
+            rows = self._db().execute("SELECT key FROM kv WHERE substr(key, 1, ?) = ?", (len(prefix), prefix)).fetchall()
+        except sqlite3.Error as e:
+            print(f"Shared cache read error: {e}")
+            return []
+        return [row[0] for row in rows]
+
+BACKENDS = {"memory": MemoryBackend, "sqlite": SqliteBackend}
+
+def _create():
+    backend = BACKENDS.get(CACHE_BACKEND)
+    if backend is None:
+        raise ValueError(f"Unknown cache backend: {CACHE_BACKEND} (expected one of {', '.join(BACKENDS)})")
+    return backend()
+
+shared_cache = _create()
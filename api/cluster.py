@@ -0,0 +1,163 @@
+import os
+import time
+import fcntl
+import threading
+
+from api.paths import STATE_DIR
+from api.cache import shared_cache, CACHE_BACKEND
+from api.tree_index import tree_index
+from api.metrics import sampler, RESOLUTIONS, FIELDS
+
+# Роли воркеров при запуске в несколько процессов (server.py --workers N).
+# Дорогие фоновые задачи — индекс дерева с inotify и сэмплер метрик — крутит
+# только лидер: тот, кто держит flock на scripts/leader.lock. Лидер раз в
+# MIRROR_INTERVAL выкладывает их результаты в общий кэш (api/cache.py),
+# остальные воркеры читают оттуда. Лок снимает ядро при смерти процесса,
+# поэтому после падения или перезапуска лидера его роль за ELECTION_INTERVAL
+# подхватывает другой воркер. С кэшем в памяти процесса (один воркер) каждый
+# процесс сам себе лидер и общий кэш не используется.
+
+LEADER_LOCK = os.path.join(STATE_DIR, "leader.lock")
+ELECTION_INTERVAL = 5.0
+MIRROR_INTERVAL = 1.0
+HISTORY_INTERVAL = {"raw": 5, "minute": 60, "hour": 60}   # как часто выкладывать историю, сек
+LATEST_MAX_AGE = 5     # сэмпл старше — лидер не работает, считаем сами
+VERSION_TTL = 0.5      # как долго воркер верит прочитанной версии дерева
+
+class Cluster:
+    def __init__(self):
+        self.leader = False
+        self._lock_fd = None
+        self._thread = None
+        self._stop = threading.Event()
+        self._tree_version = None            # последняя выложенная версия дерева
+        self._latest_ts = None
+        self._history_at = dict.fromkeys(RESOLUTIONS, 0.0)
+        self._tree_local = (None, None)      # (version, tree) прочитанного из общего кэша
+        self._version_local = (0.0, None)    # (monotonic чтения, запись tree:version)
+
+    def start(self):
+        if not shared_cache.shared:
+            self._become_leader()
+            return
+        if self._thread is not None: return
+        self._elect()
+        self._thread = threading.Thread(target=self._run, name="cluster", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _elect(self):
+        fd = os.open(LEADER_LOCK, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            os.close(fd)
+            return
+        # Дескриптор держим открытым до конца жизни процесса — это и есть лидерство
+        self._lock_fd = fd
+        self._become_leader()
+        shared_cache.set("cluster:leader", {"pid": os.getpid(), "since": time.time()})
+        print(f"Worker {os.getpid()} is the leader")
+
+    def _become_leader(self):
+        self.leader = True
+        tree_index.start()
+        sampler.start()
+
+    def _run(self):
+        while not self._stop.is_set():
+            if not self.leader:
+                self._elect()
+                if not self.leader:
+                    self._stop.wait(ELECTION_INTERVAL)
+                    continue
+            try:
+                self._mirror()
+            except Exception as e:
+                print(f"Cluster mirror error: {e}")
+            self._stop.wait(MIRROR_INTERVAL)
+
+    def _mirror(self):
+        if tree_index.ready and tree_index.version != self._tree_version:
+            version = tree_index.version
+            shared_cache.set("tree", {"version": version, "tree": tree_index.tree()})
+            # Версия отдельным маленьким ключом: воркеры сверяют её, не читая всё дерево
+            shared_cache.set("tree:version", version)
+            self._tree_version = version
+        latest = sampler.latest
+        if latest is not None and latest["ts"] != self._latest_ts:
+            shared_cache.set("metrics:latest", latest)
+            self._latest_ts = latest["ts"]
+        now = time.monotonic()
+        for resolution, interval in HISTORY_INTERVAL.items():
+            if now - self._history_at[resolution] >= interval:
+                shared_cache.set(f"metrics:history:{resolution}", sampler.history(0, resolution))
+                self._history_at[resolution] = now
+
+    # Чтение для любого воркера: своё, если он лидер, иначе из общего кэша
+
+    def tree_state(self):
+        # (ready, version) — отпечаток для кэшей поверх дерева
+        if tree_index.ready:
+            return True, tree_index.version
+        if shared_cache.shared:
+            # Отпечаток спрашивают на каждый /api/status — в SQLite ходим не чаще VERSION_TTL
+            checked_at, entry = self._version_local
+            if time.monotonic() - checked_at >= VERSION_TTL:
+                entry = shared_cache.get("tree:version")
+                self._version_local = (time.monotonic(), entry)
+            if entry is not None:
+                return True, entry[0]
+        return False, None
+
+    def tree(self):
+        # Дерево целиком или None, если его ещё никто не построил
+        if tree_index.ready:
+            return tree_index.tree()
+        if not shared_cache.shared:
+            return None
+        ready, version = self.tree_state()
+        if not ready: return None
+        if self._tree_local[0] != version:
+            entry = shared_cache.get("tree")
+            if entry is None: return None
+            self._tree_local = (entry[0]["version"], entry[0]["tree"])
+        return self._tree_local[1]
+
+    def metrics_latest(self):
+        if sampler.latest is not None:
+            return sampler.latest
+        if shared_cache.shared:
+            entry = shared_cache.get("metrics:latest")
+            if entry is not None and time.time() - entry[0]["ts"] < LATEST_MAX_AGE:
+                return entry[0]
+        return None
+
+    def metrics_history(self, since=0, resolution="raw"):
+        if resolution not in RESOLUTIONS:
+            raise ValueError(f"Unknown resolution: {resolution}")
+        if self.leader or not shared_cache.shared:
+            return sampler.history(since, resolution)
+        entry = shared_cache.get(f"metrics:history:{resolution}")
+        if entry is None:
+            return sampler.history(since, resolution)
+        data = entry[0]
+        keep = [i for i, ts in enumerate(data["ts"]) if ts > since]
+        result = dict(data, ts=[data["ts"][i] for i in keep])
+        for f in FIELDS:
+            result[f] = [data[f][i] for i in keep]
+        result["per_core"] = [[core[i] for i in keep] for core in data["per_core"]]
+        return result
+
+    def info(self):
+        entry = shared_cache.get("cluster:leader") if shared_cache.shared else None
+        return {
+            "pid": os.getpid(),
+            "leader": self.leader,
+            "backend": CACHE_BACKEND,
+            "leader_pid": entry[0]["pid"] if entry else os.getpid()
+        }
+
+cluster = Cluster()
@@ -1,13 +1,22 @@
 import os
-import time
+import bisect
 
-# Путь к воркспейсу теперь на один уровень выше, так как дашборд переехал в projects/
-WORKSPACE_ROOT = "/home/max/.openclaw/workspace"
-# Корень дашборда для относительных путей внутри него
-DASHBOARD_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+from api.paths import WORKSPACE_ROOT, OPENCLAW_HOME
+from api.reader import read_page, RangeNotSatisfiable
+from api.state import state_store
+
+def is_visible(name):
+    # Общие правила фильтрации для дерева, индекса и листинга
+    if name.startswith('.') and name != ".env": return False
+    if name in ["__pycache__", "node_modules"]: return False
+    return True
 
 def get_workspace_tree(path=None):
     if path is None:
+        # Горячий путь: дерево из in-memory индекса, без обхода диска
+        from api.tree_index import tree_index
+        if tree_index.ready:
+            return tree_index.tree()
         path = WORKSPACE_ROOT
     
     tree = []
@@ -15,8 +24,7 @@ def get_workspace_tree(path=None):
         if not os.path.exists(path): return []
         items = sorted(os.listdir(path))
         for item in items:
-            if item.startswith('.') and item != ".env": continue
-            if item in ["__pycache__", "node_modules"]: continue
+            if not is_visible(item): continue
                 
             full_path = os.path.join(path, item)
             is_dir = os.path.isdir(full_path)
@@ -51,57 +59,102 @@ def get_workspace_tree(path=None):
         
     return tree
 
-def get_system_config_files():
-    base = "/home/max/.openclaw"
-    files = [
-        "openclaw.json",
-        "openclaw.json.bak",
-        "update-check.json",
-        "agents/main/sessions/sessions.json",
-        "agents/main/agent/auth-profiles.json",
-        "telegram/update-offset-default.json"
-    ]
-    result = []
-    for f in files:
-        full_path = os.path.join(base, f)
-        if os.path.exists(full_path):
+LIST_LIMIT_MAX = 1000
+
+def list_directory(path="", cursor=None, limit=200):
+    # Один уровень каталога, отсортированный по имени, с курсорной пагинацией.
+    # cursor — имя последнего элемента предыдущей страницы.
+    rel = os.path.normpath(path or ".")
+    if rel == ".": rel = ""
+    if rel == ".." or rel.startswith(".." + os.sep) or os.path.isabs(rel):
+        return {"error": "Access denied"}
+    if any(not is_visible(part) for part in rel.split(os.sep) if part):
+        return {"error": "Directory not found"}
+    limit = max(1, min(limit, LIST_LIMIT_MAX))
+
+    from api.tree_index import tree_index
+    if tree_index.ready:
+        with tree_index.lock:
+            if rel and not (tree_index.nodes.get(rel) or {}).get("is_dir"):
+                return {"error": "Directory not found"}
+            names = sorted(tree_index.children.get(rel, ()))
+            page, next_cursor = _page(names, cursor, limit)
+            items = [dict(tree_index.nodes[os.path.join(rel, n) if rel else n]) for n in page]
+    else:
+        full_dir = os.path.join(WORKSPACE_ROOT, rel)
+        try:
+            names = sorted(e for e in os.listdir(full_dir) if is_visible(e))
+        except OSError:
+            return {"error": "Directory not found"}
+        page, next_cursor = _page(names, cursor, limit)
+        items = []
+        # stat только для элементов текущей страницы
+        for name in page:
+            full_path = os.path.join(full_dir, name)
+            size, mtime = 0, 0
             try:
                 stats = os.stat(full_path)
-                result.append({
-                    "name": f,
-                    "path": full_path,
-                    "is_dir": False,
-                    "size": stats.st_size,
-                    "mtime": stats.st_mtime
-                })
-            except:
-                continue
+                size, mtime = stats.st_size, stats.st_mtime
+            except OSError:
+                pass
+            items.append({
+                "name": name,
+                "is_dir": os.path.isdir(full_path),
+                "path": os.path.relpath(full_path, WORKSPACE_ROOT),
+                "size": size,
+                "mtime": mtime
+            })
+
+    return {"path": rel, "items": items, "next_cursor": next_cursor, "total": len(names)}
+
+def _page(names, cursor, limit):
+    start = bisect.bisect_right(names, cursor) if cursor else 0
+    page = names[start:start + limit]
+    next_cursor = page[-1] if start + limit < len(names) else None
+    return page, next_cursor
+
+SYSTEM_CONFIGS = [
+    "openclaw.json",
+    "openclaw.json.bak",
+    "update-check.json",
+    "agents/main/sessions/sessions.json",
+    "agents/main/agent/auth-profiles.json",
+    "telegram/update-offset-default.json"
+]
+# Только метаданные: state_store делает один stat на файл за цикл запроса
+CONFIG_NAMES = [f"config:{f}" for f in SYSTEM_CONFIGS]
+for _name, _file in zip(CONFIG_NAMES, SYSTEM_CONFIGS):
+    state_store.register(_name, os.path.join(OPENCLAW_HOME, _file))
+
+def get_system_config_files():
+    result = []
+    for name, f in zip(CONFIG_NAMES, SYSTEM_CONFIGS):
+        key = state_store.stat(name)
+        if key is None: continue
+        result.append({
+            "name": f,
+            "path": os.path.join(OPENCLAW_HOME, f),
+            "is_dir": False,
+            "size": key[1],
+            "mtime": key[0] / 1e9
+        })
     return result
 
-def read_file_content(path, page=1):
+def resolve_path(path):
     # Пытаемся понять, это абсолютный путь (система) или относительный (воркспейс)
-    if path.startswith("/home/max/.openclaw"):
-        full_path = path
-    else:
-        full_path = os.path.join(WORKSPACE_ROOT, path)
+    if path.startswith(OPENCLAW_HOME):
+        return path
+    return os.path.join(WORKSPACE_ROOT, path)
+
+def read_file_content(path, page=1, page_size=None, line=None, offset=None, length=None):
+    full_path = resolve_path(path)
     
     if not os.path.exists(full_path) or os.path.isdir(full_path):
         return {"error": "File not found"}
     
-    CHUNK_SIZE = 1024 * 1024 
-    file_size = os.path.getsize(full_path)
-    
     try:
-        with open(full_path, 'r', encoding='utf-8', errors='replace') as f:
-            f.seek((page - 1) * CHUNK_SIZE)
-            content = f.read(CHUNK_SIZE)
-            
-        return {
-            "name": os.path.basename(full_path),
-            "content": content,
-            "size": file_size,
-            "page": page,
-            "total_pages": (file_size // CHUNK_SIZE) + (1 if file_size % CHUNK_SIZE > 0 else 0)
-        }
+        return read_page(full_path, page, page_size, line, offset, length)
+    except RangeNotSatisfiable:
+        raise
     except Exception as e:
         return {"error": str(e)}
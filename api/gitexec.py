@@ -0,0 +1,78 @@
+import os
+import asyncio
+
+from api.instrument import count_spawn
+
+# Общий асинхронный исполнитель git-команд.
+# asyncio-подпроцессы вместо блокирующего subprocess, ограничение параллелизма,
+# таймауты и кэш результатов до изменения HEAD/refs репозитория.
+
+GIT_CONCURRENCY = int(os.getenv("GIT_CONCURRENCY", "4"))
+GIT_TIMEOUT = 30
+
+_semaphore = asyncio.Semaphore(GIT_CONCURRENCY)
+_cache = {}   # (repo, args) -> (stamp, output)
+
+class GitError(Exception):
+    def __init__(self, args, returncode, stderr):
+        self.args_list = args
+        self.returncode = returncode
+        self.stderr = stderr
+        super().__init__(f"git {' '.join(args)} failed ({returncode}): {stderr.strip()}")
+
+def head_ref_stamp(git_dir):
+    # Файл текущей ветки, найденный по HEAD ("ref: refs/heads/main"). Обновление ветки
+    # (commit, reset, fetch в текущую ветку) переписывает только его, а mtime каталога
+    # refs/heads при этом на многих ФС не меняется. git пишет ref через rename — берём и inode
+    try:
+        with open(os.path.join(git_dir, "HEAD"), 'r') as f:
+            head = f.read().strip()
+    except OSError:
+        return None
+    if not head.startswith("ref: "): return None    # detached HEAD: хватает mtime самого HEAD
+    try:
+        st = os.stat(os.path.join(git_dir, head[5:]))
+    except OSError:
+        return None     # ветка только в packed-refs
+    return (st.st_ino, st.st_mtime_ns)
+
+def repo_stamp(repo):
+    # Меняется при коммите, checkout, создании/удалении веток, fetch и правке конфига
+    git_dir = os.path.join(repo, ".git")
+    stamp = []
+    for name in ("HEAD", "logs/HEAD", "refs/heads", "refs/remotes", "packed-refs", "config"):
+        try:
+            stamp.append(os.stat(os.path.join(git_dir, name)).st_mtime_ns)
+        except OSError:
+            stamp.append(None)
+    stamp.append(head_ref_stamp(git_dir))
+    return tuple(stamp)
+
+async def git(repo, *args, timeout=GIT_TIMEOUT, cache=False, check=True):
+    # cache=True только для read-only команд: результат живёт, пока не сменится repo_stamp
+    key = (repo, args)
+    if cache:
+        stamp = repo_stamp(repo)
+        hit = _cache.get(key)
+        if hit and hit[0] == stamp:
+            return hit[1]
+    async with _semaphore:
+        count_spawn()
+        proc = await asyncio.create_subprocess_exec(
+            "git", *args, cwd=repo,
+            stdin=asyncio.subprocess.DEVNULL,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE
+        )
+        try:
+            out, err = await asyncio.wait_for(proc.communicate(), timeout)
+        except asyncio.TimeoutError:
+            proc.kill()
+            await proc.wait()
+            raise GitError(list(args), None, f"timed out after {timeout}s")
+    if check and proc.returncode != 0:
+        raise GitError(list(args), proc.returncode, err.decode('utf-8', errors='replace'))
+    output = out.decode('utf-8', errors='replace')
+    if cache and proc.returncode == 0:
+        _cache[key] = (stamp, output)
+    return output
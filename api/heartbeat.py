@@ -1,21 +1,22 @@
-import os
+from api.paths import HEARTBEAT_FILE
+from api.state import state_store
 
-WORKSPACE_ROOT = "/home/max/.openclaw/workspace"
-HEARTBEAT_FILE = os.path.join(WORKSPACE_ROOT, 'HEARTBEAT.md')
+# Разобранный HEARTBEAT.md живёт в state_store до изменения файла
+state_store.register(
+    "heartbeat", HEARTBEAT_FILE,
+    parse=lambda data: data.decode('utf-8', errors='replace'),
+    missing=f"File not found at {HEARTBEAT_FILE}",
+    error="Error reading file"
+)
 
 def get_heartbeat_raw():
-    if os.path.exists(HEARTBEAT_FILE):
-        try:
-            with open(HEARTBEAT_FILE, 'r') as f:
-                return f.read()
-        except:
-            return "Error reading file"
-    return f"File not found at {HEARTBEAT_FILE}"
+    return state_store.get("heartbeat")
 
-def update_heartbeat_content(content: str):
+async def update_heartbeat_content(content: str):
+    # Атомарная запись в пуле потоков; подписчики (секция статуса) узнают сами
     try:
-        with open(HEARTBEAT_FILE, 'w') as f:
-            f.write(content)
+        await state_store.write("heartbeat", content)
         return True
-    except:
+    except Exception as e:
+        print(f"Heartbeat write error: {e}")
         return False
@@ -0,0 +1,85 @@
+import os
+import select
+import struct
+import ctypes
+import ctypes.util
+
+# Минимальная обёртка над inotify(7) через ctypes — без внешних зависимостей.
+# На не-Linux системах Inotify() бросает OSError, и вызывающий код
+# должен откатиться на периодический опрос.
+
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+
+DIR_EVENTS = IN_CREATE | IN_DELETE | IN_MOVED_FROM | IN_MOVED_TO | IN_MODIFY | IN_CLOSE_WRITE | IN_ATTRIB | IN_DELETE_SELF | IN_MOVE_SELF
+
+_EVENT = struct.Struct('iIII')
+_libc = None
+
+def _load_libc():
+    global _libc
+    if _libc is None:
+        _libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        _libc.inotify_init1.argtypes = [ctypes.c_int]
+        _libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        _libc.inotify_rm_watch.argtypes = [ctypes.c_int, ctypes.c_int]
+    return _libc
+
+def _raise_errno(path=None):
+    err = ctypes.get_errno()
+    raise OSError(err, os.strerror(err), path)
+
+class Inotify:
+    def __init__(self):
+        try:
+            libc = _load_libc()
+            init = libc.inotify_init1
+        except (OSError, AttributeError) as e:
+            raise OSError(f"inotify is not available: {e}")
+        fd = init(os.O_CLOEXEC | os.O_NONBLOCK)
+        if fd < 0: _raise_errno()
+        self.fd = fd
+
+    def add_watch(self, path, mask=DIR_EVENTS):
+        wd = _libc.inotify_add_watch(self.fd, os.fsencode(path), mask)
+        if wd < 0: _raise_errno(path)
+        return wd
+
+    def rm_watch(self, wd):
+        # Ошибку игнорируем: ядро само снимает watch при удалении каталога
+        _libc.inotify_rm_watch(self.fd, wd)
+
+    def read(self, timeout=None):
+        # Возвращает список (wd, mask, cookie, name); пустой список по таймауту
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return []
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return []
+        events = []
+        pos = 0
+        while pos + _EVENT.size <= len(data):
+            wd, mask, cookie, length = _EVENT.unpack_from(data, pos)
+            pos += _EVENT.size
+            name = os.fsdecode(data[pos:pos + length].rstrip(b'\0'))
+            pos += length
+            events.append((wd, mask, cookie, name))
+        return events
+
+    def close(self):
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
@@ -0,0 +1,309 @@
+import os
+import sys
+import time
+import asyncio
+import threading
+import contextvars
+from collections import deque, Counter
+
+import psutil
+
+from api.paths import STATE_DIR
+
+# Инструментирование запросов. ASGI-мидлварь заводит на каждый запрос Trace
+# (contextvar — виден и в задачах asyncio, и в потоках run_in_threadpool):
+# в него пишутся тайминги коллекторов статуса, число порождённых подпроцессов
+# (считаются там, где запускаются: api/gitexec.py, api/ai_context.py)
+# и байты, прочитанные с диска по ходу запроса. Итог уходит в заголовок
+# Server-Timing и в гистограммы для /api/debug/metrics (формат Prometheus).
+# Сэмплирующий профайлер включается на лету и сохраняет свёрнутые стеки
+# (формат flamegraph.pl / speedscope) медленных запросов.
+
+DURATION_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+SPAWN_BUCKETS = (0, 1, 2, 4, 8, 16, 32)
+BYTES_BUCKETS = (0, 4096, 65536, 1 << 20, 16 << 20, 256 << 20)
+
+PROFILE_DIR = os.path.join(STATE_DIR, "profiles")
+MAX_PROFILES = 50
+PROFILE_WINDOW = 60          # секунд истории сэмплов
+# Верхний Python-кадр спящего потока: select цикла событий, ожидание в очереди пула
+IDLE_LEAVES = {("selectors.py", "select"), ("threading.py", "wait"), ("threading.py", "_wait_for_tstate_lock"),
+               ("queue.py", "get"), ("thread.py", "_worker"), ("socket.py", "accept"), ("inotify.py", "read")}
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+class Histogram:
+    def __init__(self, name, doc, labels, buckets):
+        self.name = name
+        self.doc = doc
+        self.labels = labels
+        self.buckets = buckets
+        self.series = {}     # значения меток -> [счётчики по бакетам..., сумма, количество]
+        self.lock = threading.Lock()
+
+    def observe(self, values, value):
+        with self.lock:
+            row = self.series.get(values)
+            if row is None:
+                row = self.series[values] = [0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    row[i] += 1
+            row[-2] += value
+            row[-1] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.doc}", f"# TYPE {self.name} histogram"]
+        with self.lock:
+            series = {k: list(v) for k, v in self.series.items()}
+        for values, row in sorted(series.items()):
+            labels = ",".join(f'{k}="{_escape(v)}"' for k, v in zip(self.labels, values))
+            sep = "," if labels else ""
+            for bound, count in zip(self.buckets, row):
+                lines.append(f'{self.name}_bucket{{{labels}{sep}le="{bound}"}} {count}')
+            lines.append(f'{self.name}_bucket{{{labels}{sep}le="+Inf"}} {row[-1]}')
+            lines.append(f"{self.name}_sum{{{labels}}} {row[-2]}")
+            lines.append(f"{self.name}_count{{{labels}}} {row[-1]}")
+        return lines
+
+class CounterMetric:
+    def __init__(self, name, doc, labels):
+        self.name = name
+        self.doc = doc
+        self.labels = labels
+        self.series = Counter()
+        self.lock = threading.Lock()
+
+    def inc(self, values, amount=1):
+        with self.lock:
+            self.series[values] += amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.doc}", f"# TYPE {self.name} counter"]
+        with self.lock:
+            series = dict(self.series)
+        for values, total in sorted(series.items()):
+            labels = ",".join(f'{k}="{_escape(v)}"' for k, v in zip(self.labels, values))
+            lines.append(f"{self.name}{{{labels}}} {total}")
+        return lines
+
+REQUEST_DURATION = Histogram("letto_request_duration_seconds", "Request handling time, seconds", ("method", "route", "status"), DURATION_BUCKETS)
+SPAN_DURATION = Histogram("letto_span_duration_seconds", "Time spent in instrumented spans (status collectors), seconds", ("span",), DURATION_BUCKETS)
+REQUEST_SPAWNS = Histogram("letto_request_subprocesses", "Subprocesses spawned per request", ("route",), SPAWN_BUCKETS)
+REQUEST_READ = Histogram("letto_request_disk_read_bytes", "Bytes read from disk per request", ("route",), BYTES_BUCKETS)
+SPAWNS_TOTAL = CounterMetric("letto_subprocesses_spawned_total", "Subprocesses spawned, by route (background = outside requests)", ("route",))
+READ_TOTAL = CounterMetric("letto_disk_read_bytes_total", "Bytes read from disk, by route", ("route",))
+METRICS = (REQUEST_DURATION, SPAN_DURATION, REQUEST_SPAWNS, REQUEST_READ, SPAWNS_TOTAL, READ_TOTAL)
+
+class Trace:
+    __slots__ = ("start", "spans", "spawns", "read_bytes")
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.spans = {}
+        self.spawns = 0
+        self.read_bytes = 0
+
+    def server_timing(self):
+        parts = [f"{name};dur={seconds * 1000:.2f}" for name, seconds in self.spans.items()]
+        if self.spawns: parts.append(f'subprocess;desc="{self.spawns}"')
+        if self.read_bytes: parts.append(f'disk;desc="{self.read_bytes}B"')
+        return ", ".join(parts)
+
+_current = contextvars.ContextVar("letto_trace", default=None)
+
+def record(name, seconds):
+    # Время одного участка; повторы внутри запроса суммируются
+    SPAN_DURATION.observe((name,), seconds)
+    trace = _current.get()
+    if trace is not None:
+        trace.spans[name] = trace.spans.get(name, 0) + seconds
+
+def count_read(nbytes):
+    trace = _current.get()
+    if trace is not None:
+        trace.read_bytes += nbytes
+    else:
+        READ_TOTAL.inc(("background",), nbytes)
+
+def count_spawn():
+    trace = _current.get()
+    if trace is not None:
+        trace.spawns += 1
+    else:
+        SPAWNS_TOTAL.inc(("background",))
+
+def _route(scope):
+    route = scope.get("route")
+    if route is not None:
+        return route.path
+    if scope["path"].startswith("/static/"):
+        return "/static"
+    return "unmatched"
+
+class InstrumentMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        trace = Trace()
+        token = _current.set(trace)
+        status = 500
+
+        async def send_timed(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                # Заголовки уходят до тела: для стримов это время до первого байта
+                trace.spans["app"] = time.perf_counter() - trace.start
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", trace.server_timing().encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_timed)
+        finally:
+            _current.reset(token)
+            duration = time.perf_counter() - trace.start
+            route = _route(scope)
+            REQUEST_DURATION.observe((scope["method"], route, f"{status // 100}xx"), duration)
+            REQUEST_SPAWNS.observe((route,), trace.spawns)
+            REQUEST_READ.observe((route,), trace.read_bytes)
+            if trace.spawns: SPAWNS_TOTAL.inc((route,), trace.spawns)
+            if trace.read_bytes: READ_TOTAL.inc((route,), trace.read_bytes)
+            if profiler.wants(duration):
+                # Ответ уже отправлен; свёртка стеков и запись файла — в потоке, не в event loop
+                await asyncio.to_thread(profiler.finish, scope["method"], route, trace.start, duration)
+
+def _frame_name(code):
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+class SlowRequestProfiler:
+    # Фоновый поток раз в interval снимает стеки всех потоков (sys._current_frames).
+    # Запрос дольше threshold получает свёрнутые стеки из своего окна времени.
+    # Атрибуция по времени, не по задаче: параллельные запросы попадают в профиль друг друга.
+    def __init__(self):
+        self.enabled = False
+        self.threshold = float(os.getenv("PROFILE_SLOW_MS", "500")) / 1000
+        self.interval = float(os.getenv("PROFILE_INTERVAL_MS", "5")) / 1000
+        self.samples = deque()
+        self.profiles = deque(maxlen=MAX_PROFILES)
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def configure(self, enabled=None, threshold_ms=None, interval_ms=None):
+        if threshold_ms is not None:
+            self.threshold = max(0.0, threshold_ms / 1000)
+        if interval_ms is not None:
+            self.interval = max(0.001, interval_ms / 1000)
+        if enabled is not None:
+            self.enabled = enabled
+            if enabled and (self._thread is None or not self._thread.is_alive()):
+                self._thread = threading.Thread(target=self._run, name="slow-request-profiler", daemon=True)
+                self._thread.start()
+            if not enabled:
+                with self._lock:
+                    self.samples.clear()
+        return self.status()
+
+    def status(self):
+        return {
+            "enabled": self.enabled,
+            "threshold_ms": round(self.threshold * 1000, 1),
+            "interval_ms": round(self.interval * 1000, 1),
+            "profiles": self._list()
+        }
+
+    def _run(self):
+        own = threading.get_ident()
+        while self.enabled:
+            now = time.perf_counter()
+            names = {t.ident: t.name for t in threading.enumerate()}
+            taken = []
+            for ident, frame in sys._current_frames().items():
+                if ident == own: continue
+                leaf = frame.f_code
+                # Спящие потоки (ожидание в select/очереди) только раздувают профиль
+                if (os.path.basename(leaf.co_filename), leaf.co_name) in IDLE_LEAVES:
+                    continue
+                codes = []
+                while frame is not None:
+                    codes.append(frame.f_code)
+                    frame = frame.f_back
+                taken.append((now, names.get(ident, str(ident)), tuple(reversed(codes))))
+            with self._lock:
+                self.samples.extend(taken)
+                horizon = now - PROFILE_WINDOW
+                while self.samples and self.samples[0][0] < horizon:
+                    self.samples.popleft()
+            time.sleep(self.interval)
+
+    def wants(self, duration):
+        return self.enabled and duration >= self.threshold
+
+    def finish(self, method, route, start, duration):
+        # Блокирующая запись на диск: вызывать из потока
+        if not self.wants(duration): return
+        end = start + duration
+        with self._lock:
+            window = [s for s in self.samples if start <= s[0] <= end]
+        if not window: return
+        folded = Counter(";".join([thread] + [_frame_name(c) for c in codes]) for _, thread, codes in window)
+        name = f"{time.strftime('%Y%m%d-%H%M%S')}-{int(duration * 1000)}ms-{route.strip('/').replace('/', '_') or 'root'}.folded"
+        try:
+            os.makedirs(PROFILE_DIR, exist_ok=True)
+            with open(os.path.join(PROFILE_DIR, name), 'w') as f:
+                f.write(f"# {method} {route} {duration * 1000:.1f}ms, {len(window)} samples\n")
+                for stack, count in folded.most_common():
+                    f.write(f"{stack} {count}\n")
+        except OSError as e:
+            print(f"Profiler: cannot save {name}: {e}")
+            return
+        with self._lock:
+            # Несколько медленных запросов могут дописывать профили параллельно
+            dropped = self.profiles[0]["name"] if len(self.profiles) == self.profiles.maxlen else None
+            self.profiles.append({"name": name, "method": method, "route": route, "duration_ms": round(duration * 1000, 1), "samples": len(window)})
+        if dropped is not None:
+            try:
+                os.remove(os.path.join(PROFILE_DIR, dropped))
+            except OSError:
+                pass
+
+    def _list(self):
+        with self._lock:
+            return list(self.profiles)
+
+    def read_profile(self, name):
+        if name not in {p["name"] for p in self._list()}:
+            return None
+        with open(os.path.join(PROFILE_DIR, name), 'r') as f:
+            return f.read()
+
+profiler = SlowRequestProfiler()
+if os.getenv("PROFILER") == "1":
+    profiler.configure(enabled=True)
+
+def render_metrics():
+    lines = []
+    for metric in METRICS:
+        lines.extend(metric.render())
+    # Процесс целиком: включая чтение, которое не привязано к запросам
+    proc = psutil.Process()
+    try:
+        io = proc.io_counters()
+        lines += ["# HELP letto_process_read_bytes_total Bytes read by the server process (storage layer)",
+                  "# TYPE letto_process_read_bytes_total counter",
+                  f"letto_process_read_bytes_total {io.read_bytes}",
+                  "# HELP letto_process_read_chars_total Bytes passed to read() syscalls, page cache included",
+                  "# TYPE letto_process_read_chars_total counter",
+                  f"letto_process_read_chars_total {getattr(io, 'read_chars', io.read_bytes)}"]
+    except (psutil.Error, AttributeError):
+        pass
+    lines += ["# HELP letto_process_resident_memory_bytes Resident memory size",
+              "# TYPE letto_process_resident_memory_bytes gauge",
+              f"letto_process_resident_memory_bytes {proc.memory_info().rss}"]
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,242 @@
+import os
+import time
+import fcntl
+import asyncio
+import hashlib
+import secrets
+from collections import OrderedDict
+
+from api.tail import sse_event
+from api.paths import STATE_DIR
+from api.cache import shared_cache
+
+# Фоновые задачи для долгих git-операций (sync, checkout).
+# HTTP-обработчик только ставит задачу и сразу возвращает её id; сама работа
+# идёт отдельной asyncio-задачей. На один репозиторий — один замок: задачи
+# по нему выполняются строго по очереди, по разным — параллельно. Замок —
+# flock на файл в scripts/ (как у лидера в api/cluster.py), так что и при
+# нескольких воркерах два git pull в один репозиторий не пойдут одновременно.
+# Ход выполнения (шаги) хранится в задаче и рассылается подписчикам SSE;
+# подключившийся позже клиент сначала получает уже пройденные шаги.
+# С общим кэшем запись задачи (снимок и история) выкладывается туда на каждом
+# шаге: другой воркер отдаёт её по id и стримит, опрашивая кэш.
+
+MAX_JOBS = 50          # сколько завершённых задач держим для просмотра
+QUEUE_SIZE = 256
+LOCK_POLL = 0.2        # как часто пробуем взять flock репозитория, занятый другим воркером
+REMOTE_POLL = 0.5      # как часто воркер перечитывает из общего кэша чужую задачу
+PING_INTERVAL = 15
+
+def _key(job_id):
+    return f"job:{job_id}"
+
+def _close(queue):
+    # None — конец потока; место под него освобождаем, если очередь забита
+    while queue.full():
+        queue.get_nowait()
+    queue.put_nowait(None)
+
+class Job:
+    def __init__(self, kind, repo, params):
+        self.id = secrets.token_hex(6)
+        self.kind = kind
+        self.repo = repo
+        self.params = params
+        self.state = "queued"        # queued -> running -> done | failed
+        self.steps = []
+        self.result = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.history = []            # готовые SSE-сообщения для позднего подписчика
+        self.subscribers = set()
+
+    def snapshot(self):
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "params": self.params,
+            "state": self.state,
+            "steps": self.steps,
+            "result": self.result,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at
+        }
+
+    @property
+    def finished(self):
+        return self.state in ("done", "failed")
+
+    def _store(self):
+        # Синхронная запись: SQLite в /dev/shm, строка маленькая, а шаги приходят из кода задачи
+        if shared_cache.shared:
+            shared_cache.set(_key(self.id), {"job": self.snapshot(), "history": self.history})
+
+    def _publish(self, event, data):
+        message = sse_event(event, data)
+        self.history.append(message)
+        self._store()
+        for queue in list(self.subscribers):
+            try:
+                queue.put_nowait(message)
+            except asyncio.QueueFull:
+                # Не успевающий клиент не должен тормозить задачу; переподключившись, получит историю
+                self.subscribers.discard(queue)
+                _close(queue)
+
+    def step(self, name, message="", status="ok"):
+        # Вызывается из кода задачи: отметка о пройденном шаге
+        entry = {"step": name, "status": status, "message": message, "ts": time.time()}
+        self.steps.append(entry)
+        self._publish("step", entry)
+
+    def _set_state(self, state):
+        self.state = state
+        self._publish("state", {"state": state})
+
+    async def events(self):
+        # SSE: история, затем живые события до завершения задачи
+        queue = asyncio.Queue(QUEUE_SIZE)
+        backlog = list(self.history)
+        if not self.finished:
+            self.subscribers.add(queue)
+        try:
+            for message in backlog:
+                yield message
+            if self.finished: return
+            while True:
+                try:
+                    message = await asyncio.wait_for(queue.get(), 15)
+                except asyncio.TimeoutError:
+                    yield ": ping\n\n"
+                    continue
+                if message is None: return
+                yield message
+        finally:
+            self.subscribers.discard(queue)
+
+class RemoteJob:
+    # Задача другого воркера: снимок и история из общего кэша
+    def __init__(self, data):
+        self.data = data
+
+    def snapshot(self):
+        return self.data["job"]
+
+    async def events(self):
+        sent, last = 0, time.monotonic()
+        data = self.data
+        while True:
+            history = data["history"]
+            for message in history[sent:]:
+                yield message
+                last = time.monotonic()
+            sent = len(history)
+            if data["job"]["state"] in ("done", "failed"): return
+            if time.monotonic() - last >= PING_INTERVAL:
+                yield ": ping\n\n"
+                last = time.monotonic()
+            await asyncio.sleep(REMOTE_POLL)
+            entry = await asyncio.to_thread(shared_cache.get, _key(data["job"]["id"]))
+            if entry is None: return
+            data = entry[0]
+
+class RepoLock:
+    # flock на файл репозитория: ядро снимет его и при падении воркера посреди задачи
+    def __init__(self, repo):
+        tag = hashlib.sha1(os.path.realpath(repo).encode()).hexdigest()[:12]
+        self.path = os.path.join(STATE_DIR, f"repo-{tag}.lock")
+        self.fd = None
+
+    async def __aenter__(self):
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        while True:
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                break
+            except BlockingIOError:
+                await asyncio.sleep(LOCK_POLL)
+            except BaseException:
+                os.close(fd)
+                raise
+        self.fd = fd
+        return self
+
+    async def __aexit__(self, *exc):
+        # Закрытие дескриптора снимает flock
+        os.close(self.fd)
+        self.fd = None
+
+class JobRunner:
+    def __init__(self):
+        self.jobs = OrderedDict()
+        self._locks = {}         # repo -> asyncio.Lock: очередь внутри процесса, до flock
+        self._tasks = set()
+
+    def submit(self, kind, repo, func, params=None, on_done=None):
+        # func(job) — корутина, возвращает dict с "success" и "message"
+        job = Job(kind, repo, params or {})
+        self.jobs[job.id] = job
+        job._store()
+        self._trim()
+        task = asyncio.create_task(self._run(job, func, on_done))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return job
+
+    async def get(self, job_id):
+        job = self.jobs.get(job_id)
+        if job is not None or not shared_cache.shared:
+            return job
+        entry = await asyncio.to_thread(shared_cache.get, _key(job_id))
+        return RemoteJob(entry[0]) if entry is not None else None
+
+    async def list(self):
+        jobs = {job.id: job.snapshot() for job in self.jobs.values()}
+        if shared_cache.shared:
+            for job in await asyncio.to_thread(self._shared_snapshots):
+                jobs.setdefault(job["id"], job)
+        return sorted(jobs.values(), key=lambda job: job["created_at"], reverse=True)[:MAX_JOBS]
+
+    def _shared_snapshots(self):
+        snapshots = []
+        for key in shared_cache.keys("job:"):
+            entry = shared_cache.get(key)
+            if entry is not None: snapshots.append(entry[0]["job"])
+        return snapshots
+
+    def _trim(self):
+        finished = [job_id for job_id, job in self.jobs.items() if job.finished]
+        for job_id in finished[:max(0, len(self.jobs) - MAX_JOBS)]:
+            del self.jobs[job_id]
+        if shared_cache.shared:
+            # Общий список чистит тот воркер, который добавляет задачу
+            snapshots = sorted(self._shared_snapshots(), key=lambda job: job["created_at"])
+            finished = [job["id"] for job in snapshots if job["state"] in ("done", "failed")]
+            for job_id in finished[:max(0, len(snapshots) - MAX_JOBS)]:
+                shared_cache.delete(_key(job_id))
+
+    async def _run(self, job, func, on_done):
+        lock = self._locks.setdefault(job.repo, asyncio.Lock())
+        async with lock, RepoLock(job.repo):
+            job.started_at = time.time()
+            job._set_state("running")
+            try:
+                result = await func(job)
+            except Exception as e:
+                result = {"success": False, "message": f"{job.kind} failed: {e}"}
+            job.result = result
+            job.finished_at = time.time()
+            job._publish("result", result)
+            job._set_state("done" if result.get("success") else "failed")
+            for queue in list(job.subscribers):
+                _close(queue)
+            job.subscribers.clear()
+        if on_done:
+            try:
+                on_done(job)
+            except Exception as e:
+                print(f"Job {job.id} on_done error: {e}")
+
+job_runner = JobRunner()
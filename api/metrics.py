@@ -0,0 +1,158 @@
+import time
+import threading
+from array import array
+
+import psutil
+
+# Фоновый сэмплер системных метрик. Раз в секунду снимает CPU (общий и по ядрам),
+# RAM, диск, скорость дискового I/O и сети в кольцевые буферы на array('d'),
+# параллельно сворачивая их в минутные и часовые средние.
+# HTTP-запросы читают готовые значения и psutil не трогают.
+
+SAMPLE_INTERVAL = 1.0
+FIELDS = ("cpu", "ram", "disk", "disk_read", "disk_write", "net_sent", "net_recv")
+RESOLUTIONS = {
+    "raw": (SAMPLE_INTERVAL, 3600),   # час посекундно
+    "minute": (60, 1440),             # сутки поминутно
+    "hour": (3600, 24 * 30)           # месяц по часам
+}
+
+class RingBuffer:
+    def __init__(self, capacity, cores):
+        self.capacity = capacity
+        self.ts = array('d', bytes(8 * capacity))
+        self.series = {f: array('d', bytes(8 * capacity)) for f in FIELDS}
+        self.cores = [array('d', bytes(8 * capacity)) for _ in range(cores)]
+        self.head = 0    # индекс следующей записи
+        self.count = 0
+
+    def append(self, ts, values, cores):
+        i = self.head
+        self.ts[i] = ts
+        for f in FIELDS:
+            self.series[f][i] = values[f]
+        for core, value in zip(self.cores, cores):
+            core[i] = value
+        self.head = (i + 1) % self.capacity
+        self.count = min(self.count + 1, self.capacity)
+
+    def _indexes(self, since):
+        # Индексы в хронологическом порядке с ts > since
+        start = (self.head - self.count) % self.capacity
+        order = [(start + k) % self.capacity for k in range(self.count)]
+        return [i for i in order if self.ts[i] > since]
+
+    def columns(self, since=0):
+        idx = self._indexes(since)
+        result = {"ts": [self.ts[i] for i in idx]}
+        for f in FIELDS:
+            column = self.series[f]
+            result[f] = [round(column[i], 2) for i in idx]
+        result["per_core"] = [[round(core[i], 1) for i in idx] for core in self.cores]
+        return result
+
+class Rollup:
+    # Копит сумму сэмплов текущего интервала и сбрасывает среднее в буфер
+    def __init__(self, interval, buffer):
+        self.interval = interval
+        self.buffer = buffer
+        self.bucket = None
+        self.n = 0
+        self.sums = dict.fromkeys(FIELDS, 0.0)
+        self.core_sums = [0.0] * len(buffer.cores)
+
+    def add(self, ts, values, cores):
+        bucket = int(ts // self.interval) * self.interval
+        if self.bucket is not None and bucket != self.bucket:
+            self.flush()
+        self.bucket = bucket
+        self.n += 1
+        for f in FIELDS:
+            self.sums[f] += values[f]
+        for k, value in enumerate(cores):
+            self.core_sums[k] += value
+
+    def flush(self):
+        if not self.n: return
+        self.buffer.append(
+            self.bucket,
+            {f: s / self.n for f, s in self.sums.items()},
+            [s / self.n for s in self.core_sums]
+        )
+        self.n = 0
+        self.sums = dict.fromkeys(FIELDS, 0.0)
+        self.core_sums = [0.0] * len(self.core_sums)
+
+class MetricsSampler:
+    def __init__(self):
+        self.cores = psutil.cpu_count() or 1
+        self.buffers = {name: RingBuffer(capacity, self.cores) for name, (_, capacity) in RESOLUTIONS.items()}
+        self.rollups = [Rollup(RESOLUTIONS[name][0], self.buffers[name]) for name in ("minute", "hour")]
+        self.latest = None
+        self.lock = threading.Lock()
+        self._thread = None
+        self._stop = threading.Event()
+        self._prev = None
+
+    def start(self):
+        if self._thread is not None: return
+        self._thread = threading.Thread(target=self._run, name="metrics-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        # Первый вызов cpu_percent() только инициализирует счётчики psutil
+        psutil.cpu_percent()
+        psutil.cpu_percent(percpu=True)
+        self._prev = (time.time(), self._io_totals())
+        while not self._stop.wait(SAMPLE_INTERVAL):
+            try:
+                self.sample()
+            except Exception as e:
+                print(f"Metrics sampler error: {e}")
+
+    def _io_totals(self):
+        disk = psutil.disk_io_counters()
+        net = psutil.net_io_counters()
+        return (
+            disk.read_bytes if disk else 0, disk.write_bytes if disk else 0,
+            net.bytes_sent if net else 0, net.bytes_recv if net else 0
+        )
+
+    def sample(self):
+        now = time.time()
+        totals = self._io_totals()
+        prev_ts, prev_totals = self._prev
+        dt = max(now - prev_ts, 1e-6)
+        # Скорости в байтах/с; отрицательная дельта — счётчики сбросились
+        rates = [max(0, cur - old) / dt for cur, old in zip(totals, prev_totals)]
+        self._prev = (now, totals)
+        values = {
+            "cpu": psutil.cpu_percent(),
+            "ram": psutil.virtual_memory().percent,
+            "disk": psutil.disk_usage('/').percent,
+            "disk_read": rates[0],
+            "disk_write": rates[1],
+            "net_sent": rates[2],
+            "net_recv": rates[3]
+        }
+        cores = psutil.cpu_percent(percpu=True)
+        with self.lock:
+            self.buffers["raw"].append(now, values, cores)
+            for rollup in self.rollups:
+                rollup.add(now, values, cores)
+            self.latest = dict(values, ts=now, per_core=cores)
+
+    def history(self, since=0, resolution="raw"):
+        if resolution not in RESOLUTIONS:
+            raise ValueError(f"Unknown resolution: {resolution}")
+        with self.lock:
+            data = self.buffers[resolution].columns(since)
+        data["resolution"] = resolution
+        data["interval"] = RESOLUTIONS[resolution][0]
+        data["cores"] = self.cores
+        return data
+
+sampler = MetricsSampler()
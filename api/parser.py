@@ -1,49 +1,163 @@
-import os
-import subprocess
 import re
+import json
+import time
+import codecs
+import subprocess
+
+from api.paths import OPENCLAW_CLI
+
+# Единый парсер вывода `openclaw sessions list`.
+# Предпочитаем JSON: вывод копится кусками и разбирается одним json.loads в конце —
+# это быстрее и экономнее потокового raw_decode (см. benchmarks/bench_parser.py).
+# Если CLI отдал таблицу для человека (или JSON не разобрался) — разбираем её
+# построчно заранее скомпилированными регулярками. Наружу — все сессии
+# в одном формате: key, kind, model, used, total, percent, age (секунды).
+
+CLI_PATH = OPENCLAW_CLI
+CONTEXT_LIMIT = 1048576
+READ_SIZE = 64 * 1024
+
+# Формат строки: direct agent:main:main 1m ago google/... 486k/1049k (46%)
+# Числа и единицы — отдельными группами, чтобы не разбирать строки второй раз
+_LINE_RE = re.compile(
+    r"^\s*(?P<kind>\S+)\s+(?P<key>\S+)\s+"
+    r"(?:(?P<age>[\d.]+)\s*(?P<age_unit>[smhdw])\w*\s+ago|just now|\S+)\s+"
+    r"(?P<model>\S+)\s+(?P<used>[\d.]+)\s*(?P<used_unit>[km]?)\s*/\s*(?P<total>[\d.]+)\s*(?P<total_unit>[km]?)\s*\([\d.]+%\)",
+    re.IGNORECASE
+)
+_UNITS = {"": 1, "k": 1000, "m": 1000000, "K": 1000, "M": 1000000}
+_AGE_UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400, "w": 604800}
+
+def to_num(s):
+    s = s.lower().replace(' ', '')
+    if s.endswith('k'): return int(float(s[:-1]) * 1000)
+    if s.endswith('m'): return int(float(s[:-1]) * 1000000)
+    return int(float(s))
+
+def _session(key, kind, model, used, total, age):
+    total = total or CONTEXT_LIMIT
+    return {
+        "key": key,
+        "kind": kind,
+        "model": model or "unknown",
+        "used": used,
+        "total": total,
+        "percent": round(used / total * 100, 1),
+        "age": age
+    }
+
+def _from_json(item, now):
+    get = item.get
+    used = int(get("totalTokens") or 0)
+    total = int(get("contextTokens") or 0)
+    age_ms = get("ageMs")
+    if age_ms is not None:
+        age = int(age_ms / 1000)
+    else:
+        updated = get("updatedAt")
+        # updatedAt бывает в миллисекундах
+        age = max(0, int(now - (updated / 1000 if updated > 1e12 else updated))) if isinstance(updated, (int, float)) else None
+    return _session(get("key", ""), get("kind"), get("model"), used, total, age)
+
+def _from_line(line):
+    match = _LINE_RE.match(line)
+    if not match: return None
+    kind, key, age, age_unit, model, used, used_unit, total, total_unit = match.groups()
+    if age is not None:
+        age = int(float(age) * _AGE_UNITS[age_unit.lower()])
+    elif "just now" in line:
+        age = 0
+    return _session(key, kind, model, int(float(used) * _UNITS[used_unit]), int(float(total) * _UNITS[total_unit]), age)
+
+class SessionStreamParser:
+    # feed(bytes) -> список разобранных сессий; формат определяется по первому символу
+    def __init__(self):
+        self.mode = None          # "json" | "text"
+        self.buffer = ""
+        self.parts = []
+        self.now = time.time()
+        self._text = codecs.getincrementaldecoder('utf-8')(errors='replace')
+
+    def feed(self, chunk, final=False):
+        if self.mode is None:
+            self.parts.append(chunk)
+            head = b"".join(self.parts).lstrip()
+            if not head and not final: return []
+            self.mode = "json" if head[:1] in (b"[", b"{") else "text"
+            if self.mode == "text":
+                chunk, self.parts = b"".join(self.parts), []
+        elif self.mode == "json":
+            self.parts.append(chunk)
+        if self.mode == "json": return self._feed_json(final)
+        self.buffer += self._text.decode(chunk, final)
+        return self._feed_text(final)
+
+    def _feed_json(self, final):
+        # JSON (массив или {"sessions": [...]}) — только целиком, байты без перекодировки
+        if not final: return []
+        output, self.parts = b"".join(self.parts), []
+        try:
+            data = json.loads(output)
+        except ValueError:
+            # Не JSON, хоть и начинается со скобки — пробуем табличный вывод
+            self.buffer = output.decode('utf-8', errors='replace')
+            return self._feed_text(final)
+        if isinstance(data, dict):
+            data = data.get("sessions", [])
+        if not isinstance(data, list): return []
+        return [_from_json(item, self.now) for item in data if isinstance(item, dict)]
+
+    def _feed_text(self, final):
+        lines = self.buffer.split("\n")
+        self.buffer = "" if final else lines.pop()
+        sessions = []
+        for line in lines:
+            session = _from_line(line)
+            if session: sessions.append(session)
+        return sessions
+
+def parse_sessions(output):
+    # Разбор готового вывода (str или bytes)
+    if isinstance(output, str):
+        output = output.encode('utf-8')
+    return SessionStreamParser().feed(output, final=True)
+
+def pick_main(sessions):
+    # Главная сессия: agent:main:main, затем любая main, затем первая direct
+    for test in (
+        lambda s: s["key"] == "agent:main:main",
+        lambda s: "main" in s["key"],
+        lambda s: s["kind"] == "direct",
+        lambda s: True
+    ):
+        for session in sessions:
+            if test(session): return session
+    return None
+
+def list_sessions(cli_path=CLI_PATH, timeout=20):
+    # Синхронный вариант для скриптов; сервер ходит через api/ai_context.py
+    proc = subprocess.Popen([cli_path, "sessions", "list"], stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+    parser = SessionStreamParser()
+    sessions = []
+    try:
+        deadline = time.monotonic() + timeout
+        while True:
+            chunk = proc.stdout.read1(READ_SIZE)
+            if not chunk: break
+            sessions.extend(parser.feed(chunk))
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"openclaw timed out after {timeout}s")
+        sessions.extend(parser.feed(b"", final=True))
+    finally:
+        proc.kill()
+        proc.wait()
+    return sessions
 
 def get_latest_context():
     try:
-        # Прямой вызов CLI — самый надежный способ получить то, что видит человек в консоли
-        # Используем --limit 1 чтобы найти только основную активную сессию
-        output = subprocess.check_output("openclaw sessions list", shell=True).decode('utf-8', errors='ignore')
-        
-        # Ищем строку с главной сессией: agent:main:main
-        lines = output.splitlines()
-        for line in lines:
-            if "agent:main:main" in line:
-                # Извлекаем модель и токены
-                # Формат: direct agent:main:main 1m ago google/... 486k/1049k (46%)
-                match = re.search(r"(\S+)\s+([\d\.]+[km]?)\s*/\s*([\d\.]+[km]?)\s*\(([\d\.]+)%\)", line)
-                if match:
-                    model_path, used_str, limit_str, percent_str = match.groups()
-                    
-                    def to_num(s):
-                        s = s.lower().replace(' ', '')
-                        if 'k' in s: return int(float(s.replace('k','')) * 1000)
-                        if 'm' in s: return int(float(s.replace('m','')) * 1000000)
-                        return int(float(s))
-                    
-                    return {
-                        "used": to_num(used_str),
-                        "total": to_num(limit_str),
-                        "percent": int(float(percent_str)),
-                        "model": model_path.split('/')[-1]
-                    }
-        
-        # Если главная сессия не найдена (редко), берем первую с Kind direct
-        for line in lines:
-            if "direct" in line:
-                match = re.search(r"(\S+)\s+([\d\.]+[km]?)\s*/\s*([\d\.]+[km]?)\s*\(([\d\.]+)%\)", line)
-                if match:
-                    model_path, used_str, limit_str, percent_str = match.groups()
-                    return {
-                        "used": to_num(used_str),
-                        "total": to_num(limit_str),
-                        "percent": int(float(percent_str)),
-                        "model": model_path.split('/')[-1]
-                    }
+        main = pick_main(list_sessions())
+        if main:
+            return {"used": main["used"], "total": main["total"], "percent": main["percent"], "model": main["model"]}
     except Exception as e:
         print(f"CLI Parser Error: {e}")
-    
     return None
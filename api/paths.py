@@ -0,0 +1,19 @@
+import os
+
+# Все внешние пути дашборда в одном месте. По умолчанию — боевая раскладка
+# на сервере; переменные окружения позволяют поднять дашборд поверх другого
+# дерева (так делает benchmarks/ с синтетическим воркспейсом).
+
+DASHBOARD_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+OPENCLAW_HOME = os.getenv("OPENCLAW_HOME", "/home/max/.openclaw")
+WORKSPACE_ROOT = os.path.join(OPENCLAW_HOME, "workspace")
+PROJECTS_ROOT = os.path.join(WORKSPACE_ROOT, "projects")
+CRON_FILE = os.path.join(OPENCLAW_HOME, "cron/jobs.json")
+HB_STATE_FILE = os.path.join(WORKSPACE_ROOT, "memory/heartbeat-state.json")
+HEARTBEAT_FILE = os.path.join(WORKSPACE_ROOT, "HEARTBEAT.md")
+# Рабочая копия дашборда, с которой работают git-вкладка и sync
+GIT_ROOT = os.getenv("DASHBOARD_GIT_ROOT", os.path.join(PROJECTS_ROOT, "dashboard"))
+OPENCLAW_CLI = os.getenv("OPENCLAW_CLI", "/home/max/.nvm/versions/node/v22.22.0/bin/openclaw")
+# Служебные файлы дашборда: манифест бэкапов, кэши AI-статуса и переводов
+STATE_DIR = os.getenv("DASHBOARD_STATE_DIR", os.path.join(DASHBOARD_ROOT, "scripts"))
@@ -1,42 +1,165 @@
 import os
-import subprocess
+import time
+import asyncio
 import datetime
+from concurrent.futures import ThreadPoolExecutor
 
-PROJECTS_ROOT = "/home/max/.openclaw/workspace/projects"
+from api.paths import PROJECTS_ROOT
+from api.gitexec import git, repo_stamp
+from api.state import save_snapshot, load_snapshot
 
-def get_projects_list():
+# Индекс метаданных проектов. Базовые поля (remote из .git/config) читаются
+# без форков и кэшируются по mtime файлов .git; "тяжёлые" поля
+# (последний коммит, dirty, размер) считаются лениво и параллельно.
+# Индекс переживает перезапуск через снимок: записи сверяются по тем же отпечаткам,
+# детали — ещё и по возрасту (DETAILS_TTL считается от момента расчёта, а не старта).
+DETAILS_TTL = 60
+SNAPSHOT_NAME = "projects"
+
+_pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix="projects")
+_entries = {}   # name -> (stamp, entry)
+_details = {}   # name -> (stamp, computed_at, details)
+
+def _git_stamp(path):
+    # mtime самого каталога .git не годится: его двигает даже git status,
+    # переписывающий index. Берём HEAD/refs/config — они меняются только по делу.
+    return repo_stamp(path)
+
+def _read_origin(path):
+    # url из секции [remote "origin"]; None — если конфиг не читается как обычно
+    # (worktree/submodule с .git-файлом) и нужен сам git
+    config_path = os.path.join(path, ".git", "config")
+    try:
+        with open(config_path, 'r', errors='replace') as f:
+            section = None
+            for line in f:
+                line = line.strip()
+                if line.startswith('['):
+                    section = line.replace(' ', '').replace('\t', '')
+                elif section == '[remote"origin"]' and '=' in line:
+                    key, value = line.split('=', 1)
+                    if key.strip().lower() == 'url':
+                        return value.strip()
+    except OSError:
+        return None
+    return "No remote origin"
+
+async def _remote_url(path):
+    try:
+        return (await git(path, "remote", "get-url", "origin", cache=True)).strip()
+    except:
+        return "No remote origin"
+
+def _project_entry(name):
+    full_path = os.path.join(PROJECTS_ROOT, name)
+    stamp = _git_stamp(full_path)
+    cached = _entries.get(name)
+    if cached and cached[0] == stamp:
+        return cached[1]
+    has_git = os.path.exists(os.path.join(full_path, ".git"))
+    entry = {
+        "name": name,
+        "path": full_path,
+        "has_git": has_git,
+        "remote_url": _read_origin(full_path) if has_git else None
+    }
+    _entries[name] = (stamp, entry)
+    return entry
+
+def _dir_size(path):
+    total = 0
+    stack = [path]
+    while stack:
+        try:
+            with os.scandir(stack.pop()) as it:
+                for entry in it:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            stack.append(entry.path)
+                        elif entry.is_file(follow_symlinks=False):
+                            total += entry.stat(follow_symlinks=False).st_size
+                    except OSError:
+                        continue
+        except OSError:
+            continue
+    return total
+
+async def _compute_details(entry):
+    path = entry["path"]
+    loop = asyncio.get_running_loop()
+    size_future = loop.run_in_executor(_pool, _dir_size, path)
+    details = {"last_commit": None, "dirty": None, "size": 0}
+    if entry["has_git"]:
+        log_raw, status_raw = await asyncio.gather(
+            git(path, "log", "-1", "--format=%h|%ct|%s", cache=True),
+            git(path, "status", "--porcelain", "--untracked-files=normal"),
+            return_exceptions=True
+        )
+        if isinstance(log_raw, str) and log_raw.count('|') >= 2:
+            short_hash, ts, msg = log_raw.strip().split('|', 2)
+            details["last_commit"] = {
+                "hash": short_hash,
+                "msg": msg,
+                "date": datetime.datetime.fromtimestamp(int(ts)).isoformat()
+            }
+        if isinstance(status_raw, str):
+            details["dirty"] = bool(status_raw.strip())
+    details["size"] = await size_future
+    return details
+
+async def get_project_details(entry):
+    name = entry["name"]
+    stamp = _git_stamp(entry["path"])
+    cached = _details.get(name)
+    # dirty и размер зависят от рабочего дерева, а не только от .git — поэтому ещё и TTL
+    if cached and cached[0] == stamp and time.monotonic() - cached[1] < DETAILS_TTL:
+        return cached[2]
+    details = await _compute_details(entry)
+    _details[name] = (stamp, time.monotonic(), details)
+    return details
+
+def save_index():
+    # monotonic другого процесса бессмыслен — в снимок идёт время расчёта по часам
+    offset = time.time() - time.monotonic()
+    save_snapshot(SNAPSHOT_NAME, {
+        "root": PROJECTS_ROOT,
+        "entries": {name: [stamp, entry] for name, (stamp, entry) in _entries.items()},
+        "details": {name: [stamp, computed_at + offset, fields] for name, (stamp, computed_at, fields) in _details.items()}
+    })
+
+def restore_index():
+    snapshot = load_snapshot(SNAPSHOT_NAME)
+    if not snapshot or snapshot.get("root") != PROJECTS_ROOT: return
+    offset = time.time() - time.monotonic()
+    try:
+        for name, (stamp, entry) in snapshot["entries"].items():
+            _entries.setdefault(name, (tuple(stamp), entry))
+        for name, (stamp, computed_at, fields) in snapshot["details"].items():
+            _details.setdefault(name, (tuple(stamp), computed_at - offset, fields))
+    except (KeyError, TypeError, ValueError) as e:
+        print(f"Projects snapshot ignored: {e}")
+
+async def get_projects_list(details=False):
     if not os.path.exists(PROJECTS_ROOT):
         return []
-    
+
     projects = []
     try:
         items = sorted(os.listdir(PROJECTS_ROOT))
-        for item in items:
-            full_path = os.path.join(PROJECTS_ROOT, item)
-            if os.path.isdir(full_path):
-                # 1. Проверяем наличие .git
-                git_dir = os.path.join(full_path, ".git")
-                has_git = os.path.exists(git_dir)
-                
-                # 2. Получаем Remote URL
-                remote_url = None
-                if has_git:
-                    try:
-                        remote_url = subprocess.check_output(
-                            ["git", "remote", "get-url", "origin"],
-                            cwd=full_path, text=True, stderr=subprocess.DEVNULL
-                        ).strip()
-                    except:
-                        remote_url = "No remote origin"
-
-                # 3. Базовая инфа
-                projects.append({
-                    "name": item,
-                    "path": full_path,
-                    "has_git": has_git,
-                    "remote_url": remote_url
-                })
+        names = [item for item in items if os.path.isdir(os.path.join(PROJECTS_ROOT, item))]
+        projects = [dict(_project_entry(name)) for name in names]
+
+        # git нужен только там, где конфиг не удалось прочитать напрямую
+        unresolved = [p for p in projects if p["has_git"] and p["remote_url"] is None]
+        urls = await asyncio.gather(*(_remote_url(p["path"]) for p in unresolved))
+        for project, url in zip(unresolved, urls):
+            project["remote_url"] = url
+
+        if details:
+            extra = await asyncio.gather(*(get_project_details(p) for p in projects))
+            for project, fields in zip(projects, extra):
+                project.update(fields)
     except Exception as e:
         print(f"Error in get_projects_list: {e}")
-        
+
     return projects
@@ -0,0 +1,66 @@
+import json
+import asyncio
+
+from api.status import collect_status, SECTIONS
+
+# Единый издатель статуса для push-канала (SSE).
+# Раз в тик собирает секции один раз на всех подписчиков, сравнивает
+# с прошлым снимком и рассылает только изменившиеся ключи.
+
+TICK = 2.0
+QUEUE_SIZE = 32
+# Дерево слишком тяжёлое для каждого тика: explorer берёт его через /api/files/list и /api/files/tree
+STREAM_SECTIONS = [name for name in SECTIONS if name != "tree"]
+
+def sse_event(event, data):
+    return f"event: {event}\ndata: {data}\n\n"
+
+class StatusPublisher:
+    def __init__(self):
+        self.subscribers = set()
+        self.snapshot = {}
+        self._task = None
+
+    def subscribe(self):
+        queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+        self.subscribers.add(queue)
+        # Издатель крутится, только пока есть хотя бы один подписчик
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+        return queue
+
+    def unsubscribe(self, queue):
+        self.subscribers.discard(queue)
+
+    def snapshot_event(self):
+        if not self.snapshot: return None
+        return sse_event("status", json.dumps(self.snapshot, ensure_ascii=False))
+
+    async def _run(self):
+        while self.subscribers:
+            try:
+                await self.tick()
+            except Exception as e:
+                print(f"Status publisher error: {e}")
+            await asyncio.sleep(TICK)
+
+    async def tick(self):
+        status = await collect_status(STREAM_SECTIONS)
+        changed = {k: v for k, v in status.items() if self.snapshot.get(k) != v}
+        if not changed: return
+        self.snapshot.update(changed)
+        self.publish(sse_event("status", json.dumps(changed, ensure_ascii=False)))
+
+    def publish(self, message):
+        # Сообщение кодируется один раз; медленный клиент, не успевающий читать,
+        # отключается — EventSource переподключится и получит свежий снимок
+        for queue in list(self.subscribers):
+            try:
+                queue.put_nowait(message)
+            except asyncio.QueueFull:
+                self.subscribers.discard(queue)
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait(None)
+
+publisher = StatusPublisher()
@@ -0,0 +1,162 @@
+import os
+import mmap
+import bisect
+import threading
+from collections import OrderedDict
+
+from api.instrument import count_read
+
+# Постраничное чтение файлов через mmap. Страницы режутся по байтовым смещениям,
+# выровненным на начало строки (или хотя бы на границу UTF-8 символа),
+# а разреженный индекс строк позволяет прыгать к строке N без сканирования файла.
+
+PAGE_SIZE = 1024 * 1024
+MIN_PAGE_SIZE = 4 * 1024
+MAX_PAGE_SIZE = 8 * 1024 * 1024
+LINE_SEEK = 64 * 1024              # насколько далеко ищем перевод строки для выравнивания
+CHECKPOINT_BYTES = 1024 * 1024     # шаг разреженного индекса строк
+TAIL_CHECK = 4096                  # сколько последних проиндексированных байт сверяем при дописывании
+INDEX_CACHE_SIZE = 32
+
+_indexes = OrderedDict()   # path -> LineIndex, LRU
+_indexes_lock = threading.Lock()
+
+class RangeNotSatisfiable(Exception):
+    def __init__(self, size):
+        super().__init__(f"Range not satisfiable (file size {size})")
+        self.size = size
+
+class LineIndex:
+    # Контрольные точки (lines, offset): lines — число '\n' в [0, offset)
+    def __init__(self, ino):
+        self.ino = ino
+        self.size = 0
+        self.mtime_ns = 0
+        self.tail = b''            # последние байты проиндексированной части
+        self.lines = [0]
+        self.offsets = [0]
+
+    def appended(self, mm, st):
+        # Файл только дописан: тот же inode, не меньше и конец прежней части на месте.
+        # Перезапись на месте (тот же inode, размер не меньше) хвост не сохранит — индекс строится заново
+        if st.st_ino != self.ino or st.st_size < self.size: return False
+        if st.st_mtime_ns == self.mtime_ns and st.st_size == self.size: return True
+        return mm[max(0, self.size - TAIL_CHECK):self.size] == self.tail
+
+    def extend(self, mm, size):
+        # Для логов, которые только дописываются, досчитываем с последней точки
+        pos, count = self.offsets[-1], self.lines[-1]
+        while pos < size:
+            end = min(pos + CHECKPOINT_BYTES, size)
+            count += mm[pos:end].count(b'\n')
+            pos = end
+            self.lines.append(count)
+            self.offsets.append(pos)
+        self.size = size
+        self.tail = mm[max(0, size - TAIL_CHECK):size]
+
+    def total_lines(self, mm):
+        if not self.size: return 0
+        return self.lines[-1] + (0 if mm[self.size - 1] == 0x0A else 1)
+
+    def line_offset(self, mm, line):
+        # Смещение начала строки line (с нуля); None — если такой строки нет
+        if line <= 0: return 0
+        k = bisect.bisect_left(self.lines, line) - 1
+        pos, need = self.offsets[k], line - self.lines[k]
+        while need:
+            nl = mm.find(b'\n', pos, self.size)
+            if nl < 0: return None
+            pos = nl + 1
+            need -= 1
+        return pos
+
+def _line_index(path, st, mm):
+    with _indexes_lock:
+        index = _indexes.get(path)
+        if index is None or not index.appended(mm, st):
+            index = LineIndex(st.st_ino)
+        _indexes[path] = index
+        _indexes.move_to_end(path)
+        while len(_indexes) > INDEX_CACHE_SIZE:
+            _indexes.popitem(last=False)
+        if index.size != st.st_size or index.mtime_ns != st.st_mtime_ns:
+            index.extend(mm, st.st_size)
+            index.mtime_ns = st.st_mtime_ns
+        return index
+
+def _char_boundary(mm, pos, size):
+    # Сдвигаемся вперёд с continuation-байтов UTF-8 (10xxxxxx)
+    limit = min(pos + 4, size)
+    while pos < limit and (mm[pos] & 0xC0) == 0x80:
+        pos += 1
+    return pos
+
+def _boundary(mm, pos, size, page_size):
+    # Одна и та же функция даёт и конец страницы k, и начало k+1 — без дыр и перекрытий.
+    # Перевод строки ищем только в пределах следующей страницы (и не в последнем байте
+    # файла): иначе строка длиннее страницы стянет две границы в одну точку и даст
+    # пустую страницу. Не нашли — режем по границе символа
+    if pos <= 0: return 0
+    if pos >= size: return size
+    if mm[pos - 1] == 0x0A: return pos
+    nl = mm.find(b'\n', pos, min(pos + LINE_SEEK, pos + page_size - 1, size - 1))
+    if nl >= 0: return nl + 1
+    return _char_boundary(mm, pos, size)
+
+def _decode(mm, start, end):
+    # Одно копирование: из mmap сразу в str, без промежуточного bytes
+    with memoryview(mm) as view:
+        with view[start:end] as part:
+            return str(part, 'utf-8', 'replace')
+
+def read_page(full_path, page=1, page_size=PAGE_SIZE, line=None, offset=None, length=None):
+    page_size = max(MIN_PAGE_SIZE, min(page_size or PAGE_SIZE, MAX_PAGE_SIZE))
+    with open(full_path, 'rb') as f:
+        st = os.fstat(f.fileno())
+        size = st.st_size
+        total_pages = (size // page_size) + (1 if size % page_size > 0 else 0)
+        result = {
+            "name": os.path.basename(full_path),
+            "size": size,
+            "page_size": page_size,
+            "total_pages": total_pages
+        }
+        if size == 0:
+            result.update({"content": "", "page": 1, "start": 0, "end": 0})
+            return result
+
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            if offset is not None:
+                # Range-запрос: точные байты, подрезанные до границ символов.
+                # offset < 0 — последние -offset байт (bytes=-N), для логов самое нужное
+                if offset < 0:
+                    length = min(-offset, MAX_PAGE_SIZE)
+                    offset = max(0, size - length)
+                elif offset >= size:
+                    raise RangeNotSatisfiable(size)
+                length = page_size if length is None else max(0, min(length, MAX_PAGE_SIZE))
+                start = _char_boundary(mm, offset, size)
+                end = _char_boundary(mm, min(size, start + length), size)
+                page = start // page_size + 1
+            elif line is not None:
+                index = _line_index(full_path, st, mm)
+                result["total_lines"] = index.total_lines(mm)
+                start = index.line_offset(mm, line - 1)
+                if start is None or (start >= size and line > 1):
+                    return {"error": f"Line {line} is out of range"}
+                end = _boundary(mm, start + page_size, size, page_size)
+                page = start // page_size + 1
+                result["start_line"] = line
+            else:
+                page = max(1, min(page, total_pages))
+                start = _boundary(mm, (page - 1) * page_size, size, page_size)
+                end = _boundary(mm, page * page_size, size, page_size)
+            count_read(end - start)
+            result.update({
+                "content": _decode(mm, start, end),
+                "page": page,
+                "start": start,
+                "end": end
+            })
+    return result
@@ -0,0 +1,359 @@
+import os
+import re
+import json
+import time
+import asyncio
+import threading
+import contextvars
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+
+from api.files import WORKSPACE_ROOT, is_visible, get_system_config_files
+from api.instrument import count_read
+
+# Поиск по воркспейсу (литерал или regex) с потоковой выдачей совпадений.
+# Файлы сканируются параллельно в пуле потоков, бинарные пропускаются.
+# Триграммный индекс в памяти отсекает файлы, где совпадения заведомо нет;
+# он обновляется инкрементально по (mtime, size), а при живом tree_index
+# без изменений в дереве повторный поиск вообще не трогает диск ради списка файлов.
+
+SEARCH_WORKERS = min(8, (os.cpu_count() or 2) * 2)
+MAX_FILE_SIZE = 8 * 1024 * 1024
+SNIFF_SIZE = 8192                  # по стольким байтам решаем, бинарный ли файл
+MAX_LINE_LENGTH = 500
+MAX_CONTEXT = 5
+DEFAULT_LIMIT = 500
+MAX_LIMIT = 5000
+INDEX_ENABLED = os.getenv("SEARCH_INDEX", "1") != "0"
+INDEX_MAX_FILE = 1024 * 1024       # большие файлы не индексируем, они сканируются всегда
+# Постинги — array('I'), 4 байта на вхождение триграммы; память индекса около
+# нескольких размеров проиндексированного текста (см. benchmarks/bench_api.py)
+INDEX_MAX_BYTES = int(os.getenv("SEARCH_INDEX_MAX_MB", "32")) * 1024 * 1024
+
+_pool = ThreadPoolExecutor(max_workers=SEARCH_WORKERS, thread_name_prefix="search")
+
+def _in_pool(loop, fn, *args):
+    # run_in_executor не переносит contextvars — копируем контекст запроса сами
+    return loop.run_in_executor(_pool, contextvars.copy_context().run, fn, *args)
+
+def compile_query(q, regex=False, case=False):
+    if not q:
+        raise ValueError("Empty query")
+    flags = re.MULTILINE | (0 if case else re.IGNORECASE)
+    try:
+        return re.compile(q if regex else re.escape(q), flags)
+    except re.error as e:
+        raise ValueError(f"Invalid regex: {e}")
+
+# Экранирования, которые не дают литерала: классы, якоря, управляющие символы — просто рвут подстроку.
+# Остальные буквенно-цифровые (\x41, \101, \u0041, \N{...}, ссылки \1) означают символы,
+# которые мы не раскрываем, — такой запрос индексом не фильтруем
+_BREAK_ESCAPES = set("wWdDsSbBAZntrfva")
+
+def _class_end(q, i):
+    # Индекс после ']' класса, начатого в q[i] == '['; None — вложенный '[' или класс не закрыт
+    j = i + 1
+    if j < len(q) and q[j] == '^': j += 1
+    if j < len(q) and q[j] == ']': j += 1     # ']' сразу после '[' — обычный символ класса
+    while j < len(q):
+        ch = q[j]
+        if ch == '\\':
+            j += 2
+            continue
+        if ch == '[': return None
+        if ch == ']': return j + 1
+        j += 1
+    return None
+
+def _literal_runs(q, regex):
+    # Подстроки, которые обязаны встретиться в любом совпадении; None — фильтровать нельзя.
+    # Ошибка здесь — молча потерянные совпадения, поэтому всё непонятное — None
+    if not regex:
+        return [q]
+    if '|' in q or '(' in q:
+        return None
+    runs, current, i = [], "", 0
+    while i < len(q):
+        ch = q[i]
+        if ch == '\\' and i + 1 < len(q):
+            nxt = q[i + 1]
+            if nxt in _BREAK_ESCAPES:
+                runs.append(current); current = ""
+            elif nxt.isalnum():
+                return None
+            else:
+                current += nxt
+            i += 2
+            continue
+        if ch in '?*{':
+            # Квантификатор делает предыдущий символ необязательным
+            runs.append(current[:-1]); current = ""
+            if ch == '{':
+                i = q.find('}', i) + 1 or len(q)
+                continue
+        elif ch == '[':
+            runs.append(current); current = ""
+            i = _class_end(q, i)
+            if i is None: return None
+            continue
+        elif ch in '.^$+':
+            # '+' оставляет символ обязательным, но дальше может быть повтор
+            runs.append(current); current = ""
+        else:
+            current += ch
+        i += 1
+    runs.append(current)
+    return [run for run in runs if run]
+
+def _trigrams(data):
+    return {data[i:i + 3] for i in range(len(data) - 2)}
+
+class TrigramIndex:
+    # Постинги trigram -> array('I') file_id по возрастанию (id только растут, поэтому
+    # достаточно append). При изменении файла ему выдаётся новый id, старый просто
+    # "умирает"; мёртвые id выметаются пересборкой постингов
+    def __init__(self):
+        self.postings = {}
+        self.files = {}        # rel -> (stamp, file_id)
+        self.paths = {}        # живой file_id -> rel
+        self.unindexed = set() # rel, которые не влезли в индекс
+        self.indexed_bytes = 0
+        self.sizes = {}        # rel -> проиндексированный размер
+        self.dead = 0
+        self.ready = False
+        self.source_version = None
+        self.lock = threading.Lock()
+        self._next_id = 0
+        self._building = False
+
+    def sync(self, files, version=None):
+        # files: [(rel, full, mtime, size)]
+        with self.lock:
+            if version is not None and version == self.source_version:
+                return
+            seen = set()
+            for rel, full, mtime, size in files:
+                seen.add(rel)
+                stamp = (mtime, size)
+                current = self.files.get(rel)
+                if current and current[0] == stamp:
+                    continue
+                self._drop(rel)
+                self._add(rel, full, stamp, size)
+            for rel in [rel for rel in self.files if rel not in seen]:
+                self._drop(rel)
+            self.unindexed &= seen
+            if self.dead > max(1000, len(self.paths)):
+                self._compact()
+            self.source_version = version
+            self.ready = True
+
+    def _add(self, rel, full, stamp, size):
+        if size > INDEX_MAX_FILE or self.indexed_bytes + size > INDEX_MAX_BYTES:
+            self.unindexed.add(rel)
+            self.files[rel] = (stamp, None)
+            return
+        data = _read_text(full)
+        if data is None:
+            # Бинарный или нечитаемый — поиск его всё равно пропустит
+            self.files[rel] = (stamp, None)
+            return
+        file_id = self._next_id
+        self._next_id += 1
+        for gram in _trigrams(data.lower().encode('utf-8')):
+            bucket = self.postings.get(gram)
+            if bucket is None:
+                self.postings[gram] = array('I', (file_id,))
+            else:
+                bucket.append(file_id)
+        self.files[rel] = (stamp, file_id)
+        self.paths[file_id] = rel
+        self.sizes[rel] = size
+        self.indexed_bytes += size
+        self.unindexed.discard(rel)
+
+    def _drop(self, rel):
+        current = self.files.pop(rel, None)
+        self.unindexed.discard(rel)
+        if current and current[1] is not None:
+            self.paths.pop(current[1], None)
+            self.indexed_bytes -= self.sizes.pop(rel, 0)
+            self.dead += 1
+
+    def _compact(self):
+        live = self.paths
+        for gram in list(self.postings):
+            bucket = array('I', (i for i in self.postings[gram] if i in live))
+            if bucket:
+                self.postings[gram] = bucket
+            else:
+                del self.postings[gram]
+        self.dead = 0
+
+    def candidates(self, runs):
+        # Множество rel, где могут быть совпадения; None — индекс не помогает
+        grams = set()
+        for run in runs or ():
+            encoded = run.lower().encode('utf-8')
+            grams |= _trigrams(encoded)
+        if not grams:
+            return None
+        with self.lock:
+            ids = None
+            for gram in sorted(grams, key=lambda g: len(self.postings.get(g, ()))):
+                bucket = self.postings.get(gram)
+                if not bucket:
+                    ids = set()
+                    break
+                ids = set(bucket) if ids is None else ids.intersection(bucket)
+                if not ids: break
+            result = {self.paths[i] for i in ids if i in self.paths}
+            return result | self.unindexed
+
+    def build_async(self, files, version):
+        # Первое построение идёт в фоне; пока его нет, поиск сканирует всё
+        with self.lock:
+            if self._building or self.ready: return
+            self._building = True
+        def run():
+            try:
+                self.sync(files, version)
+            except Exception as e:
+                print(f"Search index error: {e}")
+            finally:
+                self._building = False
+        _pool.submit(run)
+
+search_index = TrigramIndex()
+
+def _read_text(full):
+    try:
+        with open(full, 'rb') as f:
+            data = f.read(MAX_FILE_SIZE + 1)
+    except OSError:
+        return None
+    count_read(len(data))
+    if len(data) > MAX_FILE_SIZE or b'\0' in data[:SNIFF_SIZE]:
+        return None
+    return data.decode('utf-8', errors='replace')
+
+def _workspace_files():
+    # [(rel, full, mtime, size)] и версия источника (None — дерево обходили сами)
+    from api.tree_index import tree_index
+    if tree_index.ready:
+        with tree_index.lock:
+            version = tree_index.version
+            items = [
+                (rel, os.path.join(WORKSPACE_ROOT, rel), node["mtime"], node["size"])
+                for rel, node in tree_index.nodes.items() if not node["is_dir"]
+            ]
+    else:
+        version = None
+        items = []
+        stack = [WORKSPACE_ROOT]
+        while stack:
+            try:
+                with os.scandir(stack.pop()) as it:
+                    for entry in it:
+                        if not is_visible(entry.name): continue
+                        try:
+                            if entry.is_dir():
+                                if not entry.is_symlink(): stack.append(entry.path)
+                            elif entry.is_file():
+                                st = entry.stat()
+                                rel = os.path.relpath(entry.path, WORKSPACE_ROOT)
+                                items.append((rel, entry.path, st.st_mtime, st.st_size))
+                        except OSError:
+                            continue
+            except OSError:
+                continue
+    return items, version
+
+def _system_files():
+    return [(f["path"], f["path"], f["mtime"], f["size"]) for f in get_system_config_files()], None
+
+def scan_file(rel, full, pattern, context, max_hits):
+    text = _read_text(full)
+    if text is None or pattern.search(text) is None:
+        return []
+    matches = []
+    line_no, line_pos = 1, 0     # номер и начало строки, до которой уже досчитали
+    pos = 0
+    lines = None
+    while len(matches) < max_hits:
+        m = pattern.search(text, pos)
+        if m is None: break
+        start = m.start()
+        line_no += text.count('\n', line_pos, start)
+        line_pos = text.rfind('\n', 0, start) + 1
+        line_end = text.find('\n', start)
+        if line_end < 0: line_end = len(text)
+        hit = {"path": rel, "line": line_no, "col": start - line_pos, "text": text[line_pos:line_end][:MAX_LINE_LENGTH]}
+        if context:
+            if lines is None: lines = text.split('\n')
+            hit["before"] = [l[:MAX_LINE_LENGTH] for l in lines[max(0, line_no - 1 - context):line_no - 1]]
+            hit["after"] = [l[:MAX_LINE_LENGTH] for l in lines[line_no:line_no + context]]
+        matches.append(hit)
+        # Одно совпадение на строку: продолжаем со следующей
+        pos = line_end + 1
+        if pos > len(text): break
+    return matches
+
+async def search_stream(pattern, q, regex=False, path="", root="workspace", context=1, limit=DEFAULT_LIMIT):
+    # Асинхронный генератор NDJSON-строк: совпадения по мере нахождения, в конце сводка
+    started = time.monotonic()
+    context = max(0, min(context, MAX_CONTEXT))
+    limit = max(1, min(limit, MAX_LIMIT))
+    loop = asyncio.get_running_loop()
+    if root == "system":
+        files, version = _system_files()
+    else:
+        files, version = await _in_pool(loop, _workspace_files)
+
+    used_index = False
+    runs = _literal_runs(q, regex)
+    if INDEX_ENABLED and root != "system" and runs and any(len(run) >= 3 for run in runs):
+        if search_index.ready:
+            await _in_pool(loop, search_index.sync, files, version)
+            allowed = await _in_pool(loop, search_index.candidates, [run for run in runs if len(run) >= 3])
+            if allowed is not None:
+                files = [f for f in files if f[0] in allowed]
+                used_index = True
+        else:
+            search_index.build_async(files, version)
+
+    prefix = path.strip('/')
+    if prefix and root != "system":
+        files = [f for f in files if f[0] == prefix or f[0].startswith(prefix + '/')]
+    files.sort()
+    found = scanned = 0
+    pending = set()
+    queue = iter(files)
+    try:
+        while True:
+            while len(pending) < SEARCH_WORKERS * 4:
+                item = next(queue, None)
+                if item is None: break
+                rel, full = item[0], item[1]
+                pending.add(_in_pool(loop, scan_file, rel, full, pattern, context, limit))
+            if not pending: break
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for future in done:
+                scanned += 1
+                for hit in future.result():
+                    if found >= limit: break
+                    found += 1
+                    yield json.dumps(hit, ensure_ascii=False) + "\n"
+            if found >= limit: break
+    finally:
+        for future in pending:
+            future.cancel()
+    yield json.dumps({
+        "done": True,
+        "matches": found,
+        "files_scanned": scanned,
+        "files_total": len(files),
+        "truncated": found >= limit,
+        "indexed": used_index,
+        "elapsed_ms": round((time.monotonic() - started) * 1000, 1)
+    }) + "\n"
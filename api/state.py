@@ -0,0 +1,165 @@
+import os
+import json
+import time
+import asyncio
+import tempfile
+import threading
+from collections import defaultdict
+
+from api.paths import STATE_DIR
+
+# Слой файлового состояния: HEARTBEAT.md, cron/jobs.json, системные конфиги.
+# Каждый файл регистрируется под именем со своим разборщиком; разобранное
+# значение живёт, пока не поменяется (mtime_ns, size). stat делается не чаще
+# раза за цикл запроса (begin_cycle) и не реже раза в MAX_STAT_AGE секунд.
+# Запись — атомарная (tmp + fsync + rename) в пуле потоков, не в event loop.
+# Подписчики on_change узнают об изменении файла — и от записи через store,
+# и от правки на диске — и точечно сбрасывают свои кэши.
+# Снимки (save_snapshot/load_snapshot) — JSON-копии тёплых кэшей в scripts/snapshots/
+# для быстрого старта; их содержимое владелец проверяет сам (корень, отпечатки).
+
+MAX_STAT_AGE = 1.0
+SNAPSHOT_DIR = os.path.join(STATE_DIR, "snapshots")
+
+def write_atomic(path, data):
+    # Читатель видит либо старый файл, либо новый целиком — даже после сбоя питания
+    if isinstance(data, str):
+        data = data.encode('utf-8')
+    directory = os.path.dirname(path) or "."
+    fd, tmp = tempfile.mkstemp(prefix=f".{os.path.basename(path)}.", suffix=".tmp", dir=directory)
+    try:
+        try:
+            mode = os.stat(path).st_mode & 0o7777
+        except OSError:
+            umask = os.umask(0)
+            os.umask(umask)
+            mode = 0o666 & ~umask
+        # mkstemp создаёт файл с 0600 — возвращаем права исходного файла
+        os.fchmod(fd, mode)
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+    dir_fd = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(dir_fd)
+    finally:
+        os.close(dir_fd)
+
+def save_snapshot(name, data):
+    os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+    write_atomic(os.path.join(SNAPSHOT_DIR, f"{name}.json"), json.dumps(data, ensure_ascii=False))
+
+def load_snapshot(name):
+    # None — снимка нет или он битый: холодный старт
+    try:
+        with open(os.path.join(SNAPSHOT_DIR, f"{name}.json"), 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def _stat_key(path):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+class TrackedFile:
+    __slots__ = ("name", "path", "parse", "missing", "error", "key", "cycle", "checked_at", "value", "value_key")
+
+    def __init__(self, name, path, parse, missing, error):
+        self.name = name
+        self.path = path
+        self.parse = parse          # bytes -> значение; None — файл нужен только ради stat
+        self.missing = missing      # значение, если файла нет
+        self.error = error          # значение, если файл не читается или не разбирается
+        self.key = None             # (mtime_ns, size) последнего stat
+        self.cycle = None
+        self.checked_at = 0.0
+        self.value = None
+        self.value_key = False      # ключ, для которого посчитано value (False — ни для какого)
+
+class StateStore:
+    def __init__(self):
+        self.files = {}
+        self.listeners = defaultdict(list)
+        self.cycle = 0
+        self._lock = threading.RLock()
+
+    def register(self, name, path, parse=None, missing=None, error=None):
+        self.files[name] = TrackedFile(name, path, parse, missing, error)
+
+    def on_change(self, name, callback):
+        self.listeners[name].append(callback)
+
+    def begin_cycle(self):
+        # Новый цикл запроса: следующие обращения снова сделают stat
+        self.cycle += 1
+
+    def _notify(self, name):
+        for callback in self.listeners[name]:
+            try:
+                callback()
+            except Exception as e:
+                print(f"State store listener error ({name}): {e}")
+
+    def _check(self, f):
+        now = time.monotonic()
+        if f.cycle == self.cycle and now - f.checked_at < MAX_STAT_AGE:
+            return f.key
+        key = _stat_key(f.path)
+        f.cycle, f.checked_at = self.cycle, now
+        if key != f.key:
+            f.key = key
+            self._notify(f.name)
+        return key
+
+    def stamp(self, *names):
+        # Отпечаток набора файлов — для правил инвалидации секций статуса
+        with self._lock:
+            return tuple(self._check(self.files[name]) for name in names)
+
+    def stat(self, name):
+        # (mtime_ns, size) или None, если файла нет
+        with self._lock:
+            return self._check(self.files[name])
+
+    def get(self, name):
+        with self._lock:
+            f = self.files[name]
+            key = self._check(f)
+            if key is None:
+                return f.missing
+            if f.value_key == key:
+                return f.value
+            try:
+                with open(f.path, 'rb') as fh:
+                    data = fh.read()
+                value = f.parse(data) if f.parse else data
+            except Exception as e:
+                print(f"State store: cannot load {f.path}: {e}")
+                value = f.error
+            f.value, f.value_key = value, key
+            return value
+
+    async def write(self, name, data):
+        f = self.files[name]
+        await asyncio.to_thread(write_atomic, f.path, data)
+        with self._lock:
+            # Записанное уже в памяти: следующий get не перечитывает файл
+            key = _stat_key(f.path)
+            raw = data.encode('utf-8') if isinstance(data, str) else data
+            f.value = f.parse(raw) if f.parse else raw
+            f.value_key = key
+            f.key, f.cycle, f.checked_at = key, self.cycle, time.monotonic()
+        self._notify(name)
+
+state_store = StateStore()
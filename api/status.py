@@ -0,0 +1,179 @@
+import os
+import json
+import time
+import asyncio
+import psutil
+
+from api.system import get_server_uptime, get_last_hb, get_git_info, get_agents_info, DASHBOARD_ROOT as GIT_ROOT
+from api.heartbeat import get_heartbeat_raw
+from api.files import get_workspace_tree, get_system_config_files, CONFIG_NAMES
+from api.cron import get_cron_jobs
+from api.state import state_store
+from api.cluster import cluster
+from api.cache import shared_cache
+from api.ai_context import ai_probe
+from api.instrument import record
+from api.gitexec import head_ref_stamp
+
+# Слой агрегации /api/status: каждая секция кэшируется отдельно,
+# со своим TTL и своим правилом инвалидации (stamp).
+# С общим кэшем (несколько воркеров) посчитанная секция выкладывается туда,
+# и другой воркер берёт её, если она не старше TTL и отпечаток совпадает.
+
+def _mtimes(*paths):
+    # Дешёвый "отпечаток" набора файлов: если он поменялся, кэш секции устарел
+    stamp = []
+    for path in paths:
+        try:
+            stamp.append(os.stat(path).st_mtime_ns)
+        except OSError:
+            stamp.append(None)
+    return tuple(stamp)
+
+def _collect_metrics():
+    latest = cluster.metrics_latest()
+    if latest is not None:
+        # Готовый сэмпл фонового сэмплера: CPU за честную секунду, без обращения к psutil
+        return {"cpu": latest["cpu"], "ram": latest["ram"], "disk": latest["disk"], "uptime": get_server_uptime()}
+    return {
+        "cpu": psutil.cpu_percent(),
+        "ram": psutil.virtual_memory().percent,
+        "disk": psutil.disk_usage('/').percent,
+        "uptime": get_server_uptime()
+    }
+
+def _collect_tree():
+    # Дерево лидера (своё или из общего кэша); пока его нет — обход диска
+    files = cluster.tree()
+    return {"files": files if files is not None else get_workspace_tree()}
+
+def _collect_heartbeat():
+    return {"heartbeat_last": get_last_hb(), "heartbeat_raw": get_heartbeat_raw()}
+
+async def _collect_ai():
+    # Только память зонда; устаревшее значение обновляется в фоне, CLI здесь не ждём
+    return {"ai": await ai_probe.get(wait=False)}
+
+async def _collect_git():
+    return {"git": await get_git_info()}
+
+def _git_stamp():
+    # Каталог refs/heads — только создание/удаление веток; сдвиг текущей ветки — по её файлу
+    git_dir = os.path.join(GIT_ROOT, ".git")
+    return _mtimes(
+        os.path.join(git_dir, "HEAD"),
+        os.path.join(git_dir, "logs", "HEAD"),
+        os.path.join(git_dir, "refs", "heads"),
+        os.path.join(git_dir, "packed-refs")
+    ) + (head_ref_stamp(git_dir),)
+
+class Section:
+    def __init__(self, name, collector, ttl, stamp=None):
+        self.name = name
+        self.collector = collector   # функция (sync или async), возвращает dict с ключами ответа
+        self.ttl = ttl               # максимальный возраст значения в секундах
+        self.stamp = stamp           # правило инвалидации: функция-отпечаток или None
+        self.value = None
+        self.fragment = ""           # готовый JSON без внешних скобок, чтобы не сериализовать заново
+        self.stamp_value = None
+        self.updated_at = None
+        self.lock = asyncio.Lock()
+
+    def _is_fresh(self, stamp):
+        if self.updated_at is None:
+            return False
+        if time.monotonic() - self.updated_at >= self.ttl:
+            return False
+        return self.stamp is None or stamp == self.stamp_value
+
+    def invalidate(self):
+        self.updated_at = None
+        if shared_cache.shared:
+            shared_cache.delete(f"status:{self.name}")
+
+    def _adopt(self, entry, stamp):
+        # Значение, посчитанное другим воркером: годится, если свежее TTL и отпечаток тот же
+        if entry is None: return False
+        data, stored_at = entry
+        age = time.time() - stored_at
+        if age >= self.ttl or data["stamp"] != json.dumps(stamp):
+            return False
+        self.value = data["value"]
+        self.fragment = json.dumps(self.value, ensure_ascii=False)[1:-1]
+        self.stamp_value = stamp
+        self.updated_at = time.monotonic() - age
+        return True
+
+    async def refresh(self):
+        stamp = self.stamp() if self.stamp else None
+        if self._is_fresh(stamp):
+            return
+        async with self.lock:
+            # Пока ждали лок, секцию мог обновить параллельный запрос
+            if self._is_fresh(stamp):
+                return
+            key = f"status:{self.name}"
+            if shared_cache.shared and self._adopt(await asyncio.to_thread(shared_cache.get, key), stamp):
+                return
+            start = time.perf_counter()
+            if asyncio.iscoroutinefunction(self.collector):
+                value = await self.collector()
+            else:
+                value = await asyncio.to_thread(self.collector)
+            record(f"status.{self.name}", time.perf_counter() - start)
+            self.value = value
+            self.fragment = json.dumps(value, ensure_ascii=False)[1:-1]
+            self.stamp_value = stamp
+            self.updated_at = time.monotonic()
+            if shared_cache.shared:
+                await asyncio.to_thread(shared_cache.set, key, {"stamp": json.dumps(stamp), "value": value})
+
+SECTIONS = {
+    "metrics": Section("metrics", _collect_metrics, ttl=1),
+    "agents": Section("agents", lambda: {"agents": get_agents_info()}, ttl=5),
+    "git": Section("git", _collect_git, ttl=60, stamp=_git_stamp),
+    # Пока индекс жив, версия меняется ровно при изменениях на диске
+    "tree": Section("tree", _collect_tree, ttl=300, stamp=cluster.tree_state),
+    # Файловые секции: отпечаток из state_store (stat раз за цикл), TTL — лишь страховка
+    "heartbeat": Section("heartbeat", _collect_heartbeat, ttl=3600, stamp=lambda: state_store.stamp("heartbeat", "heartbeat_state")),
+    "cron": Section("cron", lambda: {"cron": get_cron_jobs()}, ttl=3600, stamp=lambda: state_store.stamp("cron")),
+    "system_configs": Section("system_configs", lambda: {"system_configs": get_system_config_files()}, ttl=3600, stamp=lambda: state_store.stamp(*CONFIG_NAMES)),
+    "ai": Section("ai", _collect_ai, ttl=1)
+}
+
+def parse_sections(raw=None):
+    if not raw:
+        return list(SECTIONS)
+    names = []
+    for name in raw.split(','):
+        name = name.strip()
+        if not name or name in names: continue
+        if name not in SECTIONS:
+            raise ValueError(f"Unknown status section: {name}")
+        names.append(name)
+    return names
+
+def invalidate(*names):
+    for name in names:
+        SECTIONS[name].invalidate()
+
+# Изменение файла (запись через store или правка на диске) сбрасывает ровно свою секцию
+for _file, _section in [("heartbeat", "heartbeat"), ("heartbeat_state", "heartbeat"), ("cron", "cron")] + [(n, "system_configs") for n in CONFIG_NAMES]:
+    state_store.on_change(_file, lambda section=_section: invalidate(section))
+
+async def _refresh(names):
+    # Единственный сборщик: и словарь для publisher, и JSON для /api/status строятся из его результата
+    state_store.begin_cycle()
+    sections = [SECTIONS[n] for n in names]
+    await asyncio.gather(*(s.refresh() for s in sections))
+    return sections
+
+async def collect_status(names):
+    result = {}
+    for s in await _refresh(names):
+        result.update(s.value)
+    return result
+
+async def render_status(names):
+    # Склеиваем заранее сериализованные фрагменты — горячий путь без json.dumps
+    return "{" + ",".join(s.fragment for s in await _refresh(names) if s.fragment) + "}"
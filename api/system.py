@@ -1,14 +1,15 @@
-import os
 import psutil
 import time
-import subprocess
-import json
-import zipfile
-import io
-import requests
+import asyncio
+
+from api.gitexec import git
+from api.agents import agent_registry
 
 # Корень проекта для гит-команд
-DASHBOARD_ROOT = "/home/max/.openclaw/workspace/projects/dashboard"
+from api.paths import GIT_ROOT as DASHBOARD_ROOT, HB_STATE_FILE
+from api.state import state_store
+
+state_store.register("heartbeat_state", HB_STATE_FILE)
 
 def get_server_uptime():
     try:
@@ -17,76 +18,113 @@ def get_server_uptime():
     except: return "--h --m"
 
 def get_last_hb():
-    try:
-        hb_path = "/home/max/.openclaw/workspace/memory/heartbeat-state.json"
-        if os.path.exists(hb_path): return os.path.getmtime(hb_path)
-    except: pass
+    # Нужен только mtime — stat из state_store, не чаще раза за цикл запроса
+    key = state_store.stat("heartbeat_state")
+    if key: return key[0] / 1e9
     return int(time.time())
 
-def get_git_info():
+def _relative_date(ts):
+    # Аналог git %cr; считаем сами, чтобы кэш git log не "замораживал" возраст коммитов
+    delta = max(0, int(time.time()) - ts)
+    for unit, seconds in (("year", 365 * 86400), ("month", 30 * 86400), ("week", 7 * 86400),
+                          ("day", 86400), ("hour", 3600), ("minute", 60)):
+        if delta >= seconds * (2 if unit in ("year", "month") else 1):
+            n = delta // seconds
+            return f"{n} {unit}{'s' if n != 1 else ''} ago"
+    return f"{delta} second{'s' if delta != 1 else ''} ago"
+
+async def get_git_info():
     try:
-        branch = subprocess.check_output(["git", "rev-parse", "--abbrev-ref", "HEAD"], text=True, cwd=DASHBOARD_ROOT).strip()
-        commits_raw = subprocess.check_output(["git", "log", "-n", "5", "--pretty=format:%s|%cr"], text=True, cwd=DASHBOARD_ROOT).strip()
+        # Два процесса параллельно вместо трёх подряд: ветки + текущая ветка одним for-each-ref
+        refs_raw, commits_raw = await asyncio.gather(
+            git(DASHBOARD_ROOT, "for-each-ref", "--format=%(HEAD)|%(refname:short)", "refs/heads", cache=True),
+            git(DASHBOARD_ROOT, "log", "-n", "5", "--pretty=format:%s|%ct", cache=True)
+        )
+        branch = "HEAD"
+        branches = []
+        for line in refs_raw.splitlines():
+            marker, name = line.split('|', 1)
+            branches.append(name)
+            if marker == '*': branch = name
+
         commits = []
-        for line in commits_raw.split('\n'):
+        for line in commits_raw.strip().split('\n'):
             if '|' in line:
-                msg, date = line.split('|')
-                commits.append({"msg": msg, "date": date})
-        
-        # Получаем список всех веток
-        branches_raw = subprocess.check_output(["git", "branch", "--format=%(refname:short)"], text=True, cwd=DASHBOARD_ROOT).strip()
-        branches = branches_raw.split('\n')
-        
+                msg, ts = line.rsplit('|', 1)
+                commits.append({"msg": msg, "date": _relative_date(int(ts))})
+
         return {"branch": branch, "commits": commits, "branches": branches}
     except: return {"branch": "unknown", "commits": [], "branches": []}
 
-def git_checkout_branch(branch_name: str):
+def _no_step(name, message="", status="ok"):
+    pass
+
+async def git_checkout_branch(branch_name: str, step=_no_step):
     try:
         # Проверяем, нет ли незакоммиченных изменений (опционально, но лучше сделать)
         # Для простоты просто делаем checkout
-        subprocess.run(["git", "checkout", branch_name], cwd=DASHBOARD_ROOT, check=True, capture_output=True)
+        await git(DASHBOARD_ROOT, "checkout", branch_name)
+        step("checkout", branch_name)
         return {"success": True, "message": f"Switched to branch {branch_name}"}
     except Exception as e:
+        step("checkout", str(e), status="error")
         return {"success": False, "message": f"Checkout failed: {str(e)}"}
 
-def sync_to_dev():
+async def _fetch_remotes(step):
+    # Каждый remote отдельным процессом и параллельно — вместо последовательного fetch --all
+    remotes = (await git(DASHBOARD_ROOT, "remote")).split()
+    results = await asyncio.gather(*(git(DASHBOARD_ROOT, "fetch", remote, timeout=300) for remote in remotes), return_exceptions=True)
+    for remote, result in zip(remotes, results):
+        # Как и раньше, недоступный remote синхронизацию не прерывает
+        if isinstance(result, Exception):
+            step(f"fetch {remote}", str(result), status="error")
+        else:
+            step(f"fetch {remote}")
+
+async def sync_to_dev(step=_no_step):
     """
     CI/CD Конвейер: Commit -> Sync Master -> Merge to Dev -> Push -> Create PR
+    step(name, message, status) — отчёт о пройденном шаге (задача api/jobs.py)
     """
     try:
         # Текущая ветка
-        current_branch = subprocess.check_output(["git", "rev-parse", "--abbrev-ref", "HEAD"], 
-                                               text=True, cwd=DASHBOARD_ROOT).strip()
-        
+        current_branch = (await git(DASHBOARD_ROOT, "rev-parse", "--abbrev-ref", "HEAD")).strip()
+        step("branch", current_branch)
+
         # 1. COMMIT: Сохраняем текущий прогресс
-        subprocess.run(["git", "add", "."], cwd=DASHBOARD_ROOT)
-        subprocess.run(["git", "commit", "-m", f"auto: task progress on {current_branch}"], 
-                       cwd=DASHBOARD_ROOT, capture_output=True)
+        await git(DASHBOARD_ROOT, "add", ".", check=False)
+        committed = await git(DASHBOARD_ROOT, "commit", "-m", f"auto: task progress on {current_branch}", check=False)
+        step("commit", committed.strip().split("\n")[0] if committed.strip() else "nothing to commit")
 
         # 2. FETCH ALL
-        subprocess.run(["git", "fetch", "--all"], cwd=DASHBOARD_ROOT, capture_output=True)
+        await _fetch_remotes(step)
 
         # 3. MASTER UPDATE
-        subprocess.run(["git", "checkout", "master"], cwd=DASHBOARD_ROOT, check=True, capture_output=True)
-        subprocess.run(["git", "pull", "origin", "master"], cwd=DASHBOARD_ROOT, capture_output=True)
+        await git(DASHBOARD_ROOT, "checkout", "master")
+        await git(DASHBOARD_ROOT, "pull", "origin", "master", timeout=300, check=False)
+        step("master", "checked out and pulled")
 
         # 4. DEV UPDATE & MERGE
-        subprocess.run(["git", "checkout", "dev"], cwd=DASHBOARD_ROOT, check=True, capture_output=True)
-        subprocess.run(["git", "pull", "origin", "dev"], cwd=DASHBOARD_ROOT, capture_output=True)
-        subprocess.run(["git", "merge", "master"], cwd=DASHBOARD_ROOT, capture_output=True)
-        subprocess.run(["git", "merge", current_branch], cwd=DASHBOARD_ROOT, capture_output=True)
+        await git(DASHBOARD_ROOT, "checkout", "dev")
+        await git(DASHBOARD_ROOT, "pull", "origin", "dev", timeout=300, check=False)
+        await git(DASHBOARD_ROOT, "merge", "master", check=False)
+        await git(DASHBOARD_ROOT, "merge", current_branch, check=False)
+        step("merge", f"master and {current_branch} merged into dev")
 
         # 5. PUSH DEV
-        subprocess.run(["git", "push", "origin", "dev"], cwd=DASHBOARD_ROOT, check=True, capture_output=True)
+        await git(DASHBOARD_ROOT, "push", "origin", "dev", timeout=300)
+        step("push", "origin/dev")
 
         # 6. GITHUB PR: Создаем Pull Request (dev -> master)
         pr_message = "All branches synced and pushed to origin/dev."
         try:
-            remote_url = subprocess.check_output(["git", "remote", "get-url", "origin"], text=True, cwd=DASHBOARD_ROOT).strip()
+            remote_url = (await git(DASHBOARD_ROOT, "remote", "get-url", "origin", cache=True)).strip()
             if "github_pat_" in remote_url:
                 token = remote_url.split('@')[0].split(':')[-1]
                 repo_path = remote_url.split('github.com/')[-1].replace('.git', '')
                 
+                # requests тянет за собой urllib3/certifi — грузим только при создании PR
+                import requests
                 api_url = f"https://api.github.com/repos/{repo_path}/pulls"
                 headers = {"Authorization": f"token {token}", "Accept": "application/vnd.github.v3+json"}
                 payload = {
@@ -95,49 +133,25 @@ def sync_to_dev():
                     "base": "master",
                     "body": f"Automatically merged {current_branch} into dev. Syncing with master."
                 }
-                response = requests.post(api_url, headers=headers, json=payload)
+                response = await asyncio.to_thread(requests.post, api_url, headers=headers, json=payload, timeout=30)
                 if response.status_code == 201:
                     pr_message = f"Pushed & PR created: {response.json().get('html_url')}"
                 elif response.status_code == 422:
                     pr_message = "Pushed. PR already exists."
                 else: pr_message = f"Pushed, but PR error: {response.status_code}"
+                step("pr", pr_message)
         except: pass
 
         # Назад к задаче
-        subprocess.run(["git", "checkout", current_branch], cwd=DASHBOARD_ROOT, capture_output=True)
+        await git(DASHBOARD_ROOT, "checkout", current_branch, check=False)
+        step("restore", current_branch)
         
         return {"success": True, "message": pr_message}
 
     except Exception as e:
+        step("error", str(e), status="error")
         return {"success": False, "message": f"Sync failed: {str(e)}"}
 
 def get_agents_info():
-    agents = []
-    for proc in psutil.process_iter(['pid', 'name', 'cmdline']):
-        try:
-            cmd = " ".join(proc.info['cmdline'] or [])
-            if 'openclaw-gateway' in cmd: agents.append({"pid": str(proc.info['pid']), "name": "Letto Core Gateway"})
-            elif 'server.py' in cmd: agents.append({"pid": str(proc.info['pid']), "name": "Letto UI Manager"})
-        except: pass
-    return agents
+    return agent_registry.get_agents()
 
-def get_ai_context():
-    try:
-        cli_path = "/home/max/.nvm/versions/node/v22.22.0/bin/openclaw"
-        result = subprocess.run([cli_path, "sessions", "list"], capture_output=True, text=True, check=True)
-        sessions = json.loads(result.stdout)
-        main = next((s for s in sessions if "main" in s.get("key", "")), sessions[0])
-        return {"used": main.get("totalTokens", 0), "total": 1048576, "percent": round((main.get("totalTokens", 0)/1048576)*100,1), "model": main.get("model", "unknown")}
-    except: return {"used": 0, "total": 1048576, "percent": 0, "model": "unknown"}
-
-def create_backup_zip():
-    memory_file = io.BytesIO()
-    workspace_root = "/home/max/.openclaw/workspace"
-    with zipfile.ZipFile(memory_file, 'w', zipfile.ZIP_DEFLATED) as zipf:
-        for root, dirs, files in os.walk(workspace_root):
-            if 'node_modules' in dirs or '.git' in dirs: continue
-            for file in files:
-                fpath = os.path.join(root, file)
-                zipf.write(fpath, os.path.relpath(fpath, workspace_root))
-    memory_file.seek(0)
-    return memory_file
@@ -0,0 +1,165 @@
+import os
+import json
+import codecs
+import asyncio
+
+# Режим tail -f для просмотрщика файлов.
+# Последние N строк читаются с конца файла блоками, дальше рассылаются только
+# дописанные байты. На один файл — один наблюдатель (дешёвый опрос os.stat),
+# сколько бы вкладок его ни смотрело: TailHub ведёт счётчик подписок и под
+# одним замком создаёт наблюдателя и удаляет его. Обрезка и ротация (смена inode)
+# обрабатываются: клиент получает событие и читает файл с начала.
+
+POLL_INTERVAL = 0.5
+BLOCK_SIZE = 64 * 1024
+MAX_TAIL_LINES = 5000
+MAX_TAIL_BYTES = 4 * 1024 * 1024
+MAX_CHUNK = 1024 * 1024        # сколько максимум отправляем за один тик
+QUEUE_SIZE = 256
+
+def sse_event(event, data):
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+def read_tail(f, end, lines):
+    # Идём от end к началу блоками, пока не наберём lines переводов строки
+    lines = max(0, min(lines, MAX_TAIL_LINES))
+    if not lines or not end: return end, ""
+    pos = end
+    chunks = []
+    found = 0
+    while pos > 0 and found < lines and end - pos < MAX_TAIL_BYTES:
+        size = min(BLOCK_SIZE, pos)
+        pos -= size
+        f.seek(pos)
+        block = f.read(size)
+        # '\n' в самом конце файла лишь завершает последнюю строку
+        found += block.count(b'\n', 0, len(block) - 1 if not chunks else len(block))
+        chunks.append(block)
+    data = b''.join(reversed(chunks))
+    cut = len(data) - 1
+    for _ in range(lines):
+        cut = data.rfind(b'\n', 0, cut)
+        if cut < 0: break
+    data = data[cut + 1:]
+    return end - len(data), data.decode('utf-8', errors='replace')
+
+class FileWatcher:
+    def __init__(self, path):
+        self.path = path
+        self.subscribers = set()
+        self.refs = 0            # подписки TailHub, включая ещё не закончившие subscribe
+        self.ino = None
+        self.offset = 0
+        self.decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+        self.lock = asyncio.Lock()
+        self._task = None
+
+    async def subscribe(self, lines):
+        # Начальный хвост читается под тем же замком, что и тик: между "init"
+        # и первым "append" не теряется и не дублируется ни одного байта
+        queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+        async with self.lock:
+            if self.ino is None:
+                st = await asyncio.to_thread(os.stat, self.path)
+                self.ino, self.offset = st.st_ino, st.st_size
+            start, content = await asyncio.to_thread(self._read_tail, lines)
+            queue.put_nowait(sse_event("init", {
+                "path": self.path, "content": content, "start": start, "offset": self.offset
+            }))
+            self.subscribers.add(queue)
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+        return queue
+
+    def unsubscribe(self, queue):
+        self.subscribers.discard(queue)
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+
+    def _read_tail(self, lines):
+        with open(self.path, 'rb') as f:
+            return read_tail(f, self.offset, lines)
+
+    async def _run(self):
+        # Живёт, пока TailHub не вызовет stop(): отписка последнего клиента решается там
+        while True:
+            await asyncio.sleep(POLL_INTERVAL)
+            try:
+                async with self.lock:
+                    await self.tick()
+            except Exception as e:
+                print(f"Tail watcher error ({self.path}): {e}")
+
+    async def tick(self):
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            # Между переименованием и созданием нового файла при ротации
+            return
+        if st.st_ino != self.ino:
+            self.ino, self.offset = st.st_ino, 0
+            self.decoder.reset()
+            self.publish(sse_event("rotated", {"offset": 0}))
+        elif st.st_size < self.offset:
+            self.offset = 0
+            self.decoder.reset()
+            self.publish(sse_event("truncated", {"offset": 0}))
+        if st.st_size == self.offset:
+            return
+        data = await asyncio.to_thread(self._read_from, self.offset, min(st.st_size - self.offset, MAX_CHUNK))
+        if not data: return
+        self.offset += len(data)
+        # Незаконченный UTF-8 символ на конце остаётся в декодере до следующего тика
+        content = self.decoder.decode(data)
+        if content:
+            self.publish(sse_event("append", {"content": content, "offset": self.offset}))
+
+    def _read_from(self, offset, size):
+        with open(self.path, 'rb') as f:
+            if os.fstat(f.fileno()).st_ino != self.ino:
+                return b''
+            f.seek(offset)
+            return f.read(size)
+
+    def publish(self, message):
+        for queue in list(self.subscribers):
+            try:
+                queue.put_nowait(message)
+            except asyncio.QueueFull:
+                # Отстающий клиент отключается и при переподключении получит свежий хвост
+                self.subscribers.discard(queue)
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait(None)
+
+class TailHub:
+    def __init__(self):
+        self.watchers = {}   # realpath -> FileWatcher
+        self.lock = asyncio.Lock()
+
+    async def subscribe(self, path, lines=200):
+        path = os.path.realpath(path)
+        # Поиск, создание и счётчик — под одним замком с удалением: пока идёт
+        # subscribe, наблюдатель не может уйти, и второй на тот же путь не появится
+        async with self.lock:
+            watcher = self.watchers.get(path)
+            if watcher is None:
+                watcher = self.watchers[path] = FileWatcher(path)
+            watcher.refs += 1
+        try:
+            return watcher, await watcher.subscribe(lines)
+        except BaseException:
+            await self.unsubscribe(watcher, None)
+            raise
+
+    async def unsubscribe(self, watcher, queue):
+        async with self.lock:
+            watcher.unsubscribe(queue)
+            watcher.refs -= 1
+            if watcher.refs == 0:
+                del self.watchers[watcher.path]
+                watcher.stop()
+
+tail_hub = TailHub()
@@ -1,29 +1,213 @@
-from deep_translator import GoogleTranslator
+import os
+import re
 import time
+import sqlite3
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from api.paths import STATE_DIR
+
+# Перевод с постоянным кэшем. Текст режется на куски по границам абзацев,
+# строк и предложений (а не посреди слова), каждый кусок ищется в SQLite-кэше
+# по хэшу содержимого, непереведённые куски уходят в пул потоков параллельно.
+# Бэкенд подключаемый: google (deep-translator) или stub для тестов и офлайна.
+
+CACHE_FILE = os.path.join(STATE_DIR, 'translate_cache.sqlite')
+CHUNK_LIMIT = 4000                 # безопасный размер одного запроса к Google
+CACHE_MAX_BYTES = 64 * 1024 * 1024
+TRANSLATE_WORKERS = int(os.getenv("TRANSLATE_WORKERS", "4"))
+TRANSLATE_BACKEND = os.getenv("TRANSLATE_BACKEND", "google")
+
+_pool = ThreadPoolExecutor(max_workers=TRANSLATE_WORKERS, thread_name_prefix="translate")
+
+# --- бэкенды ----------------------------------------------------------
+
+class GoogleBackend:
+    name = "google"
+
+    def __init__(self):
+        # GoogleTranslator кладёт текст запроса в поля экземпляра перед requests.get —
+        # общий экземпляр на несколько потоков пула путает куски. Свой на поток и язык
+        self._local = threading.local()
+
+    def _translator(self, target):
+        translators = getattr(self._local, "translators", None)
+        if translators is None:
+            translators = self._local.translators = {}
+        translator = translators.get(target)
+        if translator is None:
+            from deep_translator import GoogleTranslator
+            translator = translators[target] = GoogleTranslator(source='auto', target=target)
+        return translator
+
+    def translate(self, text, target):
+        return self._translator(target).translate(text)
+
+class StubBackend:
+    # Локальная заглушка: помечает текст языком, без сети
+    name = "stub"
+
+    def translate(self, text, target):
+        return f"[{target}] {text}"
+
+BACKENDS = {"google": GoogleBackend, "stub": StubBackend}
+# Опечатка в имени не должна молча отправлять текст во внешний сервис
+if TRANSLATE_BACKEND not in BACKENDS:
+    raise ValueError(f"Unknown translate backend: {TRANSLATE_BACKEND} (expected one of {', '.join(BACKENDS)})")
+_backend = None
+
+def get_backend():
+    global _backend
+    if _backend is None:
+        _backend = BACKENDS[TRANSLATE_BACKEND]()
+    return _backend
+
+def set_backend(backend):
+    global _backend
+    _backend = backend
+
+# --- кэш --------------------------------------------------------------
+
+class TranslationCache:
+    # key -> перевод; used_at для LRU-вытеснения по суммарному размеру
+    def __init__(self, path=CACHE_FILE, max_bytes=CACHE_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self._conn = None
+        self._size = None
+
+    def _db(self):
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL, used_at REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS cache_used_at ON cache(used_at)")
+            self._size = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM cache").fetchone()[0]
+        return self._conn
+
+    def get_many(self, keys):
+        if not keys: return {}
+        with self.lock:
+            db = self._db()
+            found = {}
+            keys = list(keys)
+            # Лимит SQLite на число параметров — запрашиваем пачками
+            for i in range(0, len(keys), 500):
+                part = keys[i:i + 500]
+                marks = ",".join("?" * len(part))
+                found.update(db.execute(f"SELECT key, value FROM cache WHERE key IN ({marks})", part).fetchall())
+            if found:
+                now = time.time()
+                db.executemany("UPDATE cache SET used_at = ? WHERE key = ?", [(now, k) for k in found])
+                db.commit()
+            return found
+
+    def put_many(self, items):
+        if not items: return
+        with self.lock:
+            db = self._db()
+            now = time.time()
+            for key, value in items.items():
+                size = len(value.encode('utf-8'))
+                old = db.execute("SELECT size FROM cache WHERE key = ?", (key,)).fetchone()
+                db.execute("INSERT OR REPLACE INTO cache (key, value, size, used_at) VALUES (?, ?, ?, ?)", (key, value, size, now))
+                self._size += size - (old[0] if old else 0)
+            self._evict(db)
+            db.commit()
+
+    def _evict(self, db):
+        # Выбрасываем самые давно использованные записи, пока не влезем в лимит
+        while self._size > self.max_bytes:
+            rows = db.execute("SELECT key, size FROM cache ORDER BY used_at LIMIT 100").fetchall()
+            if not rows: break
+            db.executemany("DELETE FROM cache WHERE key = ?", [(k,) for k, _ in rows])
+            self._size -= sum(size for _, size in rows)
+
+cache = TranslationCache()
+
+# --- разбиение --------------------------------------------------------
+
+# От крупных границ к мелким: абзац, строка, предложение, пробел
+_SPLITTERS = [
+    re.compile(r'(?<=\n\n)'),
+    re.compile(r'(?<=\n)'),
+    re.compile(r'(?<=[.!?…])(?=\s)'),
+    re.compile(r'(?<=\s)')
+]
+
+def _units(text, limit, level=0):
+    if len(text) <= limit:
+        return [text]
+    if level == len(_SPLITTERS):
+        return [text[i:i + limit] for i in range(0, len(text), limit)]
+    units = []
+    for part in _SPLITTERS[level].split(text):
+        if part:
+            units.extend(_units(part, limit, level + 1))
+    return units
+
+def split_chunks(text, limit=CHUNK_LIMIT):
+    # Склейка кусков даёт исходный текст байт в байт
+    chunks, current = [], ""
+    for unit in _units(text, limit):
+        if current and len(current) + len(unit) > limit:
+            chunks.append(current)
+            current = ""
+        current += unit
+    if current:
+        chunks.append(current)
+    return chunks
+
+def _cache_key(backend, target, text):
+    return hashlib.sha256(f"{backend.name}\0{target}\0{text}".encode('utf-8')).hexdigest()
+
+# --- перевод ----------------------------------------------------------
 
 def translate_text(text, target_lang='ru'):
     try:
         if not text or not text.strip():
             return text
-            
+
         # Очистка текста от лишних пробелов по краям
         content = text.strip()
-        
-        # Разбиваем текст на части, если он слишком длинный (Google API имеет лимиты)
-        # Для начала попробуем перевести блок целиком, но через простейший вызов
-        translator = GoogleTranslator(source='auto', target=target_lang)
-        
-        # Если текст очень большой, deep-translator может буксовать.
-        # Ограничим один запрос 4000 символами (безопасно для Google)
-        if len(content) > 4000:
-            parts = [content[i:i+4000] for i in range(0, len(content), 4000)]
-            translated_parts = []
-            for part in parts:
-                translated_parts.append(translator.translate(part))
-                time.sleep(0.1) # Небольшая пауза между запросами
-            return "\n".join(translated_parts)
-        
-        return translator.translate(content)
+        backend = get_backend()
+
+        # Внутренние пробелы и переводы строк на стыках кусков сохраняем как есть
+        pieces = []
+        for chunk in split_chunks(content):
+            body = chunk.strip()
+            lead = chunk[:len(chunk) - len(chunk.lstrip())]
+            tail = chunk[len(chunk.rstrip()):]
+            pieces.append((lead, body, tail, _cache_key(backend, target_lang, body) if body else None))
+
+        keys = {key for _, _, _, key in pieces if key}
+        translated = cache.get_many(keys)
+
+        missing = {key: body for _, body, _, key in pieces if key and key not in translated}
+        if missing:
+            futures = {key: _pool.submit(backend.translate, body, target_lang) for key, body in missing.items()}
+            fresh, error = {}, None
+            for key, future in futures.items():
+                try:
+                    value = future.result()
+                except Exception as e:
+                    error = error or e
+                    continue
+                # None от бэкенда — пустой ответ, в кэш не кладём
+                if value is not None:
+                    fresh[key] = value
+                translated[key] = value
+            # Удачные куски кэшируем даже при ошибке в соседних — повтор доделает только их
+            cache.put_many(fresh)
+            if error is not None:
+                raise error
+
+        return "".join(lead + ((translated[key] or body) if key else "") + tail for lead, body, tail, key in pieces)
     except Exception as e:
         # Возвращаем детальную ошибку для отладки
         return f"Translation error: {type(e).__name__} - {str(e)}"
@@ -0,0 +1,317 @@
+import os
+import errno
+import stat
+import time
+import threading
+from collections import deque
+
+from api.files import WORKSPACE_ROOT, is_visible
+from api.inotify import Inotify, IN_Q_OVERFLOW, IN_IGNORED
+from api.state import save_snapshot, load_snapshot
+
+# Постоянный in-memory индекс дерева воркспейса.
+# Строится один раз через os.scandir, дальше поддерживается событиями inotify,
+# а периодический полный пересканер страхует от потерянных событий.
+# Снимок индекса сохраняется после полных пересканов и при остановке;
+# при старте он поднимается сразу, а первый обход только досылает разницу.
+
+RESCAN_INTERVAL = 300   # страховочный пересканер при работающем inotify
+POLL_INTERVAL = 30      # если inotify недоступен или кончились watch-дескрипторы
+BATCH_DELAY = 0.2       # склеиваем пачку событий перед обработкой
+CHANGELOG_SIZE = 20000
+SNAPSHOT_NAME = "tree_index"
+
+def _child(rel, name):
+    return os.path.join(rel, name) if rel else name
+
+def _depth(rel):
+    return rel.count(os.sep) + 1
+
+def _node(rel, st, is_dir):
+    return {
+        "name": os.path.basename(rel),
+        "is_dir": is_dir,
+        "path": rel,
+        "size": st.st_size if st else 0,
+        "mtime": st.st_mtime if st else 0
+    }
+
+class TreeIndex:
+    def __init__(self, root=WORKSPACE_ROOT):
+        self.root = root
+        self.nodes = {}        # rel_path -> node без children
+        self.children = {}     # rel_dir ("" — корень) -> set имён
+        # Версия стартует от времени запуска, чтобы версии клиентов
+        # от прошлого процесса гарантированно были "слишком старыми"
+        self.version = int(time.time() * 1000)
+        self.changelog = deque(maxlen=CHANGELOG_SIZE)   # (version, path, node | None)
+        self._changelog_floor = self.version            # до этой версии журнал неполный
+        self.ready = False
+        self.lock = threading.RLock()
+        self._tree_cache = (None, None)
+        self._saved_version = None
+        self._inotify = None
+        self._watches = {}     # wd -> rel_dir
+        self._watch_limited = False
+        self._thread = None
+        self._stop = threading.Event()
+
+    def _full(self, rel):
+        return os.path.join(self.root, rel) if rel else self.root
+
+    # --- сканирование -------------------------------------------------
+
+    def _walk(self, rel):
+        # Обход поддерева rel; в индекс не пишет, возвращает (nodes, children)
+        nodes, children = {}, {}
+        stack = [rel]
+        while stack:
+            current = stack.pop()
+            self._watch(current)
+            names = set()
+            try:
+                with os.scandir(self._full(current)) as it:
+                    for entry in it:
+                        if not is_visible(entry.name): continue
+                        path = _child(current, entry.name)
+                        try:
+                            is_dir = entry.is_dir()
+                            st = entry.stat()
+                        except OSError:
+                            is_dir, st = False, None
+                        nodes[path] = _node(path, st, is_dir)
+                        names.add(entry.name)
+                        # В симлинки на каталоги не спускаемся — защита от циклов
+                        if is_dir and not entry.is_symlink():
+                            stack.append(path)
+            except OSError:
+                pass
+            children[current] = names
+        return nodes, children
+
+    def _watch(self, rel):
+        if self._inotify is None or self._watch_limited: return
+        try:
+            wd = self._inotify.add_watch(self._full(rel))
+            self._watches[wd] = rel
+        except OSError as e:
+            print(f"Tree index: watch failed for {rel or '/'}: {e}")
+            # ENOSPC: упёрлись в fs.inotify.max_user_watches — дальше живём на пересканере
+            if e.errno == errno.ENOSPC:
+                self._watch_limited = True
+
+    def rebuild(self):
+        nodes, children = self._walk("")
+        with self.lock:
+            if not self.ready:
+                self.nodes, self.children = nodes, children
+                self.ready = True
+                return
+            changes = []
+            for path, old in self.nodes.items():
+                if path not in nodes and os.path.dirname(path) in children:
+                    changes.append((path, None))
+            for path, node in nodes.items():
+                if self.nodes.get(path) != node:
+                    changes.append((path, node))
+            self.nodes, self.children = nodes, children
+            self._commit(changes)
+
+    def _sync(self, rel, changes):
+        # Приводим один путь в индексе к состоянию диска
+        parent, name = os.path.dirname(rel), os.path.basename(rel)
+        if not rel or not is_visible(name) or parent not in self.children:
+            return
+        full = self._full(rel)
+        try:
+            st = os.stat(full)
+        except OSError:
+            self._remove_subtree(rel, changes)
+            return
+        is_dir = stat.S_ISDIR(st.st_mode)
+        node = _node(rel, st, is_dir)
+        old = self.nodes.get(rel)
+        if old is not None and old["is_dir"] != is_dir:
+            self._remove_subtree(rel, changes)
+            old = None
+        if old is None and is_dir and not os.path.islink(full):
+            nodes, children = self._walk(rel)
+            # Сам каталог идёт первым, чтобы клиент применял diff сверху вниз
+            changes.append((rel, node))
+            changes.extend(nodes.items())
+            self.nodes[rel] = node
+            self.nodes.update(nodes)
+            self.children.update(children)
+        elif old != node:
+            self.nodes[rel] = node
+            changes.append((rel, node))
+        self.children[parent].add(name)
+
+    def _remove_subtree(self, rel, changes):
+        if self.nodes.pop(rel, None) is None: return
+        self.children.get(os.path.dirname(rel), set()).discard(os.path.basename(rel))
+        stack = [rel]
+        while stack:
+            current = stack.pop()
+            for name in self.children.pop(current, ()):
+                path = _child(current, name)
+                self.nodes.pop(path, None)
+                stack.append(path)
+        changes.append((rel, None))
+
+    def _commit(self, changes):
+        if not changes: return
+        self.version += 1
+        for path, node in changes:
+            if len(self.changelog) == self.changelog.maxlen:
+                self._changelog_floor = self.changelog[0][0]
+            self.changelog.append((self.version, path, node))
+
+    # --- чтение -------------------------------------------------------
+
+    def tree(self):
+        # Вложенное дерево в формате get_workspace_tree, кэшируется на версию
+        with self.lock:
+            if self._tree_cache[0] != self.version:
+                self._tree_cache = (self.version, self._build(""))
+            return self._tree_cache[1]
+
+    def _build(self, rel):
+        result = []
+        for name in sorted(self.children.get(rel, ())):
+            path = _child(rel, name)
+            node = dict(self.nodes[path])
+            if node["is_dir"]:
+                node["children"] = self._build(path)
+            result.append(node)
+        return result
+
+    def changes_since(self, since):
+        # Список изменений после версии since или None, если журнал её уже не покрывает
+        with self.lock:
+            if since >= self.version:
+                return []
+            if since < self._changelog_floor:
+                return None
+            # Порядок — позиция в журнале: версия общая на всю пачку событий
+            latest = {}     # path -> (позиция, узел) последнего изменения
+            deleted = {}    # path -> позиция последнего удаления
+            for seq, (version, path, node) in enumerate(self.changelog):
+                if version <= since: continue
+                latest[path] = (seq, node)
+                if node is None: deleted[path] = seq
+        # Применять по порядку: сначала удаления (глубокие первыми; удаление каталога уносит
+        # поддерево, в т.ч. при пересоздании), потом upsert сверху вниз — родитель раньше детей.
+        # upsert под предком, удалённым позже него, устарел и не нужен
+        def stale(path, seq):
+            parent = os.path.dirname(path)
+            while parent:
+                if deleted.get(parent, -1) > seq: return True
+                parent = os.path.dirname(parent)
+            return False
+
+        deletes = sorted(deleted, key=_depth, reverse=True)
+        upserts = sorted((path for path, (seq, node) in latest.items() if node and not stale(path, seq)), key=_depth)
+        return [{"op": "delete", "path": path} for path in deletes] + \
+               [{"op": "upsert", "path": path, "node": latest[path][1]} for path in upserts]
+
+    # --- снимок -------------------------------------------------------
+
+    def restore_snapshot(self):
+        snapshot = load_snapshot(SNAPSHOT_NAME)
+        if not snapshot or snapshot.get("root") != self.root: return False
+        try:
+            nodes = {node["path"]: node for node in snapshot["nodes"]}
+            children = {rel: set(names) for rel, names in snapshot["children"].items()}
+        except (KeyError, TypeError, AttributeError):
+            return False
+        with self.lock:
+            if self.ready: return False
+            # Версия остаётся новой: журнала прошлого процесса нет, клиенты получат дерево целиком
+            self.nodes, self.children = nodes, children
+            self.ready = True
+        return True
+
+    def save_snapshot(self):
+        with self.lock:
+            if not self.ready or self._saved_version == self.version: return
+            version = self.version
+            # Узлы не меняются на месте (только заменяются), а множества детей — меняются
+            nodes = list(self.nodes.values())
+            children = {rel: sorted(names) for rel, names in self.children.items()}
+        try:
+            save_snapshot(SNAPSHOT_NAME, {"root": self.root, "nodes": nodes, "children": children})
+            self._saved_version = version
+        except OSError as e:
+            print(f"Tree index: snapshot not saved: {e}")
+
+    # --- фоновый поток ------------------------------------------------
+
+    def start(self):
+        if self._thread is not None: return
+        self._thread = threading.Thread(target=self._run, name="tree-index", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        self.restore_snapshot()
+        try:
+            self._inotify = Inotify()
+        except OSError as e:
+            print(f"Tree index: inotify unavailable ({e}), polling every {POLL_INTERVAL}s")
+        self.rebuild()
+        self.save_snapshot()
+        next_rescan = time.monotonic() + self._rescan_interval()
+        while not self._stop.is_set():
+            if self._inotify is not None:
+                dirty = self._read_events()
+                if dirty is None:
+                    self.rebuild()
+                elif dirty:
+                    changes = []
+                    with self.lock:
+                        for rel in sorted(dirty):
+                            self._sync(rel, changes)
+                        self._commit(changes)
+            else:
+                self._stop.wait(1.0)
+            if time.monotonic() >= next_rescan:
+                self.rebuild()
+                self.save_snapshot()
+                next_rescan = time.monotonic() + self._rescan_interval()
+        if self._inotify is not None:
+            self._inotify.close()
+
+    def _rescan_interval(self):
+        if self._inotify is None or self._watch_limited:
+            return POLL_INTERVAL
+        return RESCAN_INTERVAL
+
+    def _read_events(self):
+        # Множество "грязных" путей, или None при переполнении очереди событий
+        events = self._inotify.read(timeout=1.0)
+        if not events: return set()
+        deadline = time.monotonic() + 1.0
+        while time.monotonic() < deadline:
+            more = self._inotify.read(timeout=BATCH_DELAY)
+            if not more: break
+            events.extend(more)
+        dirty = set()
+        for wd, mask, cookie, name in events:
+            if mask & IN_Q_OVERFLOW:
+                return None
+            rel = self._watches.get(wd)
+            if rel is None: continue
+            if mask & IN_IGNORED:
+                self._watches.pop(wd, None)
+                continue
+            if name:
+                dirty.add(_child(rel, name))
+            # mtime самого каталога меняется при любом изменении состава
+            if rel:
+                dirty.add(rel)
+        return dirty
+
+tree_index = TreeIndex()
@@ -0,0 +1,247 @@
+import os
+import time
+import heapq
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from api.paths import WORKSPACE_ROOT
+from api.state import save_snapshot, load_snapshot
+
+# Анализ занятого места в воркспейсе (как du -x, но с кэшем).
+# Индекс хранит запись на каждый каталог: mtime, собственные файлы, имена
+# подкаталогов и агрегаты по поддереву (размер, число файлов и каталогов,
+# крупнейшие файлы). Повторный проход делает один stat на каталог: каталог
+# с прежним mtime не перечитывается, а пересчитываются агрегаты только
+# изменившихся каталогов и их предков. Рост уже существующего файла mtime
+# каталога не меняет, поэтому в быстром проходе перепроверяются файлы,
+# менявшиеся за HOT_WINDOW, и все файлы от HOT_SIZE (логи, базы), а раз
+# в FULL_INTERVAL все каталоги перечитываются. Предел: мелкий файл, давно
+# не менявшийся и вдруг начавший расти, виден только после полного прохода.
+# Каталоги обходятся по уровням в пуле потоков (scandir/stat отпускают GIL).
+# Учитывается всё, включая скрытые каталоги и node_modules; по симлинкам
+# и в другие файловые системы не спускаемся.
+
+USAGE_WORKERS = int(os.getenv("USAGE_WORKERS", "8"))
+MAX_AGE = 30           # запрос без refresh довольствуется результатом не старше, сек
+FULL_INTERVAL = 600    # полный проход: перечитать все каталоги независимо от mtime
+HOT_WINDOW = 600       # файлы, менявшиеся за этот срок, перепроверяются в каждом проходе
+HOT_SIZE = 1024 * 1024 # файлы от этого размера перепроверяются в каждом проходе независимо от mtime
+TOP_MAX = 50
+SNAPSHOT_NAME = "usage"
+SNAPSHOT_DEPTH = 3     # размеры каких каталогов переживают перезапуск (для роста)
+
+_pool = ThreadPoolExecutor(max_workers=USAGE_WORKERS, thread_name_prefix="usage")
+
+def _child(rel, name):
+    return os.path.join(rel, name) if rel else name
+
+def _depth(rel):
+    return rel.count(os.sep) + 1 if rel else 0
+
+class DirRecord:
+    __slots__ = ("mtime_ns", "files", "subdirs", "size", "count", "dirs", "top")
+
+    def __init__(self, mtime_ns):
+        self.mtime_ns = mtime_ns
+        self.files = {}      # имя -> (size, mtime) собственных файлов
+        self.subdirs = []
+        # Агрегаты по поддереву
+        self.size = 0
+        self.count = 0
+        self.dirs = 0
+        self.top = []        # до TOP_MAX (size, rel, mtime), по убыванию размера
+
+class UsageIndex:
+    def __init__(self, root=WORKSPACE_ROOT):
+        self.root = root
+        self.records = {}        # rel_dir ("" — корень) -> DirRecord
+        self.growth = {}         # rel_dir -> изменение размера за последний проход
+        self.scanned_at = None
+        self.previous_scan = None
+        self.last_scan = {}
+        self._full_at = 0.0
+        self._from_baseline = False
+        self._dev = None
+        self.lock = threading.Lock()
+
+    def _full(self, rel):
+        return os.path.join(self.root, rel) if rel else self.root
+
+    def _list(self, rel, record, full, hot_since):
+        # -> (запись, изменилась ли); запись новая, если поменялся состав каталога
+        path = self._full(rel)
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None, True
+        if record is not None and not full and record.mtime_ns == st.st_mtime_ns:
+            changed = False
+            for name, (size, mtime) in list(record.files.items()):
+                if mtime < hot_since and size < HOT_SIZE: continue
+                try:
+                    fst = os.lstat(os.path.join(path, name))
+                except OSError:
+                    continue    # удаление сдвинет mtime каталога — подхватим следующим проходом
+                if fst.st_size != size or fst.st_mtime != mtime:
+                    record.files[name] = (fst.st_size, fst.st_mtime)
+                    changed = True
+            return record, changed
+        # mtime снят до чтения: правка во время чтения даст новый mtime и перечитку в следующий раз
+        fresh = DirRecord(st.st_mtime_ns)
+        try:
+            with os.scandir(path) as it:
+                for entry in it:
+                    try:
+                        est = entry.stat(follow_symlinks=False)
+                        if entry.is_dir(follow_symlinks=False):
+                            if est.st_dev == self._dev:
+                                fresh.subdirs.append(entry.name)
+                        else:
+                            fresh.files[entry.name] = (est.st_size, est.st_mtime)
+                    except OSError:
+                        continue
+        except OSError:
+            pass
+        return fresh, True
+
+    def _aggregate(self, rel, record, records):
+        size = 0
+        for file_size, _ in record.files.values():
+            size += file_size
+        count, dirs = len(record.files), len(record.subdirs)
+        candidates = [heapq.nlargest(TOP_MAX, ((s, _child(rel, n), m) for n, (s, m) in record.files.items()))]
+        for name in record.subdirs:
+            child = records.get(_child(rel, name))
+            if child is None: continue
+            size += child.size
+            count += child.count
+            dirs += child.dirs
+            candidates.append(child.top)
+        record.size, record.count, record.dirs = size, count, dirs
+        record.top = heapq.nlargest(TOP_MAX, (item for top in candidates for item in top))
+
+    def scan(self, full=False):
+        started = time.perf_counter()
+        old = self.records
+        full = full or not old
+        try:
+            self._dev = os.stat(self.root).st_dev
+        except OSError:
+            self.records, self.growth = {}, {}
+            return
+        hot_since = time.time() - HOT_WINDOW
+        baseline = None if old else self._load_baseline()
+        records, changed = {}, []
+        level = [""]
+        while level:
+            results = list(_pool.map(lambda rel: self._list(rel, old.get(rel), full, hot_since), level))
+            next_level = []
+            for rel, (record, dir_changed) in zip(level, results):
+                if record is None: continue    # каталог исчез во время обхода
+                if dir_changed:
+                    changed.append(rel)
+                records[rel] = record
+                next_level.extend(_child(rel, name) for name in record.subdirs)
+            level = next_level
+
+        # Пересчёт снизу вверх: изменившиеся каталоги и все их предки
+        dirty = set()
+        for rel in changed:
+            while rel not in dirty:
+                dirty.add(rel)
+                if not rel: break
+                rel = os.path.dirname(rel)
+        # Старые размеры — до пересчёта: неизменившиеся записи переиспользуются как есть
+        previous = {rel: old[rel].size for rel in dirty if rel in old}
+        for rel in sorted((r for r in dirty if r in records), key=_depth, reverse=True):
+            self._aggregate(rel, records[rel], records)
+
+        self._from_baseline = baseline is not None
+        if baseline is not None:
+            # Первый проход после перезапуска: рост относительно снимка, только для верхних уровней
+            sizes = baseline["sizes"]
+            growth = {rel: record.size - sizes.get(rel, 0) for rel, record in records.items() if _depth(rel) <= SNAPSHOT_DEPTH}
+            self.previous_scan = baseline["scanned_at"]
+        else:
+            # Новый каталог вырос с нуля; неизменившийся — на ноль (его просто нет в словаре).
+            # Самый первый проход сравнивать не с чем
+            growth = {rel: records[rel].size - previous.get(rel, 0) for rel in dirty if rel in records} if old else {}
+            self.previous_scan = self.scanned_at
+        self.records, self.growth = records, growth
+        self.scanned_at = time.time()
+        if full:
+            self._full_at = time.monotonic()
+        self.last_scan = {
+            "full": full,
+            "dirs_changed": len(changed),
+            "dirs_total": len(records),
+            "ms": round((time.perf_counter() - started) * 1000, 1)
+        }
+        if changed or baseline is not None:
+            self._save_baseline()
+
+    def _load_baseline(self):
+        snapshot = load_snapshot(SNAPSHOT_NAME)
+        if not snapshot or snapshot.get("root") != self.root: return None
+        if not isinstance(snapshot.get("sizes"), dict): return None
+        return snapshot
+
+    def _save_baseline(self):
+        # Только верхние уровни: этого хватает понять, какой проект вырос за время простоя
+        sizes = {rel: record.size for rel, record in self.records.items() if _depth(rel) <= SNAPSHOT_DEPTH}
+        try:
+            save_snapshot(SNAPSHOT_NAME, {"root": self.root, "scanned_at": self.scanned_at, "sizes": sizes})
+        except OSError as e:
+            print(f"Usage snapshot not saved: {e}")
+
+    def _growth(self, rel):
+        # None — сравнивать не с чем: первый проход или каталог глубже снимка
+        if rel in self.growth: return self.growth[rel]
+        if self.previous_scan is None or self._from_baseline: return None
+        return 0
+
+    def usage(self, path="", top=20, refresh=False):
+        rel = os.path.normpath(path or ".")
+        if rel == ".": rel = ""
+        if rel == ".." or rel.startswith(".." + os.sep) or os.path.isabs(rel):
+            return {"error": "Access denied"}
+        top = max(1, min(top, TOP_MAX))
+        with self.lock:
+            # Параллельные запросы ждут один общий проход, а не запускают свои
+            stale = self.scanned_at is None or time.time() - self.scanned_at >= MAX_AGE
+            if refresh or stale:
+                self.scan(full=time.monotonic() - self._full_at >= FULL_INTERVAL)
+            record = self.records.get(rel)
+            if record is None:
+                return {"error": "Directory not found"}
+            children = []
+            for name in record.subdirs:
+                child_rel = _child(rel, name)
+                child = self.records.get(child_rel)
+                if child is None: continue
+                children.append({
+                    "name": name,
+                    "path": child_rel,
+                    "size": child.size,
+                    "files": child.count,
+                    "dirs": child.dirs,
+                    "percent": round(child.size / record.size * 100, 1) if record.size else 0,
+                    "growth": self._growth(child_rel)
+                })
+            children.sort(key=lambda c: c["size"], reverse=True)
+            own_size = sum(size for size, _ in record.files.values())
+            return {
+                "path": rel,
+                "size": record.size,
+                "files": record.count,
+                "dirs": record.dirs,
+                "growth": self._growth(rel),
+                "own_files": {"size": own_size, "files": len(record.files)},
+                "children": children,
+                "largest_files": [{"path": p, "size": s, "mtime": m} for s, p, m in record.top[:top]],
+                "scanned_at": self.scanned_at,
+                "previous_scan": self.previous_scan,
+                "scan": self.last_scan
+            }
+
+usage_index = UsageIndex()
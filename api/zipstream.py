@@ -0,0 +1,157 @@
+import os
+import time
+import zlib
+import struct
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+from api.instrument import count_read
+
+# Потоковая запись ZIP: каждый файл сжимается кусками и сразу отдаётся наружу.
+# Размеры и CRC пишутся в data descriptor после данных, все записи — zip64,
+# поэтому ни seek, ни буфер на весь архив не нужны.
+
+ZIP_STORED = 0
+ZIP_DEFLATED = 8
+ZIP_ZSTANDARD = 93
+
+READ_SIZE = 64 * 1024
+OUT_CHUNK = 256 * 1024
+
+_LOCAL = struct.Struct('<IHHHHHIIIHH')
+_CENTRAL = struct.Struct('<IHHHHHHIIIHHHHHII')
+_DESCRIPTOR = struct.Struct('<IIQQ')
+_ZIP64_EOCD = struct.Struct('<IQHHIIQQQQ')
+_ZIP64_LOCATOR = struct.Struct('<IIQI')
+_EOCD = struct.Struct('<IHHHHIIH')
+
+_FLAGS = 0x08 | 0x800       # data descriptor + имена в UTF-8
+_VERSION = 45               # zip64
+_MADE_BY = (3 << 8) | _VERSION
+
+def _dos_datetime(mtime):
+    t = time.localtime(mtime)
+    if t.tm_year < 1980:
+        return 0, (1 << 5) | 1
+    return (t.tm_hour << 11) | (t.tm_min << 5) | (t.tm_sec // 2), ((t.tm_year - 1980) << 9) | (t.tm_mon << 5) | t.tm_mday
+
+def make_compressor(method, level):
+    # Объект с compress()/flush() для потокового сжатия; None — без сжатия
+    if method == ZIP_DEFLATED:
+        return zlib.compressobj(level, zlib.DEFLATED, -15)
+    if method == ZIP_ZSTANDARD:
+        if zstandard is None:
+            raise ValueError("zstd compression requires the 'zstandard' package")
+        return zstandard.ZstdCompressor(level=level).compressobj()
+    return None
+
+def compress_bytes(data, method, level):
+    compressor = make_compressor(method, level)
+    if compressor is None:
+        return data
+    return compressor.compress(data) + compressor.flush()
+
+class ZipStream:
+    def __init__(self):
+        self.offset = 0
+        self.entries = []
+
+    def _out(self, data):
+        self.offset += len(data)
+        return data
+
+    def _local_header(self, name, method, mtime):
+        dos_time, dos_date = _dos_datetime(mtime)
+        # zip64 extra с нулями: настоящие размеры придут в data descriptor
+        extra = struct.pack('<HHQQ', 1, 16, 0, 0)
+        header = _LOCAL.pack(0x04034b50, _VERSION, _FLAGS, method, dos_time, dos_date,
+                             0, 0xFFFFFFFF, 0xFFFFFFFF, len(name), len(extra))
+        return header + name + extra
+
+    def add_file(self, path, arcname, method=ZIP_DEFLATED, level=6, hasher=None):
+        # Генератор байтов одной записи архива; hasher (hashlib) получает исходные данные
+        try:
+            f = open(path, 'rb')
+            st = os.fstat(f.fileno())
+        except OSError as e:
+            print(f"Zip stream: skip {path}: {e}")
+            return
+        with f:
+            name = arcname.replace(os.sep, '/').encode('utf-8')
+            offset = self.offset
+            yield self._out(self._local_header(name, method, st.st_mtime))
+            compressor = make_compressor(method, level)
+            crc = usize = csize = 0
+            while True:
+                chunk = f.read(READ_SIZE)
+                if not chunk: break
+                usize += len(chunk)
+                crc = zlib.crc32(chunk, crc)
+                if hasher: hasher.update(chunk)
+                data = compressor.compress(chunk) if compressor else chunk
+                if data:
+                    csize += len(data)
+                    yield self._out(data)
+            if compressor:
+                data = compressor.flush()
+                csize += len(data)
+                yield self._out(data)
+        count_read(usize)
+        yield self._out(_DESCRIPTOR.pack(0x08074b50, crc, csize, usize))
+        self.entries.append((name, method, st.st_mtime, crc, csize, usize, offset, st.st_mode))
+
+    def add_compressed(self, arcname, payload, crc, usize, method, mtime, mode=0o100644):
+        # Запись с уже сжатыми данными (например, из пула процессов)
+        name = arcname.replace(os.sep, '/').encode('utf-8')
+        offset = self.offset
+        yield self._out(self._local_header(name, method, mtime))
+        yield self._out(payload)
+        yield self._out(_DESCRIPTOR.pack(0x08074b50, crc, len(payload), usize))
+        self.entries.append((name, method, mtime, crc, len(payload), usize, offset, mode))
+
+    def close(self):
+        cd_offset = self.offset
+        for name, method, mtime, crc, csize, usize, offset, mode in self.entries:
+            dos_time, dos_date = _dos_datetime(mtime)
+            extra = struct.pack('<HHQQQ', 1, 24, usize, csize, offset)
+            header = _CENTRAL.pack(0x02014b50, _MADE_BY, _VERSION, _FLAGS, method, dos_time, dos_date,
+                                   crc, 0xFFFFFFFF, 0xFFFFFFFF, len(name), len(extra), 0, 0, 0,
+                                   (mode & 0xFFFF) << 16, 0xFFFFFFFF)
+            yield self._out(header + name + extra)
+        cd_size = self.offset - cd_offset
+        count = len(self.entries)
+        eocd64_offset = self.offset
+        yield self._out(_ZIP64_EOCD.pack(0x06064b50, _ZIP64_EOCD.size - 12, _MADE_BY, _VERSION,
+                                         0, 0, count, count, cd_size, cd_offset))
+        yield self._out(_ZIP64_LOCATOR.pack(0x07064b50, 0, eocd64_offset, 1))
+        yield self._out(_EOCD.pack(0x06054b50, 0, 0, min(count, 0xFFFF), min(count, 0xFFFF),
+                                   min(cd_size, 0xFFFFFFFF), min(cd_offset, 0xFFFFFFFF), 0))
+
+def coalesce(chunks, size=OUT_CHUNK):
+    # Склеиваем мелкие куски, чтобы не гонять по сокету десятки байт за раз
+    buf = bytearray()
+    try:
+        for chunk in chunks:
+            buf += chunk
+            if len(buf) >= size:
+                yield bytes(buf)
+                buf.clear()
+        if buf:
+            yield bytes(buf)
+    finally:
+        # Закрытие снаружи (клиент отключился) доходит до исходного генератора сразу, а не при GC
+        close = getattr(chunks, "close", None)
+        if close is not None: close()
+
+def stream_directory(root):
+    zs = ZipStream()
+    def generate():
+        for current, dirs, files in os.walk(root):
+            for file in files:
+                full_path = os.path.join(current, file)
+                yield from zs.add_file(full_path, os.path.relpath(full_path, root))
+        yield from zs.close()
+    return coalesce(generate())
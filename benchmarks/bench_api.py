@@ -0,0 +1,320 @@
+import os
+import sys
+import json
+import time
+import socket
+import asyncio
+import argparse
+import platform
+import tempfile
+import threading
+import tracemalloc
+import subprocess
+
+import httpx
+import psutil
+
+# Нагрузочный бенчмарк API дашборда поверх синтетического воркспейса.
+# Гоняет эндпоинты in-process (ASGI) и через настоящий uvicorn на растущей
+# конкурентности, считает p50/p99, пропускную способность и пиковый RSS,
+# отдельно — память триграммного индекса поиска, сохраняет результат в JSON
+# и умеет сравнивать его с прошлым прогоном.
+#
+#   python benchmarks/bench_api.py --files 5000 --concurrency 1,4,16
+#   python benchmarks/bench_api.py --compare benchmarks/results/<old>.json
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import workspace
+
+TOKEN = "bench-master-key"
+RESULTS_DIR = os.path.join(ROOT, "benchmarks", "results")
+
+# name -> (url, тяжёлый ли запрос)
+ENDPOINTS = {
+    "status": ("/api/status", False),
+    "projects": ("/api/projects?details=true", False),
+    "files_read": ("/api/files/read?path=memory/big.log&page=2", False),
+    "backup": ("/api/system/backup?mode=full", True),
+    "project_download": ("/api/projects/project_0/download", True),
+}
+
+class RssSampler:
+    # Пиковый RSS процесса вместе с детьми (воркеры бэкапа, git, CLI)
+    def __init__(self, pid, interval=0.02):
+        self.process = psutil.Process(pid)
+        self.interval = interval
+        self.peak = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _rss(self):
+        total = 0
+        try:
+            procs = [self.process] + self.process.children(recursive=True)
+        except psutil.Error:
+            return 0
+        for proc in procs:
+            try:
+                total += proc.memory_info().rss
+            except psutil.Error:
+                continue
+        return total
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.peak = max(self.peak, self._rss())
+
+    def __enter__(self):
+        self.peak = self._rss()
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+def percentile(values, q):
+    if not values: return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(q / 100 * (len(ordered) - 1)))))
+    return ordered[index]
+
+async def run_level(client, url, requests, concurrency):
+    latencies = []
+    errors = 0
+    received = 0
+    remaining = requests
+
+    async def worker():
+        nonlocal errors, received, remaining
+        while remaining > 0:
+            remaining -= 1
+            start = time.perf_counter()
+            try:
+                async with client.stream("GET", url) as response:
+                    async for chunk in response.aiter_raw():
+                        received += len(chunk)
+                    if response.status_code >= 400:
+                        errors += 1
+            except httpx.HTTPError:
+                errors += 1
+            latencies.append(time.perf_counter() - start)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    wall = time.perf_counter() - started
+    return {
+        "requests": requests,
+        "errors": errors,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+        "mean_ms": round(sum(latencies) / len(latencies) * 1000, 2) if latencies else 0,
+        "rps": round(requests / wall, 2) if wall else 0,
+        "bytes": received,
+    }
+
+async def run_suite(client, pid, mode, args):
+    results = []
+    for name in args.endpoints:
+        path, heavy = ENDPOINTS[name]
+        url = path + ("&" if "?" in path else "?") + f"token={TOKEN}"
+        for concurrency in args.concurrency:
+            if heavy and concurrency > args.heavy_max_concurrency:
+                continue
+            requests = max(concurrency, args.heavy_requests if heavy else args.requests)
+            # Прогрев: первый запрос заполняет кэши и не попадает в статистику
+            await run_level(client, url, 1, 1)
+            with RssSampler(pid) as rss:
+                stats = await run_level(client, url, requests, concurrency)
+            stats.update({"endpoint": name, "mode": mode, "concurrency": concurrency,
+                          "peak_rss_mb": round(rss.peak / 1024 / 1024, 1)})
+            results.append(stats)
+            print(f"{mode:<10}{name:<18}{concurrency:>4}{stats['p50_ms']:>10.1f}{stats['p99_ms']:>10.1f}"
+                  f"{stats['rps']:>10.1f}{stats['peak_rss_mb']:>10.1f}{stats['errors']:>7}")
+    return results
+
+async def wait_ready(client, timeout=60):
+    # Дерево строится в фоне; ждём, пока индекс поднимется
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            response = await client.get(f"/api/files/tree?token={TOKEN}")
+            if response.status_code == 200: return
+        except httpx.HTTPError:
+            pass
+        await asyncio.sleep(0.2)
+    raise RuntimeError("dashboard did not become ready")
+
+async def inprocess(args):
+    import server
+    transport = httpx.ASGITransport(app=server.app)
+    async with server.app.router.lifespan_context(server.app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+            await wait_ready(client)
+            return await run_suite(client, os.getpid(), "inprocess", args)
+
+def measure_search_index():
+    # Память триграммного индекса поиска (api/search.py) на всём воркспейсе:
+    # живые аллокации после построения, на каждый проиндексированный байт текста
+    from api.search import TrigramIndex, _workspace_files
+    files, _ = _workspace_files()
+    index = TrigramIndex()
+    tracemalloc.start()
+    started = time.perf_counter()
+    index.sync(files)
+    build_ms = (time.perf_counter() - started) * 1000
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return {
+        "files": len(index.paths),
+        "indexed_mb": round(index.indexed_bytes / 1024 / 1024, 2),
+        "memory_mb": round(memory / 1024 / 1024, 2),
+        "bytes_per_indexed_byte": round(memory / index.indexed_bytes, 2) if index.indexed_bytes else None,
+        "trigrams": len(index.postings),
+        "build_ms": round(build_ms, 1),
+    }
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+async def over_uvicorn(args, env):
+    port = _free_port()
+    command = [sys.executable, "-m", "uvicorn", "server:app", "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"]
+    mode = "uvicorn"
+    if args.workers > 1:
+        # Как server.py --workers: общий кэш в SQLite, лидер держит индексы и сэмплер
+        command += ["--workers", str(args.workers)]
+        env = dict(env, CACHE_BACKEND="sqlite", CACHE_PATH=os.path.join(env["DASHBOARD_STATE_DIR"], "shared_cache.db"))
+        mode = f"uvicorn-w{args.workers}"
+    proc = subprocess.Popen(command, cwd=ROOT, env=env)
+    try:
+        limits = httpx.Limits(max_connections=max(args.concurrency) * 2)
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", timeout=None, limits=limits) as client:
+            await wait_ready(client)
+            return await run_suite(client, proc.pid, mode, args)
+    finally:
+        proc.terminate()
+        proc.wait(10)
+
+def compare(current, baseline_path, threshold):
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    key = lambda r: (r["mode"], r["endpoint"], r["concurrency"])
+    old = {key(r): r for r in baseline["results"]}
+    regressions = 0
+    print(f"\nvs {baseline_path}")
+    print(f"{'mode':<10}{'endpoint':<18}{'conc':>4}{'p50 Δ%':>10}{'p99 Δ%':>10}{'rps Δ%':>10}")
+    for result in current:
+        before = old.get(key(result))
+        if not before: continue
+        deltas = []
+        for field in ("p50_ms", "p99_ms", "rps"):
+            base = before[field] or 1e-9
+            deltas.append((result[field] - base) / base * 100)
+        flag = ""
+        # Медленнее по p50 или меньше rps сверх порога — регрессия
+        if deltas[0] > threshold or deltas[2] < -threshold:
+            flag = "  REGRESSION"
+            regressions += 1
+        print(f"{result['mode']:<10}{result['endpoint']:<18}{result['concurrency']:>4}"
+              f"{deltas[0]:>+10.1f}{deltas[1]:>+10.1f}{deltas[2]:>+10.1f}{flag}")
+    return regressions
+
+def _git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True).stdout.strip()
+    except OSError:
+        return None
+
+def main():
+    parser = argparse.ArgumentParser(description="Dashboard API load benchmark")
+    parser.add_argument("--files", type=int, default=2000)
+    parser.add_argument("--depth", type=int, default=4)
+    parser.add_argument("--size", type=int, default=4096)
+    parser.add_argument("--projects", type=int, default=3)
+    parser.add_argument("--sessions", type=int, default=20)
+    parser.add_argument("--concurrency", default="1,4,16")
+    parser.add_argument("--requests", type=int, default=200, help="requests per level for light endpoints")
+    parser.add_argument("--heavy-requests", type=int, default=4, help="requests per level for backup/download")
+    parser.add_argument("--heavy-max-concurrency", type=int, default=4)
+    parser.add_argument("--endpoints", default=",".join(ENDPOINTS))
+    parser.add_argument("--mode", choices=["inprocess", "uvicorn", "both"], default="both")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers in uvicorn mode")
+    parser.add_argument("--home", help="reuse an existing synthetic home instead of generating one")
+    parser.add_argument("--out", help="result file (default: benchmarks/results/<timestamp>.json)")
+    parser.add_argument("--compare", help="baseline result file to compare against")
+    parser.add_argument("--threshold", type=float, default=20.0, help="regression threshold, %%")
+    args = parser.parse_args()
+    args.concurrency = [int(c) for c in args.concurrency.split(",")]
+    args.endpoints = [e for e in args.endpoints.split(",") if e]
+    unknown = [e for e in args.endpoints if e not in ENDPOINTS]
+    if unknown:
+        parser.error(f"unknown endpoints: {', '.join(unknown)}")
+
+    tmp = None
+    if args.home:
+        home = args.home
+        env_vars = {
+            "OPENCLAW_HOME": home,
+            "OPENCLAW_CLI": os.path.join(home, "bin", "openclaw"),
+            "DASHBOARD_GIT_ROOT": os.path.join(home, "workspace", "projects", "dashboard"),
+            "DASHBOARD_STATE_DIR": os.path.join(home, "state"),
+        }
+    else:
+        tmp = tempfile.TemporaryDirectory(prefix="letto-bench-")
+        home = tmp.name
+        print(f"Generating workspace in {home} ({args.files} files)...")
+        env_vars = workspace.build(home, args.files, args.depth, args.size, args.projects, args.sessions)
+    env_vars["MASTER_KEY"] = TOKEN
+    # Окружение должно быть выставлено до импорта server / api.*
+    os.environ.update(env_vars)
+    env = dict(os.environ)
+
+    print(f"\n{'mode':<10}{'endpoint':<18}{'conc':>4}{'p50 ms':>10}{'p99 ms':>10}{'rps':>10}{'RSS MB':>10}{'errors':>7}")
+    results = []
+    try:
+        if args.mode in ("inprocess", "both"):
+            results += asyncio.run(inprocess(args))
+        if args.mode in ("uvicorn", "both"):
+            results += asyncio.run(over_uvicorn(args, env))
+        search_index = measure_search_index()
+        print(f"\nsearch index: {search_index['files']} files, {search_index['indexed_mb']} MB text -> "
+              f"{search_index['memory_mb']} MB memory ({search_index['bytes_per_indexed_byte']} B/B), "
+              f"built in {search_index['build_ms']:.0f} ms")
+    finally:
+        if tmp is not None:
+            tmp.cleanup()
+
+    report = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "revision": _git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "workspace": {"files": args.files, "depth": args.depth, "size": args.size,
+                          "projects": args.projects, "sessions": args.sessions},
+            "requests": args.requests,
+            "heavy_requests": args.heavy_requests,
+            "workers": args.workers,
+        },
+        "results": results,
+        "search_index": search_index,
+    }
+    out = args.out or os.path.join(RESULTS_DIR, f"{time.strftime('%Y%m%d_%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\nSaved {out}")
+
+    if args.compare:
+        regressions = compare(results, args.compare, args.threshold)
+        sys.exit(1 if regressions else 0)
+
+if __name__ == "__main__":
+    main()
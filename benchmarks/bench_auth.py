@@ -0,0 +1,61 @@
+import os
+import sys
+import json
+import time
+import timeit
+import tempfile
+from datetime import datetime
+
+# Микробенчмарк проверки токена: старая verify_token (getenv + exists + json.load
+# на каждый запрос) против TokenStore из api/auth.py.
+# Запуск: python benchmarks/bench_auth.py [--number 20000]
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+MASTER_KEY = "bench-master-key"
+FILE_TOKEN = "482913"
+
+def legacy_verify_token(token, token_file):
+    # Копия api/auth.verify_token до кэширования
+    master_key = os.getenv('MASTER_KEY')
+    if master_key and token == master_key:
+        return True
+    if not os.path.exists(token_file):
+        return False
+    try:
+        with open(token_file, 'r') as f:
+            stored = json.load(f)
+        return stored['token'] == token and datetime.now().timestamp() < stored['expires_at']
+    except:
+        return False
+
+def main():
+    number = 20000
+    if "--number" in sys.argv:
+        number = int(sys.argv[sys.argv.index("--number") + 1])
+
+    os.environ['MASTER_KEY'] = MASTER_KEY
+    from api.auth import TokenStore
+
+    with tempfile.TemporaryDirectory() as tmp:
+        token_file = os.path.join(tmp, "tokens.json")
+        with open(token_file, 'w') as f:
+            json.dump({"token": FILE_TOKEN, "expires_at": time.time() + 3600}, f)
+        store = TokenStore(token_file)
+
+        cases = [
+            ("master key", MASTER_KEY),
+            ("file token", FILE_TOKEN),
+            ("wrong token", "000000"),
+        ]
+        print(f"{'case':<14}{'legacy, us':>12}{'cached, us':>12}{'speedup':>10}")
+        for name, token in cases:
+            assert legacy_verify_token(token, token_file) == store.verify(token)
+            legacy = timeit.timeit(lambda: legacy_verify_token(token, token_file), number=number)
+            cached = timeit.timeit(lambda: store.verify(token), number=number)
+            legacy_us = legacy / number * 1e6
+            cached_us = cached / number * 1e6
+            print(f"{name:<14}{legacy_us:>12.2f}{cached_us:>12.2f}{legacy_us / cached_us:>9.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+import os
+import re
+import sys
+import json
+import time
+import random
+import tracemalloc
+
+# Бенчмарк разбора `openclaw sessions list` на синтетическом выводе с тысячами сессий:
+# прежние разборы (json.loads целиком / построчный regex) против api/parser.py.
+# Запуск: python benchmarks/bench_parser.py [--sessions 5000]
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api.parser import parse_sessions, pick_main, to_num, _from_json
+
+MODELS = ["google/gemini-2.5-pro", "openai/gpt-4.1", "anthropic/sonnet", "local/qwen"]
+KINDS = ["direct", "group", "cron"]
+
+def synthetic_sessions(n):
+    random.seed(42)
+    now = int(time.time() * 1000)
+    items = []
+    for i in range(n):
+        items.append({
+            "key": "agent:main:main" if i == n // 2 else f"agent:worker{i % 50}:session{i}",
+            "kind": random.choice(KINDS),
+            "model": random.choice(MODELS),
+            "totalTokens": random.randint(0, 1000000),
+            "contextTokens": 1048576,
+            "updatedAt": now - random.randint(0, 86400000)
+        })
+    return items
+
+def as_text(items):
+    lines = ["Kind   Key   Age   Model   Tokens"]
+    for item in items:
+        used = f"{item['totalTokens'] / 1000:.1f}k"
+        percent = int(item['totalTokens'] / item['contextTokens'] * 100)
+        lines.append(f"{item['kind']} {item['key']} {random.randint(1, 59)}m ago {item['model']} {used}/1049k ({percent}%)")
+    return "\n".join(lines) + "\n"
+
+def legacy_json(output):
+    # Прежний api/system.get_ai_context: весь вывод в json.loads, наружу — только главная сессия
+    sessions = json.loads(output)
+    main = next((s for s in sessions if "main" in s.get("key", "")), sessions[0])
+    return {"used": main.get("totalTokens", 0), "model": main.get("model", "unknown")}
+
+def legacy_json_all(output):
+    # json.loads + та же нормализация, что в парсере, — честное сравнение с parser json
+    now = time.time()
+    return [_from_json(item, now) for item in json.loads(output)]
+
+def legacy_text(output):
+    # Прежний api/parser.get_latest_context: splitlines + regex на каждую строку
+    for line in output.splitlines():
+        if "agent:main:main" in line:
+            match = re.search(r"(\S+)\s+([\d\.]+[km]?)\s*/\s*([\d\.]+[km]?)\s*\(([\d\.]+)%\)", line)
+            if match:
+                return match.groups()
+    return None
+
+def legacy_text_all(output):
+    # Тот же построчный разбор, но для всех сессий — честное сравнение с parser text
+    sessions = []
+    for line in output.splitlines():
+        match = re.search(r"(\S+)\s+([\d\.]+[km]?)\s*/\s*([\d\.]+[km]?)\s*\(([\d\.]+)%\)", line)
+        if match:
+            model_path, used_str, limit_str, percent_str = match.groups()
+            sessions.append({"used": to_num(used_str), "total": to_num(limit_str), "percent": int(float(percent_str)), "model": model_path})
+    return sessions
+
+def measure(fn, arg, repeat):
+    fn(arg)
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = fn(arg)
+    elapsed = (time.perf_counter() - start) / repeat
+    tracemalloc.start()
+    fn(arg)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+def main():
+    n = 5000
+    if "--sessions" in sys.argv:
+        n = int(sys.argv[sys.argv.index("--sessions") + 1])
+    repeat = 20
+    items = synthetic_sessions(n)
+    json_output = json.dumps(items, indent=2)
+    text_output = as_text(items)
+    print(f"{n} sessions: JSON {len(json_output) / 1024:.0f} KB, text {len(text_output) / 1024:.0f} KB\n")
+
+    cases = [
+        ("legacy json (loads all)", legacy_json, json_output),
+        ("json.loads (all)", legacy_json_all, json_output),
+        ("parser json (all)", parse_sessions, json_output),
+        ("legacy text (main only)", legacy_text, text_output),
+        ("legacy text (all)", legacy_text_all, text_output),
+        ("parser text (all)", parse_sessions, text_output),
+    ]
+    print(f"{'case':<26}{'ms':>9}{'peak KB':>10}{'sessions':>10}")
+    for name, fn, output in cases:
+        result, elapsed, peak = measure(fn, output, repeat)
+        count = len(result) if isinstance(result, list) else 1
+        print(f"{name:<26}{elapsed * 1000:>9.2f}{peak / 1024:>10.0f}{count:>10}")
+
+    main_session = pick_main(parse_sessions(json_output))
+    assert main_session["key"] == "agent:main:main"
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,209 @@
+import os
+import sys
+import json
+import time
+import shutil
+import signal
+import socket
+import argparse
+import platform
+import statistics
+import subprocess
+import tempfile
+
+import httpx
+
+# Бенчмарк старта дашборда поверх синтетического воркспейса.
+# 1. Время импорта: python -X importtime -c "import server", медианы по модулям —
+#    прямые импорты server (api.* и сторонние пакеты) и самые дорогие по self.
+# 2. Время до первого ответа: запуск server.py, опрос до первого ответа на /,
+#    на /api/status, до готовности индекса дерева (/api/files/tree) и время
+#    первого /api/projects?details=true. Холодный старт — без снимков
+#    в scripts/snapshots/, тёплый — со снимками, сохранёнными при остановке.
+#
+#   python benchmarks/bench_startup.py --files 5000 --runs 5
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import workspace
+
+TOKEN = "bench-master-key"
+RESULTS_DIR = os.path.join(ROOT, "benchmarks", "results")
+# Модули, которые не должны грузиться при старте (лениво по первому запросу)
+LAZY = ("requests", "deep_translator", "multiprocessing", "api.backup", "api.translate")
+
+def import_times(env):
+    # {модуль: (self_us, cumulative_us, уровень вложенности, корневой импорт)} за один запуск.
+    # importtime печатает детей раньше родителя: корень (уровень 0) узнаём, дойдя до него
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import server"],
+        cwd=ROOT, env=env, capture_output=True, text=True
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"import server failed:\n{proc.stderr[-2000:]}")
+    modules, pending = {}, []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line: continue
+        parts = line[len("import time:"):].split("|")
+        if not parts[0].strip().isdigit(): continue    # строка заголовка
+        name = parts[2].rstrip()
+        level = (len(name) - len(name.lstrip())) // 2
+        name = name.strip()
+        pending.append((name, int(parts[0]), int(parts[1]), level))
+        if level == 0:
+            # site/sitecustomize тоже корни — их импорты к старту дашборда не относятся
+            for child, self_us, cumulative_us, child_level in pending:
+                modules[child] = (self_us, cumulative_us, child_level, name)
+            pending = []
+    return modules
+
+def measure_imports(env, runs):
+    samples = [import_times(env) for _ in range(runs)]
+    merged = {}
+    for name in samples[-1]:
+        values = [s[name] for s in samples if name in s]
+        merged[name] = {
+            "self_ms": round(statistics.median(v[0] for v in values) / 1000, 2),
+            "cumulative_ms": round(statistics.median(v[1] for v in values) / 1000, 2),
+            "level": values[-1][2],
+            "root": values[-1][3]
+        }
+    return merged
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def _wait(client, url, started, timeout):
+    # Секунды от запуска процесса до первого ответа 200 на url
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if client.get(url).status_code == 200:
+                return round(time.perf_counter() - started, 3)
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.01)
+    raise RuntimeError(f"no 200 from {url} within {timeout}s")
+
+def start_once(env, timeout):
+    port = _free_port()
+    started = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "server.py", "--port", str(port)],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        with httpx.Client(base_url=f"http://127.0.0.1:{port}", timeout=timeout) as client:
+            result = {"first_response_s": _wait(client, "/", started, timeout)}
+            result["first_status_s"] = _wait(client, f"/api/status?token={TOKEN}", started, timeout)
+            result["tree_ready_s"] = _wait(client, f"/api/files/tree?token={TOKEN}", started, timeout)
+            request_started = time.perf_counter()
+            client.get(f"/api/projects?details=true&token={TOKEN}")
+            result["projects_ms"] = round((time.perf_counter() - request_started) * 1000, 1)
+        return result
+    finally:
+        # SIGTERM — штатная остановка: shutdown-хук сохраняет снимки для следующего (тёплого) старта
+        proc.send_signal(signal.SIGTERM)
+        try:
+            proc.wait(30)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+
+def measure_startup(env, runs, timeout):
+    snapshots = os.path.join(env["DASHBOARD_STATE_DIR"], "snapshots")
+    results = {"cold": [], "warm": []}
+    for _ in range(runs):
+        shutil.rmtree(snapshots, ignore_errors=True)
+        results["cold"].append(start_once(env, timeout))
+        # Прошлый запуск остановлен штатно — снимки на месте
+        results["warm"].append(start_once(env, timeout))
+    summary = {}
+    for scenario, samples in results.items():
+        summary[scenario] = {key: statistics.median(s[key] for s in samples) for key in samples[0]}
+    return summary, results
+
+def main():
+    parser = argparse.ArgumentParser(description="Letto Dashboard startup benchmark")
+    parser.add_argument("--files", type=int, default=2000)
+    parser.add_argument("--depth", type=int, default=4)
+    parser.add_argument("--size", type=int, default=4096)
+    parser.add_argument("--projects", type=int, default=3)
+    parser.add_argument("--sessions", type=int, default=20)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--top", type=int, default=15, help="how many modules to list")
+    parser.add_argument("--timeout", type=float, default=60)
+    parser.add_argument("--home", help="reuse an existing synthetic home instead of generating one")
+    parser.add_argument("--out", help="result file (default: benchmarks/results/startup_<timestamp>.json)")
+    args = parser.parse_args()
+
+    tmp = None
+    if args.home:
+        home = args.home
+        env_vars = {
+            "OPENCLAW_HOME": home,
+            "OPENCLAW_CLI": os.path.join(home, "bin", "openclaw"),
+            "DASHBOARD_GIT_ROOT": os.path.join(home, "workspace", "projects", "dashboard"),
+            "DASHBOARD_STATE_DIR": os.path.join(home, "state"),
+        }
+    else:
+        tmp = tempfile.TemporaryDirectory(prefix="letto-bench-")
+        home = tmp.name
+        print(f"Generating workspace in {home} ({args.files} files)...")
+        env_vars = workspace.build(home, args.files, args.depth, args.size, args.projects, args.sessions)
+    env_vars["MASTER_KEY"] = TOKEN
+    env = dict(os.environ, **env_vars)
+    os.makedirs(env["DASHBOARD_STATE_DIR"], exist_ok=True)
+
+    try:
+        modules = measure_imports(env, args.runs)
+        startup, samples = measure_startup(env, args.runs, args.timeout)
+    finally:
+        if tmp is not None:
+            tmp.cleanup()
+
+    total = modules.get("server", {}).get("cumulative_ms", 0)
+    print(f"\nimport server: {total:.1f} ms (median of {args.runs})")
+    own = {name: stats for name, stats in modules.items() if stats["root"] == "server"}
+    direct = sorted((m for m in own.items() if m[1]["level"] == 1), key=lambda m: -m[1]["cumulative_ms"])
+    print(f"\n{'direct import':<32}{'cumul ms':>10}{'self ms':>10}")
+    for name, stats in direct[:args.top]:
+        print(f"{name:<32}{stats['cumulative_ms']:>10.1f}{stats['self_ms']:>10.1f}")
+    heaviest = sorted(own.items(), key=lambda m: -m[1]["self_ms"])
+    print(f"\n{'heaviest by self time':<32}{'self ms':>10}")
+    for name, stats in heaviest[:args.top]:
+        print(f"{name:<32}{stats['self_ms']:>10.1f}")
+    loaded = [name for name in LAZY if name in modules]
+    print(f"\nlazy modules loaded at startup: {', '.join(loaded) or 'none'}")
+
+    print(f"\n{'scenario':<10}{'first /':>10}{'status':>10}{'tree':>10}{'projects':>12}")
+    for scenario, stats in startup.items():
+        print(f"{scenario:<10}{stats['first_response_s']:>9.3f}s{stats['first_status_s']:>9.3f}s"
+              f"{stats['tree_ready_s']:>9.3f}s{stats['projects_ms']:>10.1f}ms")
+
+    report = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "workspace": {"files": args.files, "depth": args.depth, "size": args.size,
+                          "projects": args.projects, "sessions": args.sessions},
+            "runs": args.runs,
+        },
+        "import_ms": total,
+        "modules": modules,
+        "lazy_loaded": loaded,
+        "startup": startup,
+        "samples": samples,
+    }
+    out = args.out or os.path.join(RESULTS_DIR, f"startup_{time.strftime('%Y%m%d_%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\nSaved {out}")
+
+if __name__ == "__main__":
+    main()
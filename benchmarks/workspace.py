@@ -0,0 +1,125 @@
+import os
+import sys
+import json
+import stat
+import random
+import argparse
+import subprocess
+
+# Синтетическое окружение OpenClaw для бенчмарков: воркспейс с деревом файлов
+# заданного размера, git-репозитории в projects/, HEARTBEAT, cron и заглушка
+# CLI `openclaw`, печатающая список сессий. Дашборд направляется на него
+# через OPENCLAW_HOME / OPENCLAW_CLI / DASHBOARD_GIT_ROOT (см. api/paths.py).
+# Запуск отдельно: python benchmarks/workspace.py /tmp/bench-home --files 5000
+
+WORDS = "agent memory task heartbeat project deploy commit server задача память проект лог ошибка".split()
+EXTENSIONS = [".md", ".md", ".txt", ".py", ".json", ".log"]
+
+STUB_CLI = '''#!{python}
+import json, sys, time
+# Заглушка openclaw: `sessions list` -> JSON-массив сессий
+n = {sessions}
+now = int(time.time() * 1000)
+sessions = [{{"key": "agent:main:main" if i == 0 else "agent:worker:%d" % i, "kind": "direct",
+              "model": "google/gemini-2.5-pro", "totalTokens": 1000 * i + 486000,
+              "contextTokens": 1048576, "updatedAt": now - i * 60000}} for i in range(n)]
+time.sleep({delay})
+json.dump(sessions, sys.stdout)
+'''
+
+def _text(rng, size):
+    words = []
+    length = 0
+    while length < size:
+        line = " ".join(rng.choice(WORDS) for _ in range(12))
+        words.append(line)
+        length += len(line.encode('utf-8')) + 1
+    return "\n".join(words) + "\n"
+
+def _git(repo, *args):
+    env = dict(os.environ, GIT_AUTHOR_NAME="bench", GIT_AUTHOR_EMAIL="bench@example.com",
+               GIT_COMMITTER_NAME="bench", GIT_COMMITTER_EMAIL="bench@example.com")
+    subprocess.run(["git", *args], cwd=repo, env=env, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+def _make_repo(path, rng, files, commits, branches=()):
+    os.makedirs(path, exist_ok=True)
+    _git(path, "init", "-q", "-b", "master")
+    _git(path, "remote", "add", "origin", f"https://example.com/bench/{os.path.basename(path)}.git")
+    for c in range(commits):
+        for i in range(files):
+            with open(os.path.join(path, f"module_{i}.py"), 'w') as f:
+                f.write(f"# revision {c}\n" + _text(rng, 2048))
+        _git(path, "add", "-A")
+        _git(path, "commit", "-q", "-m", f"bench commit {c}")
+    for branch in branches:
+        _git(path, "branch", branch)
+
+def build(home, files=2000, depth=4, size=4096, projects=3, sessions=20, cli_delay=0.2, seed=1):
+    # Возвращает окружение (dict), которое нужно выставить дашборду
+    rng = random.Random(seed)
+    workspace = os.path.join(home, "workspace")
+    os.makedirs(os.path.join(workspace, "memory"), exist_ok=True)
+
+    # Дерево файлов: каталоги до depth уровней, размеры ~ экспоненциальные вокруг size
+    dirs = [(workspace, 0)]
+    for i in range(max(1, files // 40)):
+        parent, level = rng.choice([d for d in dirs if d[1] < depth] or dirs[:1])
+        path = os.path.join(parent, f"dir_{i}")
+        os.makedirs(path, exist_ok=True)
+        dirs.append((path, level + 1))
+    for i in range(files):
+        path = os.path.join(rng.choice(dirs)[0], f"file_{i}{rng.choice(EXTENSIONS)}")
+        with open(path, 'w') as f:
+            f.write(_text(rng, int(rng.expovariate(1 / size)) + 64))
+    # Один крупный лог — для /api/files/read
+    with open(os.path.join(workspace, "memory", "big.log"), 'w') as f:
+        for i in range(50000):
+            f.write(f"{i} " + " ".join(rng.choice(WORDS) for _ in range(10)) + "\n")
+
+    with open(os.path.join(workspace, "HEARTBEAT.md"), 'w') as f:
+        f.write("# Heartbeat\n\n- [ ] bench task\n")
+    with open(os.path.join(workspace, "memory", "heartbeat-state.json"), 'w') as f:
+        json.dump({"last": 0}, f)
+    os.makedirs(os.path.join(home, "cron"), exist_ok=True)
+    with open(os.path.join(home, "cron", "jobs.json"), 'w') as f:
+        json.dump({"jobs": [{"id": f"job{i:08d}", "name": f"job {i}", "schedule": {"expr": "*/5 * * * *"},
+                             "payload": {"message": "bench"}} for i in range(10)]}, f)
+    with open(os.path.join(home, "openclaw.json"), 'w') as f:
+        json.dump({"bench": True}, f)
+
+    projects_root = os.path.join(workspace, "projects")
+    for i in range(projects):
+        _make_repo(os.path.join(projects_root, f"project_{i}"), rng, files=20, commits=3)
+    _make_repo(os.path.join(projects_root, "dashboard"), rng, files=5, commits=5, branches=("dev",))
+
+    bin_dir = os.path.join(home, "bin")
+    os.makedirs(bin_dir, exist_ok=True)
+    cli = os.path.join(bin_dir, "openclaw")
+    with open(cli, 'w') as f:
+        f.write(STUB_CLI.format(python=sys.executable, sessions=sessions, delay=cli_delay))
+    os.chmod(cli, os.stat(cli).st_mode | stat.S_IXUSR | stat.S_IXGRP | stat.S_IXOTH)
+
+    state = os.path.join(home, "state")
+    os.makedirs(state, exist_ok=True)
+    return {
+        "OPENCLAW_HOME": home,
+        "OPENCLAW_CLI": cli,
+        "DASHBOARD_GIT_ROOT": os.path.join(projects_root, "dashboard"),
+        "DASHBOARD_STATE_DIR": state,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic OpenClaw home for benchmarks")
+    parser.add_argument("home")
+    parser.add_argument("--files", type=int, default=2000)
+    parser.add_argument("--depth", type=int, default=4)
+    parser.add_argument("--size", type=int, default=4096, help="mean file size, bytes")
+    parser.add_argument("--projects", type=int, default=3)
+    parser.add_argument("--sessions", type=int, default=20)
+    args = parser.parse_args()
+    env = build(args.home, args.files, args.depth, args.size, args.projects, args.sessions)
+    for key, value in env.items():
+        print(f"export {key}={value}")
+
+if __name__ == "__main__":
+    main()
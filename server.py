@@ -1,10 +1,7 @@
 import os
-import psutil
+import sys
 import time
-import subprocess
-import json
-import zipfile
-import io
+import asyncio
 
 # Manual .env parse to ensure it's loaded BEFORE anything else
 ENV_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".env")
@@ -15,123 +12,237 @@ if os.path.exists(ENV_PATH):
                 k, v = line.strip().split('=', 1)
                 os.environ[k] = v
 
-from fastapi import FastAPI, Request, HTTPException
-from fastapi.responses import HTMLResponse, FileResponse
-from fastapi.staticfiles import StaticFiles
+from fastapi import FastAPI, APIRouter, Depends, Request, HTTPException
+from fastapi.responses import HTMLResponse, FileResponse, Response, JSONResponse
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel
 
 # Импортируем нашу новую модульную логику
-from api.auth import verify_token
-from api.system import get_server_uptime, get_last_hb, get_git_info, get_agents_info, get_ai_context, create_backup_zip, sync_to_dev, git_checkout_branch
-from api.heartbeat import get_heartbeat_raw, update_heartbeat_content
-from api.files import get_workspace_tree, get_system_config_files, read_file_content
-from api.translate import translate_text
-from api.cron import get_cron_jobs
-from api.projects import get_projects_list
+from api.auth import verify_token, require_token
+from api.system import sync_to_dev, git_checkout_branch
+from api.ai_context import ai_probe
+from api.heartbeat import update_heartbeat_content
+from api.files import read_file_content, list_directory, resolve_path
+from api.reader import RangeNotSatisfiable
+from api.status import parse_sections, render_status, invalidate
+from api.tree_index import tree_index
+from api.cluster import cluster
+from api.publisher import publisher
+from api.tail import tail_hub
+from api.search import compile_query, search_stream
+from api.projects import get_projects_list, save_index as save_projects_index, restore_index as restore_projects_index
+from api.paths import PROJECTS_ROOT, GIT_ROOT
+from api.jobs import job_runner
+from api.zipstream import stream_directory
+from api.instrument import InstrumentMiddleware, render_metrics, profiler
+from api.assets import asset_store, ApiGZipMiddleware
 from fastapi.responses import HTMLResponse, FileResponse, StreamingResponse
 
 app = FastAPI()
+app.add_middleware(ApiGZipMiddleware)
+# Server-Timing, гистограммы запросов и профайлер медленных запросов (api/instrument.py)
+app.add_middleware(InstrumentMiddleware)
+# Все /api-роуты, кроме /api/auth, проходят одну общую проверку токена
+api = APIRouter(dependencies=[Depends(require_token)])
+
+class ClosingStreamingResponse(StreamingResponse):
+    # Синхронный генератор закрывается, как только ответ завершён или клиент отключился:
+    # его finally (отмена задач в пуле бэкапа) не ждёт сборщика мусора
+    def __init__(self, content, **kwargs):
+        super().__init__(content, **kwargs)
+        self.source = content
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            await run_in_threadpool(self.source.close)
 
 # ... (в конец списка эндпоинтов перед index)
-@app.get("/api/system/backup")
-async def get_backup(token: str):
-    if not verify_token(token): raise HTTPException(status_code=401)
-    file_obj = create_backup_zip()
-    filename = f"letto_backup_{time.strftime('%Y%m%d_%H%M')}.zip"
-    return StreamingResponse(
-        file_obj, 
+@api.get("/api/system/backup")
+async def get_backup(mode: str = "full", compression: str = None, level: int = None):
+    # mode=incremental — только файлы, изменившиеся с прошлого бэкапа.
+    # Модуль (с multiprocessing) грузится при первом бэкапе, а не при старте
+    from api.backup import create_backup_zip
+    try:
+        chunks = create_backup_zip(mode, compression, level)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    suffix = "_incr" if mode == "incremental" else ""
+    filename = f"letto_backup_{time.strftime('%Y%m%d_%H%M')}{suffix}.zip"
+    return ClosingStreamingResponse(
+        chunks, 
         media_type="application/x-zip-compressed",
         headers={"Content-Disposition": f"attachment; filename={filename}"}
     )
 
-# Пути
-DASHBOARD_ROOT = os.path.dirname(os.path.abspath(__file__))
-app.mount("/static", StaticFiles(directory=os.path.join(DASHBOARD_ROOT, "static")), name="static")
+@app.api_route("/static/{path:path}", methods=["GET", "HEAD"])
+async def static_asset(request: Request, path: str):
+    # Адреса с хэшем (app.<hash>.js) — immutable, без хэша — ревалидация по ETag
+    found = asset_store.lookup("/static/" + path)
+    if not found: raise HTTPException(status_code=404)
+    return asset_store.response(request, *found)
+
+@app.on_event("startup")
+async def start_background_indexes():
+    # Снимки прошлого запуска (scripts/snapshots/): проекты — сразу, дерево — в потоке индекса
+    restore_projects_index()
+    # Индекс дерева и сэмплер метрик — только в воркере-лидере (api/cluster.py);
+    # до готовности индекса get_workspace_tree обходит диск сам
+    cluster.start()
+    # Статика читается и сжимается один раз, дальше отдаётся из памяти
+    asset_store.load()
+    # Явно заданный TRANSLATE_BACKEND проверяем сразу (неизвестное имя — ошибка старта);
+    # по умолчанию модуль перевода по-прежнему грузится при первом переводе
+    if os.getenv("TRANSLATE_BACKEND"):
+        import api.translate
+
+@app.on_event("shutdown")
+async def save_snapshots():
+    # Перезапуск супервизором (SIGTERM, SIGHUP воркерам) проходит через shutdown — кэши уходят на диск
+    for save in (tree_index.save_snapshot, save_projects_index):
+        try:
+            await asyncio.to_thread(save)
+        except Exception as e:
+            print(f"Snapshot save error: {e}")
+    # Пул бэкапа есть, только если модуль уже загружен первым бэкапом
+    backup = sys.modules.get("api.backup")
+    if backup is not None:
+        await asyncio.to_thread(backup.shutdown_pool)
 
 class AuthRequest(BaseModel):
     token: str
 
 class HeartbeatUpdate(BaseModel):
-    token: str
     content: str
 
 class TranslateRequest(BaseModel):
-    token: str
     text: str
 
-class GitSyncRequest(BaseModel):
-    token: str
-
 class GitCheckoutRequest(BaseModel):
-    token: str
     branch: str
 
+class ProfilerConfig(BaseModel):
+    enabled: bool = None
+    threshold_ms: float = None
+    interval_ms: float = None
+
 @app.post("/api/auth")
 async def auth(data: AuthRequest):
     if verify_token(data.token): return {"success": True}
     raise HTTPException(status_code=401)
 
-@app.get("/api/status")
-async def get_status(token: str):
-    if not verify_token(token): raise HTTPException(status_code=401)
-    return {
-        "cpu": psutil.cpu_percent(),
-        "ram": psutil.virtual_memory().percent,
-        "disk": psutil.disk_usage('/').percent,
-        "uptime": get_server_uptime(),
-        "agents": get_agents_info(),
-        "heartbeat_last": get_last_hb(),
-        "heartbeat_raw": get_heartbeat_raw(),
-        "git": get_git_info(),
-        "files": get_workspace_tree(),
-        "system_configs": get_system_config_files(),
-        "cron": get_cron_jobs()
-    }
-
-@app.get("/api/projects")
-async def get_projects(token: str):
-    if not verify_token(token): raise HTTPException(status_code=401)
-    return get_projects_list()
-
-@app.get("/api/projects/{name}/download")
-async def download_project(name: str, token: str):
-    if not verify_token(token): raise HTTPException(status_code=401)
-    
-    workspace_root = os.path.abspath(os.path.join(DASHBOARD_ROOT, "../.."))
-    project_path = os.path.join(workspace_root, "projects", name)
+@api.get("/api/status")
+async def get_status(sections: str = None):
+    # ?sections=git,tree — отдаём только нужные секции, каждая из своего кэша
+    try:
+        names = parse_sections(sections)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return Response(content=await render_status(names), media_type="application/json")
+
+@api.get("/api/stream")
+async def stream_status():
+    queue = publisher.subscribe()
+
+    async def events():
+        try:
+            first = publisher.snapshot_event()
+            if first: yield first
+            while True:
+                try:
+                    message = await asyncio.wait_for(queue.get(), 15)
+                except asyncio.TimeoutError:
+                    # Комментарий-пинг держит соединение живым через прокси
+                    yield ": ping\n\n"
+                    continue
+                if message is None: break
+                yield message
+        finally:
+            publisher.unsubscribe(queue)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@api.get("/api/files/search")
+async def search_files(q: str, regex: bool = False, case: bool = False, path: str = "", root: str = "workspace", context: int = 1, limit: int = 500):
+    if root not in ("workspace", "system"): raise HTTPException(status_code=400, detail="Unknown root")
+    try:
+        pattern = compile_query(q, regex, case)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return StreamingResponse(
+        search_stream(pattern, q, regex, path, root, context, limit),
+        media_type="application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@api.get("/api/files/tail")
+async def tail_file(path: str, lines: int = 200):
+    full_path = resolve_path(path)
+    if not os.path.isfile(full_path): raise HTTPException(status_code=404, detail="File not found")
+
+    async def events():
+        # Подписка — внутри генератора: если клиент ушёл до первого шага тела,
+        # генератор не запустится и счётчик наблюдателя не утечёт
+        watcher = None
+        try:
+            watcher, queue = await tail_hub.subscribe(full_path, lines)
+            while True:
+                try:
+                    message = await asyncio.wait_for(queue.get(), 15)
+                except asyncio.TimeoutError:
+                    yield ": ping\n\n"
+                    continue
+                if message is None: break
+                yield message
+        finally:
+            if watcher is not None:
+                await tail_hub.unsubscribe(watcher, queue)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@api.get("/api/metrics/history")
+async def get_metrics_history(since: float = 0, resolution: str = "raw"):
+    try:
+        # У воркера-не-лидера история — разбор JSON из общего кэша, не в event loop
+        return await run_in_threadpool(cluster.metrics_history, since, resolution)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@api.get("/api/projects")
+async def get_projects(details: bool = False):
+    # details=1 — последний коммит, dirty и размер (лениво, из кэша метаданных)
+    return await get_projects_list(details)
+
+@api.get("/api/projects/{name}/download")
+async def download_project(name: str):
     
-    project_path = os.path.abspath(project_path) # Normalize the path
-    if not project_path.startswith(os.path.abspath(os.path.join(workspace_root, "projects"))):
+    project_path = os.path.abspath(os.path.join(PROJECTS_ROOT, name)) # Normalize the path
+    if not project_path.startswith(os.path.abspath(PROJECTS_ROOT)):
         raise HTTPException(status_code=403, detail="Access denied")
 
     if not os.path.exists(project_path) or not os.path.isdir(project_path):
         raise HTTPException(status_code=404, detail="Project not found")
 
-    memory_file = io.BytesIO()
-    with zipfile.ZipFile(memory_file, 'w', zipfile.ZIP_DEFLATED) as zipf:
-        for root, dirs, files in os.walk(project_path):
-            for file in files:
-                file_full_path = os.path.join(root, file)
-                arcname = os.path.relpath(file_full_path, project_path)
-                zipf.write(file_full_path, arcname)
-    
-    memory_file.seek(0)
+    # Синхронный генератор: Starlette гоняет его в threadpool, event loop свободен
     return StreamingResponse(
-        memory_file,
+        stream_directory(project_path),
         media_type="application/x-zip-compressed",
         headers={"Content-Disposition": f"attachment; filename={name}.zip"}
     )
 
-@app.get("/api/files/download")
-async def download_single_file(path: str, token: str):
-    if not verify_token(token): raise HTTPException(status_code=401)
+@api.get("/api/files/download")
+async def download_single_file(path: str):
     
-    # Пытаемся понять, это абсолютный путь (система) или относительный (воркспейс)
-    if path.startswith("/home/max/.openclaw"):
-        full_path = path
-    else:
-        workspace_root = "/home/max/.openclaw/workspace"
-        full_path = os.path.join(workspace_root, path)
+    full_path = resolve_path(path)
     
     if not os.path.exists(full_path) or os.path.isdir(full_path):
         raise HTTPException(status_code=404, detail="File not found")
@@ -142,84 +253,222 @@ async def download_single_file(path: str, token: str):
         media_type='application/octet-stream'
     )
 
-@app.get("/api/ai_status_live")
-async def get_ai_status_live(token: str):
-    if not verify_token(token): raise HTTPException(status_code=401)
-    data = get_ai_context()
-    if data:
-        data["timestamp"] = int(time.time())
-        try:
-            cache_path = os.path.join(DASHBOARD_ROOT, 'scripts/ai_cache.json')
-            with open(cache_path, 'w') as f:
-                json.dump(data, f)
-        except: pass
-        return data
-    raise HTTPException(status_code=500, detail="Parser failed")
-
-@app.get("/api/ai_status_cached")
-async def get_ai_status_cached(token: str):
-    if not verify_token(token): raise HTTPException(status_code=401)
-    cache_path = os.path.join(DASHBOARD_ROOT, 'scripts/ai_cache.json')
-    if os.path.exists(cache_path):
-        try:
-            with open(cache_path, 'r') as f:
-                return json.load(f)
-        except: pass
-    return {"used": 0, "total": 1048576, "percent": 0, "model": "unknown", "timestamp": 0}
+@api.get("/api/files/tree")
+async def get_files_tree(request: Request, since: int = None):
+    ready, version = cluster.tree_state()
+    if not ready: raise HTTPException(status_code=503, detail="Tree index is warming up")
+    etag = f'"tree-{version}"'
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+    # Журнал изменений есть только у лидера; если он не покрывает since — дерево целиком
+    changes = tree_index.changes_since(since) if since is not None and tree_index.ready else None
+    if changes is not None:
+        return JSONResponse({"version": version, "changes": changes}, headers={"ETag": etag})
+    tree = await run_in_threadpool(cluster.tree)
+    if tree is None: raise HTTPException(status_code=503, detail="Tree index is warming up")
+    body = {"version": version, "tree": tree}
+    return JSONResponse(body, headers={"ETag": etag})
+
+@api.get("/api/files/list")
+async def get_files_list(path: str = "", cursor: str = None, limit: int = 200):
+    result = await run_in_threadpool(list_directory, path, cursor, limit)
+    if "error" in result:
+        raise HTTPException(status_code=403 if result["error"] == "Access denied" else 404, detail=result["error"])
+    return result
+
+@api.get("/api/files/usage")
+async def get_files_usage(path: str = "", top: int = 20, refresh: bool = False):
+    # Размеры каталогов по поддеревьям, крупнейшие файлы и рост с прошлого прохода (api/usage.py).
+    # Повторные запросы в пределах MAX_AGE — из индекса, без обхода диска
+    from api.usage import usage_index
+    result = await run_in_threadpool(usage_index.usage, path, top, refresh)
+    if "error" in result:
+        raise HTTPException(status_code=403 if result["error"] == "Access denied" else 404, detail=result["error"])
+    return result
 
-@app.post("/api/heartbeat/update")
+@api.get("/api/ai_status_live")
+async def get_ai_status_live():
+    # Значение из памяти сразу; если старше MIN_REFRESH — CLI перезапросится в фоне
+    # (одним вызовом на всех), а свежие данные придут секцией "ai" в /api/stream
+    return await ai_probe.get(live=True)
+
+@api.get("/api/ai/sessions")
+async def get_ai_sessions():
+    # Все сессии из последнего опроса CLI (токены, модель, возраст);
+    # устаревший список обновляется в фоне по тем же правилам, что и live
+    await ai_probe.get(live=True)
+    return {"sessions": ai_probe.sessions, "timestamp": ai_probe.snapshot().get("timestamp", 0)}
+
+@api.get("/api/ai_status_cached")
+async def get_ai_status_cached():
+    return ai_probe.snapshot()
+
+@api.post("/api/heartbeat/update")
 async def update_heartbeat(data: HeartbeatUpdate):
-    if not verify_token(data.token): raise HTTPException(status_code=401)
-    update_heartbeat_content(data.content)
-    return {"success": True}
+    # Секция heartbeat сбрасывается по уведомлению state_store
+    return {"success": await update_heartbeat_content(data.content)}
 
-@app.get("/api/files/read")
-async def get_file(path: str, token: str, page: int = 1):
-    if not verify_token(token): raise HTTPException(status_code=401)
-    return read_file_content(path, page)
+@api.get("/api/files/read")
+async def get_file(request: Request, path: str, page: int = 1, page_size: int = None, line: int = None):
+    # Range: bytes=a-b, bytes=a- или bytes=-N (последние N байт) — точный диапазон вместо страницы.
+    # Непонятный заголовок игнорируется (отдаём страницу), 416 — только если диапазон мимо файла
+    offset = length = None
+    range_header = request.headers.get("range", "")
+    if range_header.startswith("bytes="):
+        first, _, last = range_header[6:].split(",")[0].strip().partition("-")
+        try:
+            if first:
+                offset = int(first)
+                length = int(last) - offset + 1 if last else None
+                if offset < 0 or (length is not None and length <= 0): offset = length = None
+            elif int(last) > 0:
+                offset = -int(last)
+            else:
+                raise HTTPException(status_code=416, detail="Range not satisfiable")
+        except ValueError:
+            offset = length = None
+    try:
+        return await run_in_threadpool(read_file_content, path, page, page_size, line, offset, length)
+    except RangeNotSatisfiable as e:
+        raise HTTPException(status_code=416, detail=str(e), headers={"Content-Range": f"bytes */{e.size}"})
 
-@app.post("/api/translate")
+@api.post("/api/translate")
 async def translate(data: TranslateRequest):
-    if not verify_token(data.token): raise HTTPException(status_code=401)
-    return {"translated": translate_text(data.text)}
-
-@app.post("/api/system/git-sync")
-async def git_sync(data: GitSyncRequest):
-    if not verify_token(data.token): raise HTTPException(status_code=401)
-    result = sync_to_dev()
-    if not result["success"]:
-        raise HTTPException(status_code=500, detail=result["message"])
-    return result
+    # Сеть и SQLite — в threadpool, event loop не блокируется; модуль грузится при первом переводе
+    from api.translate import translate_text
+    return {"translated": await run_in_threadpool(translate_text, data.text)}
+
+_background = set()    # ссылки на фоновые задачи, чтобы их не собрал GC
+
+def _git_changed(job):
+    invalidate("git")
+    # Pull/checkout мог поменять static/ — пересборка в потоке, если каталог изменился
+    task = asyncio.create_task(asyncio.to_thread(asset_store.reload))
+    _background.add(task)
+    task.add_done_callback(_background.discard)
+
+# Git-операции идут фоновыми задачами (api/jobs.py): ответ — сразу id задачи,
+# ход выполнения — в /api/jobs/{id}/stream, результат — в /api/jobs/{id}
+@api.post("/api/system/git-sync", status_code=202)
+async def git_sync():
+    job = job_runner.submit("git-sync", GIT_ROOT, lambda job: sync_to_dev(job.step), on_done=_git_changed)
+    return {"job_id": job.id, "state": job.state}
 
-@app.post("/api/system/git-checkout")
+@api.post("/api/system/git-checkout", status_code=202)
 async def git_checkout(data: GitCheckoutRequest):
-    if not verify_token(data.token): raise HTTPException(status_code=401)
-    result = git_checkout_branch(data.branch)
-    if not result["success"]:
-        raise HTTPException(status_code=500, detail=result["message"])
-    return result
+    job = job_runner.submit("git-checkout", GIT_ROOT, lambda job: git_checkout_branch(data.branch, job.step), params={"branch": data.branch}, on_done=_git_changed)
+    return {"job_id": job.id, "state": job.state}
+
+@api.post("/api/system/reload-static")
+async def reload_static():
+    # Явная пересборка статики в этом воркере; при нескольких воркерах — SIGHUP мастеру
+    return {"reloaded": await run_in_threadpool(asset_store.reload)}
+
+@api.get("/api/jobs")
+async def list_jobs():
+    return await job_runner.list()
+
+@api.get("/api/jobs/{job_id}")
+async def get_job(job_id: str):
+    job = await job_runner.get(job_id)
+    if not job: raise HTTPException(status_code=404, detail="Job not found")
+    return job.snapshot()
 
-# SPA Routing: Fallback for all other routes to index.html
-@app.get("/{path:path}")
-async def spa_fallback(path: str):
+@api.get("/api/jobs/{job_id}/stream")
+async def stream_job(job_id: str):
+    job = await job_runner.get(job_id)
+    if not job: raise HTTPException(status_code=404, detail="Job not found")
+    return StreamingResponse(
+        job.events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@api.get("/api/debug/metrics")
+async def debug_metrics():
+    return Response(content=render_metrics(), media_type="text/plain; version=0.0.4")
+
+@api.get("/api/debug/cluster")
+async def cluster_info():
+    # Какой воркер ответил и кто сейчас лидер
+    return cluster.info()
+
+@api.get("/api/debug/profiler")
+async def profiler_status():
+    return profiler.status()
+
+@api.post("/api/debug/profiler")
+async def profiler_configure(data: ProfilerConfig):
+    # Включается на лету: {"enabled": true, "threshold_ms": 300}
+    return profiler.configure(data.enabled, data.threshold_ms, data.interval_ms)
+
+@api.get("/api/debug/profiler/{name}")
+async def profiler_download(name: str):
+    content = profiler.read_profile(name)
+    if content is None: raise HTTPException(status_code=404, detail="Profile not found")
+    return Response(content=content, media_type="text/plain")
+
+app.include_router(api)
+
+# SPA Routing: маршруты и файлы static/ — из таблицы asset_store, без обращения к диску
+@app.get("/{path:path}", response_class=HTMLResponse)
+async def spa_fallback(request: Request, path: str):
     # If path starts with api/, it's a real 404
     if path.startswith("api/"):
         raise HTTPException(status_code=404)
-    # Check if file exists in static (e.g. css/style.css)
-    static_file = os.path.join(DASHBOARD_ROOT, "static", path)
-    if os.path.exists(static_file) and os.path.isfile(static_file):
-        return FileResponse(static_file)
+    found = asset_store.lookup("/" + path)
+    if found:
+        return asset_store.response(request, *found)
     # Otherwise return SPA index
-    return FileResponse(os.path.join(DASHBOARD_ROOT, "static", "index.html"))
+    return asset_store.response(request, asset_store.index())
+
+def main():
+    import argparse
+    import importlib.util
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Letto Dashboard server")
+    parser.add_argument("--host", default=os.getenv("DASHBOARD_HOST", "127.0.0.1"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("DASHBOARD_PORT", "3000")))
+    parser.add_argument("--workers", type=int, default=int(os.getenv("DASHBOARD_WORKERS", "1")))
+    parser.add_argument("--loop", choices=["auto", "asyncio", "uvloop"], default=os.getenv("DASHBOARD_LOOP", "auto"))
+    parser.add_argument("--http", choices=["auto", "h11", "httptools"], default=os.getenv("DASHBOARD_HTTP", "auto"))
+    parser.add_argument("--cache-backend", choices=["memory", "sqlite"], default=None,
+                        help="общий кэш воркеров; по умолчанию sqlite при --workers > 1")
+    parser.add_argument("--graceful-timeout", type=float, default=10,
+                        help="сколько ждать открытые SSE при остановке воркера, сек")
+    parser.add_argument("--reload", action="store_true", help="перезапуск при правке кода (разработка)")
+    args = parser.parse_args()
 
-@app.get("/", response_class=HTMLResponse)
-@app.get("/agents", response_class=HTMLResponse)
-@app.get("/projects", response_class=HTMLResponse)
-@app.get("/git", response_class=HTMLResponse)
-@app.get("/explorer", response_class=HTMLResponse)
-async def index(request: Request):
-    return FileResponse(os.path.join(DASHBOARD_ROOT, "static/index.html"))
+    # auto сам возьмёт uvloop/httptools, если они установлены; явный выбор без модуля — ошибка
+    for option, module in (("loop", "uvloop"), ("http", "httptools")):
+        if getattr(args, option) == module and importlib.util.find_spec(module) is None:
+            parser.error(f"--{option} {module}: module is not installed (pip install {module})")
+    if args.reload and args.workers > 1:
+        parser.error("--reload works with a single worker only")
+
+    if args.workers > 1:
+        # Воркеры импортируют server заново и читают настройки из окружения
+        os.environ["CACHE_BACKEND"] = args.cache_backend or os.getenv("CACHE_BACKEND", "sqlite")
+        if os.environ["CACHE_BACKEND"] == "memory":
+            print("Warning: memory cache with several workers — each worker runs its own indexes and sampler")
+    elif args.cache_backend and args.cache_backend != os.getenv("CACHE_BACKEND", "memory"):
+        print("Note: --cache-backend only applies to --workers > 1; use CACHE_BACKEND for a single worker")
+
+    # SIGHUP мастеру — плавный перезапуск воркеров по одному (новый готов — старый уходит),
+    # SIGTTIN/SIGTTOU — добавить/убрать воркер
+    uvicorn.run(
+        # Несколько воркеров и --reload импортируют приложение по строке в своих процессах
+        app if args.workers == 1 and not args.reload else "server:app",
+        app_dir=os.path.dirname(os.path.abspath(__file__)),
+        host=args.host,
+        port=args.port,
+        workers=args.workers,
+        loop=args.loop,
+        http=args.http,
+        reload=args.reload,
+        timeout_graceful_shutdown=args.graceful_timeout
+    )
 
 if __name__ == "__main__":
-    import uvicorn
-    uvicorn.run(app, host="127.0.0.1", port=3000)
+    main()
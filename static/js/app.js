@@ -6,6 +6,10 @@ let originalContent = '';
 let translatedContent = '';
 let isTranslated = false;
 let editor = null;
+let statusStream = null;
+let tailStream = null;
+let viewerPath = null;
+let lastSparkline = 0;
 
 async function api(path, method = 'GET', body = null) {
     const token = localStorage.getItem(authKey);
@@ -114,10 +118,22 @@ async function updateProjectsPage() {
                 <div>Origin: <span class="${(remoteUrl && remoteUrl !== 'No remote origin') ? 'text-emerald-500 font-bold' : 'text-slate-700'}">${originDisplay}</span></div>
                 ${(remoteUrl && remoteUrl !== 'No remote origin') ? `<div class="lowercase text-[9px] opacity-40 truncate font-mono">${remoteUrl}</div>` : ''}
             </div>
+            <div class="project-meta text-[10px] text-slate-600 font-mono flex flex-col gap-1" data-name="${p.name}"></div>
         `;
         card.onclick = () => navigateTo('/projects/' + p.name);
         list.appendChild(card);
     });
+
+    // Тяжёлые поля догружаем вторым запросом, список уже на экране
+    const details = await api('/api/projects?details=1');
+    if (!details) return;
+    details.forEach(p => {
+        const meta = list.querySelector(`.project-meta[data-name="${p.name}"]`);
+        if (!meta) return;
+        const commit = p.last_commit ? `<div class="truncate">${escapeHtml(p.last_commit.hash)} · ${escapeHtml(p.last_commit.msg)}</div>` : '';
+        const dirty = p.dirty ? '<span class="text-amber-400">● modified</span>' : (p.dirty === false ? '<span class="text-emerald-500/60">clean</span>' : '');
+        meta.innerHTML = `${commit}<div class="flex justify-between"><span>${formatBytes(p.size || 0)}</span>${dirty}</div>`;
+    });
 }
 
 async function showProjectDetails(projectName) {
@@ -138,21 +154,9 @@ async function showProjectDetails(projectName) {
     }
     projectDetailContent.classList.remove('hidden');
 
-    // Fetch data to get the file tree
-    const data = await api('/api/status');
-    if (!data || !data.files) {
-        projectDetailContent.innerHTML = `<div class="p-8 text-center text-red-500">Error loading project data</div>`;
-        return;
-    }
-
-    // Find the project folder
-    let projectNode = null;
-    const projectsRoot = data.files.find(f => f.name === 'projects' && f.is_dir);
-    if (projectsRoot && projectsRoot.children) {
-        projectNode = projectsRoot.children.find(f => f.name === projectName && f.is_dir);
-    }
-
-    if (!projectNode) {
+    // Проверяем, что папка проекта существует; содержимое грузится лениво
+    const data = await api(`/api/files/list?path=${encodeURIComponent('projects/' + projectName)}&limit=1`);
+    if (!data || !data.items) {
         projectDetailContent.innerHTML = `
             <div class="p-8 text-center">
                 <div class="text-slate-500 mb-4">Project "${projectName}" not found.</div>
@@ -171,7 +175,7 @@ async function showProjectDetails(projectName) {
                         <span>←</span> back to list
                     </div>
                     <h2 class="text-3xl font-black text-white flex items-center gap-3">
-                        ${projectName} <span class="bg-emerald-500 text-slate-900 text-[10px] px-2 py-0.5 rounded-full uppercase tracking-tighter">v${projectNode.version || '1.0'}</span>
+                        ${projectName} <span class="bg-emerald-500 text-slate-900 text-[10px] px-2 py-0.5 rounded-full uppercase tracking-tighter">v1.0</span>
                     </h2>
                 </div>
                 <div class="flex gap-2">
@@ -186,18 +190,17 @@ async function showProjectDetails(projectName) {
                     <span class="text-[11px] text-slate-400 font-mono uppercase tracking-widest">Project Workspace Explorer</span>
                     <span class="text-[10px] text-slate-600 font-mono italic">${projectName}/</span>
                 </div>
-                <div id="project-files-tree" class="p-4 bg-slate-950/20 min-h-[300px]">
-                    ${renderTree(projectNode.children, 0, 'projects/' + projectName)}
-                </div>
+                <div id="project-files-tree" class="p-4 bg-slate-950/20 min-h-[300px]"></div>
             </div>
         </div>
     `;
+    loadDir(document.getElementById('project-files-tree'), 'projects/' + projectName, 0);
 }
 
 window.onpopstate = () => handleRouting();
 
 async function updateGitPage() {
-    const data = await api('/api/status');
+    const data = await api('/api/status?sections=git');
     if (!data || !data.git) return;
     
     // Обновляем текущую ветку
@@ -239,8 +242,10 @@ async function switchGitBranch() {
     btn.disabled = true;
 
     const res = await api('/api/system/git-checkout', 'POST', { branch });
-    
-    if (res && res.success) {
+    const job = res && res.job_id ? await waitJob(res.job_id) : null;
+    const result = job ? job.result : res;
+
+    if (result && result.success) {
         btn.innerText = 'DONE';
         setTimeout(() => {
             btn.innerText = originalText;
@@ -249,7 +254,7 @@ async function switchGitBranch() {
         }, 2000);
     } else {
         btn.innerText = 'ERR';
-        alert('Checkout failed: ' + (res ? res.message : 'Unknown error'));
+        alert('Checkout failed: ' + (result ? result.message || result.detail : 'Unknown error'));
         setTimeout(() => {
             btn.innerText = originalText;
             btn.disabled = false;
@@ -257,52 +262,59 @@ async function switchGitBranch() {
     }
 }
 
-async function syncGitDev() {
-    const btn = document.getElementById('git-sync-btn');
-    const originalText = btn.innerText;
-    btn.innerText = 'SYNCING...';
-    btn.disabled = true;
-
-    const res = await api('/api/system/git-sync', 'POST', {});
-    
-    if (res && res.success) {
-        btn.innerText = 'SUCCESS';
-        btn.classList.add('bg-emerald-500');
-        setTimeout(() => {
-            btn.innerText = originalText;
-            btn.disabled = false;
-            btn.classList.remove('bg-emerald-500');
-            updateGitPage();
-        }, 3000);
-    } else {
-        btn.innerText = 'ERROR';
-        btn.classList.add('bg-red-500');
-        alert('Sync failed: ' + (res ? res.detail || res.message : 'Unknown error'));
-        setTimeout(() => {
-            btn.innerText = originalText;
-            btn.disabled = false;
-            btn.classList.remove('bg-red-500');
-        }, 3000);
-    }
-}
-
 async function updateStats() {
     const isManual = arguments[0] === true;
     if (!autoRefreshEnabled && !isManual) return;
+
+    // Пока открыт SSE-поток, данные приходят сами — опрашивать /api/status незачем
+    if (!isManual && statusStream && statusStream.readyState === EventSource.OPEN) {
+        lastUpdate = Date.now();
+        return;
+    }
     
-    const data = await api('/api/status');
+    // Дерево файлов сюда не входит: explorer грузит папки лениво через /api/files/list
+    const data = await api('/api/status?sections=metrics,agents,heartbeat,cron,system_configs,ai');
     if (!data) return;
+    renderStats(data, isManual);
     
+    if (isManual || (autoRefreshEnabled && (Date.now() - lastUpdate >= UPDATE_MS))) {
+        lastUpdate = Date.now();
+    }
+}
+
+function startStatusStream() {
+    if (!window.EventSource) return;
+    statusStream = new EventSource(`/api/stream?token=${localStorage.getItem(authKey)}`);
+    // Сервер шлёт только изменившиеся ключи статуса
+    statusStream.addEventListener('status', e => renderStats(JSON.parse(e.data), false));
+    statusStream.onerror = () => {
+        // CLOSED — браузер сдался с переподключением, возвращаемся к опросу
+        if (statusStream && statusStream.readyState === EventSource.CLOSED) statusStream = null;
+    };
+}
+
+function renderStats(data, isManual) {
+    if (data.ai) renderAiStatus(data.ai);
     // Header Stats
-    if(document.getElementById('stat-cpu')) document.getElementById('stat-cpu').innerText = Math.round(data.cpu) + '%';
-    if(document.getElementById('stat-ram')) document.getElementById('stat-ram').innerText = Math.round(data.ram) + '%';
-    if(document.getElementById('stat-disk')) document.getElementById('stat-disk').innerText = Math.round(data.disk) + '%';
-    if(document.getElementById('stat-uptime')) document.getElementById('stat-uptime').innerText = data.uptime;
-    
-    const hbS = Math.floor(Date.now()/1000) - data.heartbeat_last;
-    if(document.getElementById('hb-last-seen')) document.getElementById('hb-last-seen').innerText = hbS < 60 ? 'Now' : Math.floor(hbS/60) + 'm ago';
+    if ('cpu' in data) {
+        if(document.getElementById('stat-cpu')) document.getElementById('stat-cpu').innerText = Math.round(data.cpu) + '%';
+        if(document.getElementById('stat-ram')) document.getElementById('stat-ram').innerText = Math.round(data.ram) + '%';
+        if(document.getElementById('stat-disk')) document.getElementById('stat-disk').innerText = Math.round(data.disk) + '%';
+        if (Date.now() - lastSparkline >= 10000) { lastSparkline = Date.now(); updateSparklines(); }
+    }
+    if ('uptime' in data && document.getElementById('stat-uptime')) document.getElementById('stat-uptime').innerText = data.uptime;
+
+    if ('heartbeat_last' in data) {
+        const hbS = Math.floor(Date.now()/1000) - data.heartbeat_last;
+        if(document.getElementById('hb-last-seen')) document.getElementById('hb-last-seen').innerText = hbS < 60 ? 'Now' : Math.floor(hbS/60) + 'm ago';
+    }
     
-    if (data.files && document.getElementById('files-tree')) document.getElementById('files-tree').innerHTML = renderTree(data.files);
+    const filesTree = document.getElementById('files-tree');
+    if (filesTree && (isManual || !filesTree.dataset.loaded)) {
+        filesTree.innerHTML = '';
+        filesTree.dataset.loaded = '1';
+        loadDir(filesTree, '', 0);
+    }
     
     if (data.system_configs && document.getElementById('system-configs-list')) {
         const sysList = document.getElementById('system-configs-list');
@@ -317,13 +329,14 @@ async function updateStats() {
     }
 
     const agentsList = document.getElementById('agents-list');
-    if(agentsList) {
+    if(agentsList && data.agents) {
         document.getElementById('stat-agents-count').innerText = data.agents.length;
         agentsList.innerHTML = '';
         data.agents.forEach(a => {
             const row = document.createElement('div');
             row.className = 'row-item py-4 flex justify-between items-center text-slate-300';
-            row.innerHTML = `<span class="text-[14px] font-bold">${a.name}</span><span class="text-[11px] text-slate-600 font-mono italic">PID:${a.pid}</span>`;
+            const load = a.rss !== undefined ? `${Math.round(a.cpu)}% · ${formatBytes(a.rss, 0)} · ` : '';
+            row.innerHTML = `<span class="text-[14px] font-bold">${a.name}</span><span class="text-[11px] text-slate-600 font-mono italic">${load}PID:${a.pid}</span>`;
             agentsList.appendChild(row);
         });
     }
@@ -348,15 +361,28 @@ async function updateStats() {
         });
     }
 
-    if (document.activeElement !== document.getElementById('heartbeat-editor')) {
+    if ('heartbeat_raw' in data && document.activeElement !== document.getElementById('heartbeat-editor')) {
         const hbEditor = document.getElementById('heartbeat-editor');
         if(hbEditor) hbEditor.value = data.heartbeat_raw;
     }
-    
-    if (isManual || (autoRefreshEnabled && (Date.now() - lastUpdate >= UPDATE_MS))) {
-        lastUpdate = Date.now();
-        updateAiStatus(false);
-    }
+}
+
+function drawSparkline(id, values) {
+    const svg = document.getElementById(id);
+    if (!svg || !values.length) return;
+    const w = 60, h = 16;
+    const step = values.length > 1 ? w / (values.length - 1) : w;
+    const points = values.map((v, i) => `${(i * step).toFixed(1)},${(h - Math.min(100, v) / 100 * h).toFixed(1)}`).join(' ');
+    svg.innerHTML = `<polyline points="${points}" fill="none" stroke="currentColor" stroke-width="1.5"/>`;
+}
+
+async function updateSparklines() {
+    // Последние 5 минут посекундной истории — сэмплы уже посчитаны на сервере
+    const since = Date.now() / 1000 - 300;
+    const data = await api(`/api/metrics/history?resolution=raw&since=${since}`);
+    if (!data || !data.ts) return;
+    drawSparkline('spark-cpu', data.cpu);
+    drawSparkline('spark-ram', data.ram);
 }
 
 async function updateAiStatus(isLive) {
@@ -369,16 +395,10 @@ async function updateAiStatus(isLive) {
         btn.innerText = '⌛';
     }
 
+    // live отвечает сразу значением из памяти; обновлённое придёт секцией "ai" в SSE
     const endpoint = isLive ? '/api/ai_status_live' : '/api/ai_status_cached';
     const data = await api(endpoint);
-
-    if (data && !data.error) {
-        const usedK = (data.used / 1000).toFixed(1);
-        const modelStr = data.model ? ` [${data.model}]` : '';
-        const timeStr = data.timestamp ? ` (${new Date(data.timestamp * 1000).toLocaleTimeString([], {hour: '2-digit', minute:'2-digit'})})` : '';
-        statusEl.innerText = `${usedK}k/1m(${data.percent}%)${modelStr}`;
-        statusEl.title = "Last update: " + timeStr;
-    }
+    if (data && !data.error) renderAiStatus(data);
 
     if(isLive) {
         statusEl.classList.remove('animate-pulse');
@@ -386,6 +406,16 @@ async function updateAiStatus(isLive) {
     }
 }
 
+function renderAiStatus(data) {
+    const statusEl = document.getElementById('ai-full-status');
+    if (!statusEl) return;
+    const usedK = (data.used / 1000).toFixed(1);
+    const modelStr = data.model ? ` [${data.model}]` : '';
+    const timeStr = data.timestamp ? ` (${new Date(data.timestamp * 1000).toLocaleTimeString([], {hour: '2-digit', minute:'2-digit'})})` : '';
+    statusEl.innerText = `${usedK}k/1m(${data.percent}%)${modelStr}`;
+    statusEl.title = "Last update: " + timeStr;
+}
+
 async function downloadBackup() {
     const btn = document.getElementById('backup-btn');
     const token = localStorage.getItem(authKey);
@@ -426,7 +456,7 @@ function renderTree(nodes, indent = 0, currentPath = '') {
                     <span class="mr-2 text-[10px] folder-arrow rotate-0 transition-transform text-slate-600">▶</span><span class="mr-2">📁</span>
                     <span class="text-emerald-400 font-bold uppercase tracking-tight text-[14px]">${node.name}</span>
                 </div>
-                <div class="dir-children hidden">${node.children ? renderTree(node.children, indent + 1, nodePath) : ''}</div>
+                <div class="dir-children hidden" data-path="${nodePath}" data-indent="${indent + 1}" ${node.children ? '' : 'data-lazy="1"'}>${node.children ? renderTree(node.children, indent + 1, nodePath) : ''}</div>
             </div>`;
         } else {
             const safePath = btoa(nodePath);
@@ -458,9 +488,29 @@ function openFileSafe(encodedPath) {
     openFile(atob(encodedPath));
 }
 
+async function loadDir(container, path, indent, cursor = null) {
+    let url = `/api/files/list?path=${encodeURIComponent(path)}`;
+    if (cursor) url += `&cursor=${encodeURIComponent(cursor)}`;
+    const data = await api(url);
+    if (!data || !data.items) return;
+    container.insertAdjacentHTML('beforeend', renderTree(data.items, indent, path));
+    if (data.next_cursor) {
+        const more = document.createElement('div');
+        more.className = 'py-2 text-[11px] text-emerald-500/60 font-mono uppercase cursor-pointer hover:text-emerald-400';
+        more.style.paddingLeft = (indent * 16 + 8) + 'px';
+        more.innerText = `Load more (${data.total - container.querySelectorAll(':scope > div').length} left)`;
+        more.onclick = () => { more.remove(); loadDir(container, path, indent, data.next_cursor); };
+        container.appendChild(more);
+    }
+}
+
 function toggleDir(el) {
     const children = el.nextElementSibling;
     const arrow = el.querySelector('.folder-arrow');
+    if (children.dataset.lazy) {
+        delete children.dataset.lazy;
+        loadDir(children, children.dataset.path, parseInt(children.dataset.indent));
+    }
     children.classList.toggle('hidden');
     if (arrow) arrow.style.transform = children.classList.contains('hidden') ? 'rotate(0deg)' : 'rotate(90deg)';
 }
@@ -472,7 +522,55 @@ function toggleAllDirs(exp, containerId) {
     container.querySelectorAll('.folder-arrow').forEach(a => a.style.transform = exp ? 'rotate(90deg)' : 'rotate(0deg)');
 }
 
-async function openFile(path, page = 1) {
+// Поиск по воркспейсу: NDJSON-поток, результаты рисуются по мере прихода
+let searchController = null;
+async function searchWorkspace() {
+    const q = document.getElementById('search-input').value;
+    const box = document.getElementById('search-results');
+    if (searchController) searchController.abort();
+    if (!q) { box.classList.add('hidden'); return; }
+    searchController = new AbortController();
+    box.classList.remove('hidden');
+    box.innerHTML = '<div class="text-slate-500 py-1">Searching...</div>';
+    const regex = document.getElementById('search-regex').checked;
+    const url = `/api/files/search?q=${encodeURIComponent(q)}&regex=${regex}&context=0&token=${localStorage.getItem(authKey)}`;
+    try {
+        const res = await fetch(url, { signal: searchController.signal });
+        if (!res.ok) { box.innerHTML = `<div class="text-red-400 py-1">${(await res.json()).detail || 'Error'}</div>`; return; }
+        const reader = res.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = '', first = true;
+        while (true) {
+            const { value, done } = await reader.read();
+            if (done) break;
+            buffer += decoder.decode(value, { stream: true });
+            const lines = buffer.split('\n');
+            buffer = lines.pop();
+            for (const line of lines) {
+                if (!line) continue;
+                const hit = JSON.parse(line);
+                if (first) { box.innerHTML = ''; first = false; }
+                if (hit.done) {
+                    box.insertAdjacentHTML('beforeend', `<div class="text-slate-500 py-1">${hit.matches}${hit.truncated ? '+' : ''} matches · ${hit.files_scanned} files · ${hit.elapsed_ms}ms</div>`);
+                    continue;
+                }
+                const el = document.createElement('div');
+                el.className = 'py-1 cursor-pointer hover:bg-white/5 truncate';
+                el.innerHTML = `<span class="text-emerald-400">${escapeHtml(hit.path)}:${hit.line}</span> <span class="text-slate-400">${escapeHtml(hit.text.trim())}</span>`;
+                el.onclick = () => openFile(hit.path, 1, hit.line);
+                box.appendChild(el);
+            }
+        }
+    } catch (e) {
+        if (e.name !== 'AbortError') box.innerHTML = '<div class="text-red-400 py-1">Error</div>';
+    }
+}
+
+function escapeHtml(text) {
+    return text.replace(/[&<>"']/g, c => ({ '&': '&amp;', '<': '&lt;', '>': '&gt;', '"': '&quot;', "'": '&#39;' }[c]));
+}
+
+async function openFile(path, page = 1, line = null) {
     const mainContent = document.getElementById('main-dashboard-content');
     const projectsContent = document.getElementById('projects-view-content');
     const gitContent = document.getElementById('git-view-content');
@@ -486,6 +584,8 @@ async function openFile(path, page = 1) {
     
     const translateBtn = document.getElementById('translate-btn');
     if(translateBtn) { translateBtn.classList.add('hidden'); isTranslated = false; }
+    stopFollow();
+    viewerPath = path;
 
     // Initialize CodeMirror if not already
     if (!editor) {
@@ -500,7 +600,7 @@ async function openFile(path, page = 1) {
 
     editor.setValue('Loading...');
     
-    const data = await api(`/api/files/read?path=${encodeURIComponent(path)}&page=${page}`);
+    const data = await api(`/api/files/read?path=${encodeURIComponent(path)}&page=${page}` + (line ? `&line=${Math.max(1, line - 20)}` : ''));
     if (!data || data.error) { 
         editor.setValue(data ? data.error : 'Error'); 
         return; 
@@ -525,9 +625,38 @@ async function openFile(path, page = 1) {
     setTimeout(() => editor.refresh(), 10);
 
     if ((ext === 'md' || ext === 'txt') && translateBtn) translateBtn.classList.remove('hidden');
+    const followBtn = document.getElementById('follow-btn');
+    if (followBtn) followBtn.classList.toggle('hidden', !(ext === 'log' || ext === 'jsonl' || ext === 'txt'));
+}
+
+// Режим tail -f: последние строки + дописываемые байты по SSE
+function toggleFollow() {
+    if (tailStream) { stopFollow(); return; }
+    if (!viewerPath || !window.EventSource) return;
+    const btn = document.getElementById('follow-btn');
+    tailStream = new EventSource(`/api/files/tail?path=${encodeURIComponent(viewerPath)}&lines=500&token=${localStorage.getItem(authKey)}`);
+    tailStream.addEventListener('init', e => {
+        editor.setValue(JSON.parse(e.data).content);
+        editor.scrollIntoView({ line: editor.lineCount() - 1, ch: 0 });
+    });
+    tailStream.addEventListener('append', e => {
+        const doc = editor.getDoc();
+        const atBottom = editor.getScrollInfo().top + editor.getScrollInfo().clientHeight >= editor.getScrollInfo().height - 40;
+        doc.replaceRange(JSON.parse(e.data).content, { line: doc.lastLine() + 1, ch: 0 });
+        if (atBottom) editor.scrollIntoView({ line: editor.lineCount() - 1, ch: 0 });
+    });
+    ['truncated', 'rotated'].forEach(name => tailStream.addEventListener(name, () => editor.setValue('')));
+    if (btn) btn.innerText = 'Stop';
+}
+
+function stopFollow() {
+    if (tailStream) { tailStream.close(); tailStream = null; }
+    const btn = document.getElementById('follow-btn');
+    if (btn) btn.innerText = 'Follow';
 }
 
 function closeFileViewer() {
+    stopFollow();
     document.getElementById('file-viewer-content').classList.add('hidden');
     handleRouting();
 }
@@ -609,6 +738,7 @@ window.onload = async () => {
             handleRouting();
             updateStats(true); 
             updateAiStatus(false);
+            startStatusStream();
             setInterval(updateTimer, 41);
             return;
         }
@@ -617,6 +747,26 @@ window.onload = async () => {
     document.getElementById('login-view').classList.remove('hidden');
 };
 
+// Git-операции — фоновые задачи: POST отдаёт id, шаги приходят по SSE, итог — из /api/jobs/{id}
+async function waitJob(jobId, onStep) {
+    if (window.EventSource) {
+        await new Promise(resolve => {
+            const stream = new EventSource(`/api/jobs/${jobId}/stream?token=${localStorage.getItem(authKey)}`);
+            const done = () => { stream.close(); resolve(); };
+            stream.addEventListener('step', e => { if (onStep) onStep(JSON.parse(e.data)); });
+            stream.addEventListener('result', done);
+            stream.onerror = done;
+        });
+    }
+    // Без SSE (или при обрыве потока) — опрос состояния задачи
+    let job = await api(`/api/jobs/${jobId}`);
+    while (job && (job.state === 'queued' || job.state === 'running')) {
+        await new Promise(r => setTimeout(r, 1000));
+        job = await api(`/api/jobs/${jobId}`);
+    }
+    return job;
+}
+
 async function syncGitDev() {
     // Пробуем найти обе кнопки
     const btns = [document.getElementById('git-sync-btn-header'), document.getElementById('git-sync-btn')];
@@ -624,11 +774,15 @@ async function syncGitDev() {
 
     try {
         const res = await api('/api/system/git-sync', 'POST', {});
-        if(res && res.success) {
-            alert(res.message);
+        const job = res && res.job_id ? await waitJob(res.job_id, step => {
+            btns.forEach(b => { if(b) b.innerText = step.step.toUpperCase() + '...'; });
+        }) : null;
+        const result = job ? job.result : null;
+        if(result && result.success) {
+            alert(result.message);
             btns.forEach(b => { if(b) b.innerText = 'DONE'; });
         } else {
-            alert("Error: " + (res ? res.message : 'Fail'));
+            alert("Error: " + (result ? result.message : (res && res.detail) || 'Fail'));
             btns.forEach(b => { if(b) b.innerText = 'ERROR'; });
         }
     } catch(e) {
@@ -0,0 +1,14 @@
+import os
+import sys
+import tempfile
+
+# Тесты не трогают боевую раскладку: пустой OPENCLAW_HOME и каталог состояния
+# во временном каталоге. Переменные выставляются до импорта api.*
+_home = tempfile.mkdtemp(prefix="letto-tests-")
+os.makedirs(os.path.join(_home, "workspace"), exist_ok=True)
+os.makedirs(os.path.join(_home, "state"), exist_ok=True)
+os.environ.setdefault("OPENCLAW_HOME", _home)
+os.environ.setdefault("DASHBOARD_STATE_DIR", os.path.join(_home, "state"))
+os.environ.setdefault("DASHBOARD_GIT_ROOT", os.path.join(_home, "workspace", "projects", "dashboard"))
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,27 @@
+import json
+
+from api.parser import SessionStreamParser, parse_sessions
+
+ITEMS = [
+    {"key": "agent:main:main", "kind": "direct", "model": "google/gemini-2.5-pro", "totalTokens": 486000, "contextTokens": 1049000, "ageMs": 60000},
+    {"key": "agent:w:1", "kind": "cron", "model": "local/qwen", "totalTokens": 1000, "contextTokens": 0, "ageMs": 0},
+]
+
+def _chunked(output, size):
+    parser = SessionStreamParser()
+    sessions = []
+    for i in range(0, len(output), size):
+        sessions.extend(parser.feed(output[i:i + size]))
+    sessions.extend(parser.feed(b"", final=True))
+    return sessions
+
+def test_json_in_small_chunks_matches_whole():
+    output = json.dumps(ITEMS, indent=2, ensure_ascii=False).encode()
+    assert _chunked(output, 7) == parse_sessions(output)
+    assert [s["key"] for s in parse_sessions(output)] == ["agent:main:main", "agent:w:1"]
+    assert parse_sessions(json.dumps({"sessions": ITEMS})) == parse_sessions(output)
+
+def test_bracketed_text_falls_back_to_table():
+    output = "[warn] config not found\ndirect agent:main:main 1m ago google/gemini 486k/1049k (46%)\n"
+    sessions = _chunked(output.encode(), 5)
+    assert [(s["key"], s["used"], s["age"]) for s in sessions] == [("agent:main:main", 486000, 60)]
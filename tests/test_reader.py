@@ -0,0 +1,24 @@
+from api.reader import read_page, MIN_PAGE_SIZE
+
+def _pages(path, page_size):
+    first = read_page(str(path), 1, page_size)
+    return [first] + [read_page(str(path), page, page_size) for page in range(2, first["total_pages"] + 1)]
+
+def test_line_longer_than_page_still_advances(tmp_path):
+    # Одна строка в 2.5 страницы (с многобайтными символами) между короткими
+    text = "head\n" + "ж" * (MIN_PAGE_SIZE * 5 // 4) + "x\n" + "".join(f"line {i}\n" for i in range(50))
+    path = tmp_path / "long.log"
+    path.write_text(text)
+    pages = _pages(path, MIN_PAGE_SIZE)
+    assert len(pages) == 3
+    assert all(page["end"] > page["start"] for page in pages)
+    assert all(page["start"] == prev["end"] for prev, page in zip(pages, pages[1:]))
+    assert "".join(page["content"] for page in pages) == text
+
+def test_last_line_across_page_edge_keeps_last_page(tmp_path):
+    text = "a" * (MIN_PAGE_SIZE + 100) + "\n"
+    path = tmp_path / "one.log"
+    path.write_text(text)
+    pages = _pages(path, MIN_PAGE_SIZE)
+    assert [bool(page["content"]) for page in pages] == [True, True]
+    assert "".join(page["content"] for page in pages) == text
@@ -0,0 +1,46 @@
+import os
+
+import pytest
+
+from api.search import TrigramIndex, compile_query, scan_file, _literal_runs
+
+FILES = {
+    "abc.txt": "xx ABC yy\n",
+    "digits.txt": "foo7bar\nuser@example.com\n",
+    "class.txt": "a]cde\n:ABC\n",
+    "dots.txt": "foo.bar and x\\yz\n",
+    "other.txt": "nothing to see here\n",
+}
+
+QUERIES = [
+    r"\x41BC", r"\101BC", r"ABC", r"\N{LATIN CAPITAL LETTER A}BC", r"(A)\1BC",
+    r"[[:x:]]ABC", r"[[]ABC", r"A.C", r"foo\dbar", r"foo\.bar", r"a[]b]cde",
+    r"[^]x]ABC", r"user@\w+\.com", r"x\\yz", r"AB?C", r"see\shere",
+]
+
+@pytest.fixture
+def workspace(tmp_path):
+    files = []
+    for rel, text in FILES.items():
+        full = tmp_path / rel
+        full.write_text(text)
+        st = os.stat(full)
+        files.append((rel, str(full), st.st_mtime, st.st_size))
+    return files
+
+def _search(files, pattern, allowed=None):
+    return {rel for rel, full, _, _ in files if (allowed is None or rel in allowed) and scan_file(rel, full, pattern, 0, 10)}
+
+@pytest.mark.parametrize("q", QUERIES)
+def test_indexed_search_matches_full_scan(workspace, q):
+    index = TrigramIndex()
+    index.sync(workspace)
+    pattern = compile_query(q, regex=True)
+    expected = _search(workspace, pattern)
+    runs = _literal_runs(q, True)
+    allowed = index.candidates([run for run in runs if len(run) >= 3]) if runs else None
+    assert _search(workspace, pattern, allowed) == expected
+
+@pytest.mark.parametrize("q", [r"\x41BC", r"\101BC", r"\u0041", r"\N{DIGIT ONE}", r"(a)\1", r"[[:x:]]ABC"])
+def test_untranslated_escapes_disable_index(q):
+    assert _literal_runs(q, True) is None
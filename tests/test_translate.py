@@ -0,0 +1,31 @@
+import sys
+import time
+import types
+import threading
+
+import api.translate as translate
+
+class FakeGoogleTranslator:
+    # Как deep_translator: текст запроса сохраняется в экземпляре, потом идёт "сеть"
+    def __init__(self, source, target):
+        self.target = target
+        self._url_params = {}
+
+    def translate(self, text):
+        self._url_params["q"] = text
+        time.sleep(0.01)
+        return f"<{self._url_params['q']}>"
+
+def test_google_backend_concurrent_chunks_do_not_mix(monkeypatch):
+    monkeypatch.setitem(sys.modules, "deep_translator", types.SimpleNamespace(GoogleTranslator=FakeGoogleTranslator))
+    backend = translate.GoogleBackend()
+    texts = [f"chunk {i}" for i in range(32)]
+    results = {}
+
+    def work(text):
+        results[text] = backend.translate(text, "ru")
+
+    threads = [threading.Thread(target=work, args=(text,)) for text in texts]
+    for thread in threads: thread.start()
+    for thread in threads: thread.join()
+    assert results == {text: f"<{text}>" for text in texts}
@@ -0,0 +1,63 @@
+import os
+import time
+
+from api.tree_index import TreeIndex
+
+def _sync(index, *paths):
+    # То же, что цикл индекса делает с пачкой inotify-событий
+    changes = []
+    with index.lock:
+        for rel in sorted(paths):
+            index._sync(rel, changes)
+        index._commit(changes)
+
+def _apply(nodes, changes):
+    # Клиент применяет diff по порядку: удаление уносит поддерево, upsert — только под живым родителем
+    nodes = dict(nodes)
+    for change in changes:
+        path = change["path"]
+        if change["op"] == "delete":
+            for other in [p for p in nodes if p == path or p.startswith(path + os.sep)]:
+                del nodes[other]
+        else:
+            parent = os.path.dirname(path)
+            assert not parent or parent in nodes, f"upsert {path} before its parent"
+            nodes[path] = change["node"]
+    return nodes
+
+def test_rename_then_child_edit_applies_parents_first(tmp_path):
+    os.makedirs(tmp_path / "a" / "b")
+    (tmp_path / "a" / "b" / "f").write_text("1")
+    (tmp_path / "a" / "b" / "g").write_text("1")
+    index = TreeIndex(root=str(tmp_path))
+    index.rebuild()
+    since, before = index.version, dict(index.nodes)
+
+    os.rename(tmp_path / "a", tmp_path / "c")
+    _sync(index, "a", "c")
+    time.sleep(0.01)
+    # Отдельные пачки: правка файла, потом новый файл (меняет mtime каталога c/b)
+    (tmp_path / "c" / "b" / "f").write_text("changed")
+    _sync(index, os.path.join("c", "b", "f"))
+    (tmp_path / "c" / "b" / "h").write_text("new")
+    _sync(index, os.path.join("c", "b"), os.path.join("c", "b", "h"))
+
+    changes = index.changes_since(since)
+    assert _apply(before, changes) == index.nodes
+
+def test_upsert_under_later_deleted_dir_is_dropped(tmp_path):
+    os.makedirs(tmp_path / "a" / "b")
+    index = TreeIndex(root=str(tmp_path))
+    index.rebuild()
+    since, before = index.version, dict(index.nodes)
+
+    (tmp_path / "a" / "b" / "f").write_text("1")
+    _sync(index, os.path.join("a", "b", "f"))
+    os.remove(tmp_path / "a" / "b" / "f")
+    os.rmdir(tmp_path / "a" / "b")
+    os.rmdir(tmp_path / "a")
+    _sync(index, "a")
+
+    changes = index.changes_since(since)
+    assert changes == [{"op": "delete", "path": "a"}]
+    assert _apply(before, changes) == index.nodes
@@ -0,0 +1,27 @@
+import os
+import time
+
+from api.usage import UsageIndex, HOT_SIZE, HOT_WINDOW
+
+def _old_file(path, size):
+    path.write_bytes(b"x" * size)
+    past = time.time() - HOT_WINDOW * 2
+    os.utime(path, (past, past))
+
+def test_old_large_file_growth_seen_in_fast_pass(tmp_path):
+    os.makedirs(tmp_path / "logs")
+    _old_file(tmp_path / "logs" / "big.log", HOT_SIZE)
+    _old_file(tmp_path / "logs" / "small.log", 10)
+    index = UsageIndex(root=str(tmp_path))
+    index.scan(full=True)
+
+    # Дописывание mtime каталога не меняет — быстрый проход его не перечитает
+    with open(tmp_path / "logs" / "big.log", "ab") as f: f.write(b"y" * 100)
+    with open(tmp_path / "logs" / "small.log", "ab") as f: f.write(b"y" * 100)
+    index.scan()
+    assert not index.last_scan["full"]
+    assert index.records["logs"].files["big.log"][0] == HOT_SIZE + 100
+    # Мелкий давно не менявшийся файл — до полного прохода (задокументированный предел)
+    assert index.records["logs"].files["small.log"][0] == 10
+    index.scan(full=True)
+    assert index.records["logs"].size == HOT_SIZE + 100 + 110